@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory-mapped changeset locator vs. reading the whole file
+
+Writes one large data-seed file (multi-row INSERT changesets, 200 MB by
+default), then looks up its last changeset three ways, each in a fresh
+subprocess so peak RSS is that approach's alone:
+  readlines   the original validate_syntax.py: readlines() + parse_changesets()
+  locator     changeset_locator.build_index() + read_lines() (cold index)
+  cached      changeset_locator.load_index() from its on-disk sidecar
+and prints wall time and peak RSS next to the file and changeset sizes.
+
+Usage: python benchmarks/bench_changeset_locator.py [megabytes]
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+
+ROWS_PER_CHANGESET = 2000
+
+
+def write_seed_file(path, megabytes):
+    """Formatted-SQL seed file of about megabytes MB; returns the last changeset ID"""
+    target = megabytes * 1024 * 1024
+    written = 0
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("--liquibase formatted sql\n")
+        while written < target:
+            n += 1
+            rows = ",\n".join(f"    ({n * ROWS_PER_CHANGESET + r}, 'sku-{r:06d}', 'Seeded product {r}', {r % 997}.99)"
+                              for r in range(ROWS_PER_CHANGESET))
+            block = (f"\n--changeset seed:data-{n:05d} labels:seed context:dev\n"
+                     f"INSERT INTO app.products (product_id, sku, name, price)\nVALUES\n{rows};\n"
+                     f"--rollback DELETE FROM app.products WHERE product_id BETWEEN "
+                     f"{n * ROWS_PER_CHANGESET} AND {(n + 1) * ROWS_PER_CHANGESET - 1};\n")
+            f.write(block)
+            written += len(block)
+    return f"seed:data-{n:05d}", len(block)
+
+
+def legacy_locate(path, changeset_id):
+    with open(path, "r", encoding="utf-8") as file:
+        all_lines = file.readlines()
+    changesets = []
+    current_changeset = None
+    current_lines = []
+    start_line = 1
+    for i, line in enumerate(all_lines, 1):
+        if re.match(r'^\s*--\s*changeset\s+', line, re.IGNORECASE):
+            if current_changeset:
+                changesets.append({'id': current_changeset, 'start_line': start_line,
+                                   'end_line': i - 1, 'lines': current_lines})
+            match = re.search(r'changeset\s+([^:\s]+):([^\s]+)', line, re.IGNORECASE)
+            current_changeset = f"{match.group(1)}:{match.group(2)}" if match else f"unknown:{i}"
+            start_line = i
+            current_lines = [line]
+        elif current_changeset:
+            current_lines.append(line)
+    if current_changeset:
+        changesets.append({'id': current_changeset, 'start_line': start_line,
+                           'end_line': len(all_lines), 'lines': current_lines})
+    found = next(c for c in changesets if c['id'] == changeset_id)
+    return found['start_line'], len(found['lines'])
+
+
+def worker(mode, path, changeset_id, cache_dir):
+    import resource
+    sys.path.insert(0, SCRIPTS)
+    import changeset_locator
+    started = time.perf_counter()
+    if mode == "readlines":
+        start_line, count = legacy_locate(path, changeset_id)
+    else:
+        if mode == "locator":
+            index = changeset_locator.build_index(path)
+        else:
+            index = changeset_locator.load_index(path, cache_dir)
+        entry = index.entry(changeset_id)
+        start_line, count = entry[0], len(changeset_locator.read_lines(path, entry))
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"seconds": elapsed, "peak_mb": peak, "start_line": start_line, "lines": count}))
+
+
+def run(mode, path, changeset_id, cache_dir):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", mode, path, changeset_id, cache_dir],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def main(megabytes=200):
+    with tempfile.TemporaryDirectory(prefix="liquibase-locator-") as tmp:
+        path = os.path.join(tmp, "seed.sql")
+        cache_dir = os.path.join(tmp, "cache")
+        changeset_id, changeset_bytes = write_seed_file(path, megabytes)
+        print(f"Seed file       : {os.path.getsize(path) / 1024 / 1024:.0f} MB, "
+              f"last changeset {changeset_id} ({changeset_bytes / 1024:.0f} KB)")
+
+        # Prime the sidecar so 'cached' measures a warm lookup; done in a
+        # subprocess too, since peak RSS is inherited across fork + exec
+        run("prime", path, changeset_id, cache_dir)
+
+        results = {mode: run(mode, path, changeset_id, cache_dir) for mode in ("readlines", "locator", "cached")}
+        if len({(r["start_line"], r["lines"]) for r in results.values()}) != 1:
+            print(f"❌ Approaches disagree on the changeset: {results}")
+            return 1
+        for mode, r in results.items():
+            print(f"{mode:15s} : {r['seconds'] * 1000:8.0f} ms   peak {r['peak_mb']:7.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        worker(*sys.argv[2:6])
+        sys.exit(0)
+    args = [int(a) for a in sys.argv[1:2]]
+    sys.exit(main(*args))
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-invocation cost of the Python checks, cold vs. warm worker
+
+Generates a corpus with bench_checks.py's generator and runs every check
+invocation (one per changeset for validate_syntax, with FULL_RESCAN, and
+one per table for gdpr_check) these ways:
+  cold        a fresh interpreter per invocation, as Liquibase pays today
+              (a sample of --cold invocations, it is slow)
+  cold+worker the same sample, each fresh interpreter running
+              scripts/warm_check.py against a scripts/check_worker.py
+              started for the run on a temporary socket
+  inprocess   every invocation in one interpreter through liquibase_shim
+  forwarded   scripts/warm_check.py in one interpreter, its state reset
+              before each invocation so that every one is forwarded, as
+              from a fresh interpreter minus the start-up
+  warm_check  scripts/warm_check.py in one interpreter, which forwards the
+              first invocation only and runs the check itself after that
+and prints the mean time per invocation. The in-process, forwarded and
+warm_check runs must fire on the same objects.
+
+Usage: python benchmarks/bench_check_worker.py [--changesets N] [--cold N]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+SCRIPTS = os.path.join(REPO_DIR, "scripts")
+sys.path.insert(0, SCRIPTS)
+sys.path.insert(0, BENCH_DIR)
+
+import bench_checks
+import liquibase_shim
+import validate_changelog
+
+COLD = ("import sys; sys.path.insert(0, {scripts!r}); import liquibase_shim as s; "
+        "s.run_check({script!r}, {context})")
+
+
+def invocations(corpus):
+    """[(check, install() keywords, context source for a cold interpreter)]"""
+    calls = []
+    for path in bench_checks.corpus_files(corpus):
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        for changeset_id, _, _ in validate_changelog.split_changesets(path):
+            author, _, cs_id = changeset_id.partition(":")
+            calls.append(("validate_syntax", {"changeset": liquibase_shim.ChangeSet(path, author, cs_id),
+                                              "args": {"FULL_RESCAN": "true"}},
+                          f"changeset=s.ChangeSet({path!r}, {author!r}, {cs_id!r}), args={{'FULL_RESCAN': 'true'}}"))
+        for match in bench_checks.CREATE_TABLE.finditer(text):
+            columns = [line.split()[0] for line in match.group(2).splitlines()]
+            calls.append(("gdpr_check", {"database_object": liquibase_shim.table(match.group(1), columns)},
+                          f"database_object=s.table({match.group(1)!r}, {columns!r})"))
+    return calls
+
+
+def timed(calls, run):
+    """{check: (invocations, seconds, fired)}"""
+    results = {}
+    for check, context, source in calls:
+        started = time.perf_counter()
+        fired = run(check, context, source)
+        count, seconds, total = results.get(check, (0, 0.0, 0))
+        results[check] = (count + 1, seconds + time.perf_counter() - started, total + bool(fired))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-invocation cost of the checks with and without the warm worker")
+    parser.add_argument("--changesets", type=int, default=2000, help="corpus size (default: 2000)")
+    parser.add_argument("--cold", type=int, default=20, help="cold invocations sampled per check (default: 20)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="liquibase-worker-") as tmp:
+        corpus = bench_checks.generate_corpus(os.path.join(tmp, "corpus"), args.changesets)
+        env = dict(os.environ, VALIDATE_SYNTAX_CACHE_DIR=os.path.join(tmp, "cache"),
+                   CHECK_WORKER_SOCKET=os.path.join(tmp, "worker.sock"))
+        os.environ.update(env)
+        calls = invocations(corpus)
+
+        def cold(check, context, source):
+            script = os.path.join(SCRIPTS, f"{check}.py")
+            subprocess.run([sys.executable, "-c", COLD.format(scripts=SCRIPTS, script=script, context=source)],
+                           env=env, check=True)
+
+        def inprocess(check, context, source):
+            return liquibase_shim.run_check(os.path.join(SCRIPTS, f"{check}.py"), **context)[0]
+
+        def cold_worker(check, context, source):
+            script = os.path.join(SCRIPTS, "warm_check.py")
+            source = source.replace("args={", f"args={{'CHECK': {check!r}, ", 1) if "args={" in source \
+                else f"{source}, args={{'CHECK': {check!r}}}"
+            subprocess.run([sys.executable, "-c", COLD.format(scripts=SCRIPTS, script=script, context=source)],
+                           env=env, check=True)
+
+        def warm_check(check, context, source):
+            context = dict(context, args=dict(context.get("args") or {}, CHECK=check))
+            return liquibase_shim.run_check(os.path.join(SCRIPTS, "warm_check.py"), **context)[0]
+
+        def forwarded(check, context, source):
+            sys.modules.pop("_warm_check_cache", None)
+            return warm_check(check, context, source)
+
+        sample = []
+        for check in bench_checks.CHECKS:
+            sample += [call for call in calls if call[0] == check][:args.cold]
+        results = {"cold": timed(sample, cold)}
+        subprocess.run([sys.executable, os.path.join(SCRIPTS, "check_worker.py"), "start"], env=env, check=True)
+        try:
+            results["cold+worker"] = timed(sample, cold_worker)
+            results["inprocess"] = timed(calls, inprocess)
+            results["forwarded"] = timed(calls, forwarded)
+            sys.modules.pop("_warm_check_cache", None)
+            results["warm_check"] = timed(calls, warm_check)
+        finally:
+            subprocess.run([sys.executable, os.path.join(SCRIPTS, "check_worker.py"), "stop"], env=env)
+
+    print()
+    for check in bench_checks.CHECKS:
+        for mode, result in results.items():
+            count, seconds, fired = result[check]
+            print(f"  {check:16s} {mode:11s} {count:6d} invocations  {seconds / count * 1e6:10.0f} µs each"
+                  + ("" if mode.startswith("cold") else f"  ({fired} fired)"))
+    mismatched = [check for check in bench_checks.CHECKS
+                  if not results["inprocess"][check][2] == results["forwarded"][check][2]
+                  == results["warm_check"][check][2]]
+    if mismatched:
+        print(f"\n❌ Worker verdicts differ for {', '.join(mismatched)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the Liquibase custom checks, with a JSON baseline
+
+Generates changelog corpora of several sizes with `build.py --generate`'s
+generator, then runs each check script exactly as Liquibase would, one
+invocation per object, through the liquibase_utilities shim:
+  validate_syntax   once per changeset (FULL_RESCAN, so verdicts are not reused)
+  gdpr_check        once per table created by the corpus
+Every (check, size) pair runs in its own subprocess so peak memory is that
+run's alone. Wall time, peak RSS and items/sec are compared with
+benchmarks/baseline.json; the run fails when time or memory regress by more
+than --threshold. Times are also stored normalized by a fixed calibration
+workload, and the normalized figure is what gets compared, so a baseline
+recorded on one machine stays meaningful on a faster or slower one.
+
+Usage:
+  python benchmarks/bench_checks.py                   # compare with the baseline
+  python benchmarks/bench_checks.py --update          # record a new baseline
+  python benchmarks/bench_checks.py --sizes small --checks validate_syntax
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+SCRIPTS = os.path.join(REPO_DIR, "scripts")
+BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+# Changesets per corpus; files hold 250 changesets each
+SIZES = {"small": 500, "medium": 2000, "large": 8000}
+CHECKS = ("validate_syntax", "gdpr_check")
+
+CREATE_TABLE = re.compile(r'^CREATE TABLE (\S+) \(\n(.*?)\n\);', re.M | re.S)
+
+
+def calibrate(repeat=5):
+    """Seconds for a fixed regex-and-dict workload, best of repeat"""
+    text = "\n".join(f"CREATE TABLE app.t_{i} (id BIGSERIAL PRIMARY KEY, email VARCHAR(255));"
+                     for i in range(2000))
+    pattern = re.compile(r'\b(CREATE|TABLE|PRIMARY|KEY)\b')
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        counts = {}
+        for _ in range(10):
+            for match in pattern.finditer(text):
+                counts[match.group(1)] = counts.get(match.group(1), 0) + 1
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def generate_corpus(root, changesets):
+    sys.path.insert(0, REPO_DIR)
+    import build
+    files = max(1, changesets // 250)
+    with open(os.devnull, "w") as quiet:
+        stdout, sys.stdout = sys.stdout, quiet
+        try:
+            base = build.create_generated_structure(root, releases=1, files_per_release=files,
+                                                    changesets_per_file=changesets // files)
+        finally:
+            sys.stdout = stdout
+    return str(base)
+
+
+def corpus_files(corpus):
+    release_dir = os.path.join(corpus, "changelogs", "releases")
+    return sorted(os.path.join(d, name) for d, _, names in os.walk(release_dir)
+                  for name in names if name.endswith(".sql"))
+
+
+###
+### Worker: runs one check over one corpus and prints a JSON result
+###
+def run_validate_syntax(corpus, liquibase_shim):
+    import validate_changelog
+    script = os.path.join(SCRIPTS, "validate_syntax.py")
+    items = failed = 0
+    for path in corpus_files(corpus):
+        for changeset_id, _, _ in validate_changelog.split_changesets(path):
+            author, _, cs_id = changeset_id.partition(":")
+            fired, _ = liquibase_shim.run_check(script, changeset=liquibase_shim.ChangeSet(path, author, cs_id),
+                                                args={"FULL_RESCAN": "true"})
+            items += 1
+            failed += bool(fired)
+    return items, failed
+
+
+def run_gdpr_check(corpus, liquibase_shim):
+    script = os.path.join(SCRIPTS, "gdpr_check.py")
+    items = failed = 0
+    for path in corpus_files(corpus):
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        for match in CREATE_TABLE.finditer(text):
+            columns = [line.split()[0] for line in match.group(2).splitlines()]
+            fired, _ = liquibase_shim.run_check(script, database_object=liquibase_shim.table(match.group(1), columns))
+            items += 1
+            failed += bool(fired)
+    return items, failed
+
+
+def worker(check, corpus):
+    import resource
+    sys.path.insert(0, SCRIPTS)
+    import liquibase_shim
+    runner = {"validate_syntax": run_validate_syntax, "gdpr_check": run_gdpr_check}[check]
+    started = time.perf_counter()
+    items, fired = runner(corpus, liquibase_shim)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"items": items, "fired": fired, "seconds": elapsed, "peak_mb": peak}))
+
+
+###
+### Driver
+###
+def measure(check, corpus, cache_dir):
+    env = dict(os.environ, VALIDATE_SYNTAX_CACHE_DIR=cache_dir)
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", check, corpus],
+                         env=env, cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for key, result in sorted(results.items()):
+        base = baseline.get("results", {}).get(key)
+        if not base:
+            print(f"  {key:24s} no baseline")
+            continue
+        time_ratio = result["normalized"] / base["normalized"]
+        mem_ratio = result["peak_mb"] / base["peak_mb"]
+        flag = ""
+        if time_ratio > 1 + threshold:
+            regressions.append(f"{key}: time x{time_ratio:.2f}")
+            flag += " ⚠ time"
+        if mem_ratio > 1 + threshold:
+            regressions.append(f"{key}: memory x{mem_ratio:.2f}")
+            flag += " ⚠ memory"
+        if result["fired"] != base["fired"]:
+            flag += f" (fired {base['fired']} -> {result['fired']})"
+        print(f"  {key:24s} time x{time_ratio:.2f}  memory x{mem_ratio:.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the custom checks against a JSON baseline")
+    parser.add_argument("--sizes", default=",".join(SIZES), help="comma-separated corpus sizes (%s)" % ", ".join(SIZES))
+    parser.add_argument("--checks", default=",".join(CHECKS), help="comma-separated checks (%s)" % ", ".join(CHECKS))
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON (default: benchmarks/baseline.json)")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed regression, 0.25 = 25%% (default)")
+    parser.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--worker", nargs=2, metavar=("CHECK", "CORPUS"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        worker(*args.worker)
+        return 0
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    checks = [c for c in args.checks.split(",") if c]
+    unknown = [s for s in sizes if s not in SIZES] + [c for c in checks if c not in CHECKS]
+    if unknown:
+        print(f"❌ Unknown size or check: {', '.join(unknown)}")
+        return 2
+
+    calibration = calibrate()
+    print(f"Calibration: {calibration * 1000:.1f} ms")
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="liquibase-bench-") as tmp:
+        for size in sizes:
+            corpus = generate_corpus(os.path.join(tmp, size), SIZES[size])
+            for check in checks:
+                r = measure(check, corpus, os.path.join(tmp, "cache"))
+                r["normalized"] = round(r["seconds"] / calibration, 3)
+                r["items_per_sec"] = round(r["items"] / r["seconds"], 1) if r["seconds"] else 0.0
+                r["seconds"] = round(r["seconds"], 3)
+                r["peak_mb"] = round(r["peak_mb"], 1)
+                results[f"{check}/{size}"] = r
+                print(f"  {check:16s} {size:7s} {r['items']:6d} items  {r['seconds']:7.2f} s  "
+                      f"{r['items_per_sec']:8.0f}/s  peak {r['peak_mb']:6.1f} MB  ({r['fired']} fired)")
+
+    if args.update:
+        previous = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                previous = json.load(f).get("results", {})
+        previous.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": previous}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"✓ Baseline written to {os.path.relpath(args.baseline)}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"❌ No baseline at {args.baseline}; run with --update first")
+        return 2
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nAgainst {os.path.relpath(args.baseline)} (threshold {args.threshold:.0%}):")
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s): " + "; ".join(regressions))
+        return 1
+    print("\n✓ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
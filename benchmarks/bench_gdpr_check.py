@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Benchmark: weighted GDPR classifier vs. the original per-token loop
+
+Builds a synthetic warehouse snapshot (1M columns by default, spread over
+20k tables) whose column names repeat the way real schemas do, classifies
+every column with the original hard-coded token list (character-by-character
+normalization plus `token in name`) and with the catalog-driven
+gdpr_rules classifier, and prints the timings plus the names only one of
+them flags, which is where the legacy substring false positives show up.
+It then runs gdpr_check.py itself through the liquibase_utilities shim on a
+sample of tables, and compares that per-object cost with gdpr_rules' batch
+mode over the whole snapshot, fed from the JSON layout
+`liquibase snapshot --snapshot-format=json` writes.
+
+Usage: python benchmarks/bench_gdpr_check.py [columns] [tables]
+"""
+
+import collections
+import os
+import random
+import sys
+import time
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+sys.path.insert(0, SCRIPTS)
+import gdpr_rules
+import liquibase_shim
+
+
+LEGACY_TOKENS = [
+    # Names
+    "name", "full_name", "firstname", "first_name", "givenname", "given_name",
+    "lastname", "last_name", "surname", "middlename", "middle_name", "maiden_name",
+    # Contact
+    "email", "emailaddress", "email_address", "phone", "telephone", "mobile",
+    "cell", "msisdn",
+    # Address / location
+    "address", "address1", "address2", "street", "street1", "street2",
+    "city", "town", "county", "state", "province", "region",
+    "postal", "postcode", "postalcode", "zip", "zipcode", "country",
+    "latitude", "longitude", "lat", "lon", "geocode",
+    # DOB / age
+    "dob", "dateofbirth", "date_of_birth", "birthdate", "birthday", "age", "yob",
+    # Government IDs / identifiers
+    "ssn", "sin", "nin", "nino", "nationalinsurance", "national_insurance",
+    "nationalid", "national_id", "passport", "passportno", "passport_number",
+    "driverslicense", "driver_license", "driving_license", "license_number",
+    "taxid", "tax_id", "tin", "ein", "itn",
+    "siret", "siren", "nif", "nie", "curp", "rfc",
+    "aadhaar", "pan", "uin", "bsn", "pesel",
+    # Financial
+    "iban", "bic", "swift", "bankaccount", "bank_account", "accountno",
+    "account_number", "cardnumber", "card_number", "creditcard", "ccnum",
+    "cc_number", "cvv", "cvc", "expiry", "exp_date",
+    # Online identifiers
+    "ip", "ipaddress", "ip_address", "ipv4", "ipv6", "mac",
+    "deviceid", "device_id", "cookie", "session", "sessionid", "session_id",
+    "trackingid", "tracking_id", "useragent", "user_agent", "userid", "user_id", "username",
+    # Health (special category)
+    "nhs_number", "medical", "health", "diagnosis", "patientid", "patient_id", "patient",
+    # Biometric (special category)
+    "biometric", "fingerprint", "face", "iris", "retina", "voiceprint", "dna"
+]
+
+
+def legacy_normalize(s):
+    s = (s or "").lower()
+    out = []
+    for ch in s:
+        if ch.isalnum():
+            out.append(ch)
+    return "".join(out)
+
+
+def legacy_matches_gdpr(name):
+    n = legacy_normalize(name)
+    for token in LEGACY_TOKENS:
+        if token in n:
+            return token
+    return None
+
+
+# Names that show up in nearly every table of a warehouse
+COMMON_COLUMNS = [
+    "id", "created_at", "updated_at", "created_by", "updated_by", "deleted_at",
+    "tenant_id", "version", "status", "is_active", "description", "amount",
+    "currency", "quantity", "total", "notes", "payload", "source_system",
+    "email", "first_name", "last_name", "phone_number", "ip_address", "user_id",
+    "country_code", "postal_code", "date_of_birth", "iban", "session_id",
+    # Innocent names the legacy substring match flags
+    "table_name", "page_count", "company_id", "shipping_method", "translation_key",
+    "usage_type", "state", "message", "category_name", "lifecycle_stage",
+]
+
+SYLLABLES = ["ord", "inv", "ship", "pro", "cat", "ent", "ry", "lo", "ga", "ti",
+             "on", "ref", "val", "sku", "bat", "ch", "qty", "seg", "met", "ric"]
+
+
+def synthetic_snapshot(columns, tables, seed=42):
+    """[(table, [column, ...]), ...] with about columns columns in total"""
+    rng = random.Random(seed)
+    per_table = max(1, columns // tables)
+    domain = ["_".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3)))
+              for _ in range(5000)]
+    snapshot = []
+    for t in range(tables):
+        names = set()
+        while len(names) < per_table:
+            roll = rng.random()
+            if roll < 0.45:
+                names.add(rng.choice(COMMON_COLUMNS))
+            elif roll < 0.9:
+                names.add(rng.choice(domain))
+            else:
+                names.add(f"{rng.choice(domain)}_{rng.randint(0, 99999)}")
+        snapshot.append((f"table_{t}", sorted(names)))
+    return snapshot
+
+
+def snapshot_json(snapshot):
+    """The snapshot in Liquibase's JSON snapshot layout"""
+    tables, columns = [], []
+    next_id = 1
+    for table_name, cols in snapshot:
+        table_id = str(next_id)
+        next_id += 1
+        refs = []
+        for col in cols:
+            refs.append(f"liquibase.structure.core.Column#{next_id}")
+            columns.append({"column": {"name": col, "snapshotId": str(next_id),
+                                       "relation": f"liquibase.structure.core.Table#{table_id}"}})
+            next_id += 1
+        tables.append({"table": {"name": table_name, "snapshotId": table_id, "columns": refs}})
+    return {"snapshot": {"objects": {"liquibase.structure.core.Table": tables,
+                                     "liquibase.structure.core.Column": columns}}}
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def classify(snapshot, matcher):
+    return [[matcher(col) for col in cols] for _, cols in snapshot]
+
+
+def expected_message(table, cols, classifier):
+    offending = {c: classifier.category(c) for c in cols if classifier.category(c)}
+    return gdpr_rules.table_message(table, offending) if offending else None
+
+
+def main(columns=1_000_000, tables=20_000):
+    snapshot = synthetic_snapshot(columns, tables)
+    total = sum(len(cols) for _, cols in snapshot)
+    distinct = len({col for _, cols in snapshot for col in cols})
+
+    legacy_time, legacy = _timed(lambda: classify(snapshot, legacy_matches_gdpr))
+    compile_time, classifier = _timed(lambda: gdpr_rules.Classifier(
+        gdpr_rules.load_catalog()["entries"], gdpr_rules.load_catalog()["threshold"]))
+    cold_time, weighted = _timed(lambda: classify(snapshot, classifier.category))
+    warm_time, _ = _timed(lambda: classify(snapshot, classifier.category))
+
+    legacy_only = collections.Counter()
+    weighted_only = collections.Counter()
+    for (_, cols), old, new in zip(snapshot, legacy, weighted):
+        for col, a, b in zip(cols, old, new):
+            if a and not b:
+                legacy_only[col] += 1
+            elif b and not a:
+                weighted_only[col] += 1
+
+    print(f"Columns         : {total} in {len(snapshot)} tables ({distinct} distinct names)")
+    print(f"Flagged columns : legacy {sum(t is not None for row in legacy for t in row)}, "
+          f"weighted {sum(t is not None for row in weighted for t in row)}")
+    print(f"Legacy only     : {', '.join(c for c, _ in legacy_only.most_common(12))}")
+    print(f"Weighted only   : {', '.join(c for c, _ in weighted_only.most_common(12)) or '-'}")
+    print(f"Legacy loop     : {legacy_time * 1000:.0f} ms")
+    print(f"Catalog compile : {compile_time * 1000:.1f} ms ({len(classifier.entries)} entries)")
+    print(f"Weighted (cold) : {cold_time * 1000:.0f} ms  ({legacy_time / cold_time:.1f}x)")
+    print(f"Weighted (warm) : {warm_time * 1000:.0f} ms  ({legacy_time / warm_time:.1f}x)")
+    print(f"Name cache      : {classifier.classify.cache_info()}")
+
+    script = os.path.join(SCRIPTS, "gdpr_check.py")
+    sample = snapshot[:500]
+    started = time.perf_counter()
+    for table_name, cols in sample:
+        fired, message = liquibase_shim.run_check(
+            script, database_object=liquibase_shim.table(table_name, cols))
+        expected = expected_message(table_name, cols, classifier)
+        if fired != (expected is not None) or (fired and message != expected):
+            print(f"❌ gdpr_check.py disagrees with the classifier on {table_name}")
+            return 1
+    per_object = (time.perf_counter() - started) / len(sample)
+    print(f"Check script    : {len(sample)} tables checked, "
+          f"{per_object * 1000:.2f} ms/table -> {per_object * len(snapshot):.1f} s for the snapshot")
+
+    document = snapshot_json(snapshot)
+    classifier.classify.cache_clear()
+    batch_time, findings = _timed(
+        lambda: gdpr_rules.classify_tables(gdpr_rules.tables_from_snapshot(document), classifier))
+    expected = {name: {c: t for c, t in zip(cols, row) if t}
+                for (name, cols), row in zip(snapshot, weighted) if any(row)}
+    if findings != expected:
+        print("❌ Batch mode and per-column classification disagree")
+        return 1
+    print(f"Batch snapshot  : {len(findings)} tables flagged in {batch_time * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(main(*args))
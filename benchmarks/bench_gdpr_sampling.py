@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: GDPR value sampling against an in-memory SQLite database
+
+Creates a wide table whose free-text columns hide e-mail addresses, IBANs,
+card numbers and phone numbers, plus decoy columns with checksum-failing
+IBANs and card numbers, order references and timestamps. It verifies that
+gdpr_sampling flags exactly the columns holding personal data, then times
+sampling under the default budget and under tight row, byte and time
+budgets to show the reads stay bounded.
+
+Usage: python benchmarks/bench_gdpr_sampling.py [rows]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import gdpr_sampling
+
+# Valid test numbers: published example IBANs and Luhn-valid test cards
+IBANS = ["DE89370400440532013000", "GB82WEST12345698765432", "FR1420041010050500013M02606",
+         "NL91ABNA0417164300", "ES9121000418450200051332"]
+CARDS = ["4111 1111 1111 1111", "5500-0000-0000-0004", "340000000000009", "6011000000000004"]
+
+EXPECTED = {
+    "notes": "contact, sampled email",
+    "payload": "financial, sampled iban",
+    "remarks": "financial, sampled card",
+    "callback": "contact, sampled phone",
+}
+
+
+def build_database(rows, seed=42):
+    rng = random.Random(seed)
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE events (id INTEGER, notes TEXT, payload TEXT, remarks TEXT, callback TEXT, "
+               "bad_iban TEXT, bad_card TEXT, reference TEXT, created_at TEXT, amount REAL)")
+    batch = []
+    for i in range(rows):
+        batch.append((
+            i,
+            f"customer wrote from user{i}@example.org about order {i}" if rng.random() < 0.3 else "no reply",
+            f'{{"iban": "{rng.choice(IBANS)}"}}' if rng.random() < 0.2 else "{}",
+            f"paid with {rng.choice(CARDS)}" if rng.random() < 0.2 else "cash",
+            f"call +44 20 7946 {rng.randint(0, 9999):04d}" if rng.random() < 0.3 else "",
+            "DE89370400440532013001",
+            "4111 1111 1111 1112",
+            f"ORD-{rng.randint(10 ** 8, 10 ** 9)}",
+            f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 12:00:00",
+            rng.random() * 1000,
+        ))
+    db.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+    return db
+
+
+def main(rows=200_000):
+    db = build_database(rows)
+    columns = [d[1] for d in db.execute("PRAGMA table_info(events)")]
+
+    started = time.perf_counter()
+    findings = gdpr_sampling.sample_table(db, "events", columns)
+    elapsed = time.perf_counter() - started
+    if findings != EXPECTED:
+        print(f"❌ Unexpected sampling findings: {findings}")
+        return 1
+    print(f"Table rows      : {rows}, {len(columns)} columns")
+    print(f"Default budget  : {gdpr_sampling.DEFAULT_BUDGET}")
+    print(f"Findings        : {', '.join(f'{c} ({k})' for c, k in sorted(findings.items()))}")
+    print(f"Sampling time   : {elapsed * 1000:.1f} ms")
+
+    for budget in (gdpr_sampling.Budget(rows=50, bytes=1 << 20, seconds=2.0),
+                   gdpr_sampling.Budget(rows=10 ** 9, bytes=64 * 1024, seconds=2.0),
+                   gdpr_sampling.Budget(rows=10 ** 9, bytes=10 ** 12, seconds=0.05)):
+        started = time.perf_counter()
+        found = gdpr_sampling.sample_table(db, "events", ["bad_iban", "bad_card", "reference", "created_at"], budget)
+        elapsed = time.perf_counter() - started
+        if found:
+            print(f"❌ Decoy columns flagged: {found}")
+            return 1
+        print(f"Decoys, {budget}: {elapsed * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:2]]
+    sys.exit(main(*args))
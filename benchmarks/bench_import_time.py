@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Cold-start budget for the Python custom checks
+
+Liquibase starts a fresh interpreter for the check scripts, so what an
+invocation pays before its verdict is the import of the check plus
+everything its first call has to build: the changeset index and verdict
+store of an empty cache directory for validate_syntax, the catalog
+classifier for gdpr_check. This times exactly that, from before the import
+to after the first check() returns, in a fresh interpreter with a fresh
+cache directory per run (median of --repeat runs). Scripts are
+byte-compiled first, as an installed tree is.
+
+Both checks are measured with the shipped catalogs and with both catalogs
+grown --grow times (synthetic entries), and every figure is held to the
+budget.
+
+Usage:
+  python benchmarks/bench_import_time.py
+  python benchmarks/bench_import_time.py --python /path/to/graalpy     # Liquibase's embedded Python
+  python benchmarks/bench_import_time.py --budget-ms 40 --grow 100
+
+Exit code: 0 within budget, 1 over budget, 2 when a measurement fails.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+SCRIPTS = os.path.join(REPO_DIR, "scripts")
+
+CHECKS = ("validate_syntax", "gdpr_check")
+# Milliseconds from the import of a check to the end of its first call
+BUDGET_MS = 60.0
+
+CHANGELOG = """--liquibase formatted sql
+
+--changeset budget:001
+CREATE TABLE app.customers (
+    customer_id BIGSERIAL PRIMARY KEY,
+    email VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT now()
+);
+--rollback DROP TABLE app.customers;
+"""
+
+
+def grow_catalogs(directory, times):
+    """Copies of both catalogs with times x the entries; returns their environment"""
+    with open(os.path.join(SCRIPTS, "typo_catalog.json"), "r", encoding="utf-8") as f:
+        typos = json.load(f)
+    with open(os.path.join(SCRIPTS, "gdpr_catalog.json"), "r", encoding="utf-8") as f:
+        gdpr = json.load(f)
+    typos = typos + [dict(entry, typo=f"{entry['typo']}X{i}") for i in range(1, times) for entry in typos]
+    gdpr = dict(gdpr, entries=gdpr["entries"] + [dict(entry, token=f"{entry['token']}x{i}")
+                                                 for i in range(1, times) for entry in gdpr["entries"]])
+    env = {"VALIDATE_SYNTAX_TYPO_CATALOG": os.path.join(directory, "typo_catalog.json"),
+           "GDPR_CATALOG": os.path.join(directory, "gdpr_catalog.json")}
+    with open(env["VALIDATE_SYNTAX_TYPO_CATALOG"], "w", encoding="utf-8") as f:
+        json.dump(typos, f)
+    with open(env["GDPR_CATALOG"], "w", encoding="utf-8") as f:
+        json.dump(gdpr, f)
+    return env
+
+
+# Runs in a bare interpreter, so the checks pay for every module they import
+COLD = """
+started = time.perf_counter()
+import sys
+sys.path.insert(0, {scripts!r})
+import liquibase_shim
+lb = liquibase_shim.install({context})
+import {check}
+{check}.check(lb)
+print((time.perf_counter() - started) * 1000)
+"""
+
+CONTEXTS = {
+    "validate_syntax": "changeset=liquibase_shim.ChangeSet({changelog!r}, 'budget', '001')",
+    "gdpr_check": "database_object=liquibase_shim.table('app.customers', ['customer_id', 'email', 'created_at'])",
+}
+
+
+def measure(python, check, changelog, env, repeat, tmp):
+    """Milliseconds to import check and answer its first call, median over repeat cold runs"""
+    source = COLD.format(scripts=SCRIPTS, check=check, context=CONTEXTS[check].format(changelog=changelog))
+    runs = []
+    for _ in range(repeat):
+        cache = tempfile.mkdtemp(prefix="cache-", dir=tmp)
+        out = subprocess.run([python, "-c", source], env=dict(env, VALIDATE_SYNTAX_CACHE_DIR=cache),
+                             cwd=REPO_DIR, capture_output=True, text=True, check=True)
+        runs.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(runs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hold the check scripts' cold-start cost to a fixed budget")
+    parser.add_argument("--python", default=sys.executable, help="interpreter to measure (default: this one)")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per figure (default: 5)")
+    parser.add_argument("--grow", type=int, default=50, help="catalog growth factor (default: 50)")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS,
+                        help=f"import plus first call budget in ms (default: {BUDGET_MS:.0f})")
+    args = parser.parse_args(argv)
+
+    over = []
+    with tempfile.TemporaryDirectory(prefix="liquibase-import-") as tmp:
+        changelog = os.path.join(tmp, "budget.sql")
+        with open(changelog, "w", encoding="utf-8") as f:
+            f.write(CHANGELOG)
+        base = dict(os.environ)
+        grown = dict(base, **grow_catalogs(tmp, args.grow))
+        try:
+            subprocess.run([args.python, "-m", "compileall", "-q", SCRIPTS], check=True)
+            results = {(check, label): measure(args.python, check, changelog, env, args.repeat, tmp)
+                       for check in CHECKS for label, env in (("shipped", base), (f"x{args.grow}", grown))}
+        except (OSError, subprocess.CalledProcessError, ValueError) as e:
+            print(f"❌ Measurement failed: {getattr(e, 'stderr', None) or e}")
+            return 2
+
+    for (check, label), ms in results.items():
+        print(f"  {check:16s} {label:8s} import + first call {ms:7.1f} ms")
+        if ms > args.budget_ms:
+            over.append(f"{check} {ms:.1f} ms > {args.budget_ms:.0f} ms ({label} catalogs)")
+
+    if over:
+        print("\n❌ Over budget: " + "; ".join(over))
+        return 1
+    print(f"\n✓ Within budget ({args.budget_ms:.0f} ms from import to first verdict)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Benchmark: single-pass rule engine vs. the original per-check loops
+
+Builds one large synthetic changeset, runs the legacy implementation of
+checks 1-11 (one loop per check, uncompiled patterns) and
+syntax_rules.validate_lines() over it, verifies the line-based checks report
+the same errors and prints the speedup. The paren, quote, semicolon, BEGIN/END
+and IF/THEN checks read the tokenizer's structure instead of looking ahead
+line by line, so their findings intentionally differ and are only counted.
+It then times a long PL/pgSQL body, where the legacy look-ahead is quadratic,
+and the typo catalog automaton with the shipped catalog and with several
+hundred extra synthetic typos.
+
+Usage: python benchmarks/bench_validate_syntax.py [statements] [repeat]
+"""
+
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import syntax_rules
+
+
+def legacy_validate(lines, start_line_number):
+    """Checks 1-11 as validate_syntax.py ran them before the rule engine"""
+    def is_comment_line(line):
+        stripped = line.strip()
+        return stripped.startswith('--') or stripped.startswith('/*') or stripped.startswith('*')
+
+    def is_rollback_line(line):
+        stripped = line.strip()
+        return stripped.startswith('--rollback')
+
+    errors = []
+    if start_line_number == 1:
+        if not any("--liquibase formatted sql" in line.lower() for line in lines[:5]):
+            errors.append((1, "Missing '--liquibase formatted sql' header", "CRITICAL"))
+
+    for i, line in enumerate(lines, 1):
+        if is_comment_line(line) or is_rollback_line(line):
+            continue
+        if re.search(r'\bCREAE\b', line, re.IGNORECASE):
+            errors.append((i, "'CREAE' should be 'CREATE'", "CRITICAL"))
+        if re.search(r'\bCREAT\s+TABLE\b', line, re.IGNORECASE):
+            errors.append((i, "'CREAT TABLE' should be 'CREATE TABLE'", "CRITICAL"))
+        if re.search(r'\bCREAT\s+PROCEDURE\b', line, re.IGNORECASE):
+            errors.append((i, "'CREAT PROCEDURE' should be 'CREATE PROCEDURE'", "CRITICAL"))
+        if re.search(r'\bCREAT\s+FUNCTION\b', line, re.IGNORECASE):
+            errors.append((i, "'CREAT FUNCTION' should be 'CREATE FUNCTION'", "CRITICAL"))
+        if re.search(r'\bCREAT\s+INDEX\b', line, re.IGNORECASE):
+            errors.append((i, "'CREAT INDEX' should be 'CREATE INDEX'", "CRITICAL"))
+
+    for i, line in enumerate(lines, 1):
+        if is_comment_line(line) or is_rollback_line(line):
+            continue
+        if re.search(r'\bALTR\b', line, re.IGNORECASE):
+            errors.append((i, "'ALTR' should be 'ALTER'", "ERROR"))
+        if re.search(r'\bALTE\s+TABLE\b', line, re.IGNORECASE):
+            errors.append((i, "'ALTE TABLE' should be 'ALTER TABLE'", "ERROR"))
+
+    typo_patterns = [
+        (r'\bTABEL\b', "'TABEL' should be 'TABLE'", "ERROR"),
+        (r'\bPROCEDUR\b', "'PROCEDUR' should be 'PROCEDURE'", "ERROR"),
+        (r'\bFUNCTIO\b', "'FUNCTIO' should be 'FUNCTION'", "ERROR"),
+        (r'\bINSERT\s+INT\b', "'INSERT INT' should be 'INSERT INTO'", "ERROR"),
+        (r'\bINSRT\b', "'INSRT' should be 'INSERT'", "ERROR"),
+        (r'\bSELCT\b', "'SELCT' should be 'SELECT'", "ERROR"),
+        (r'\bDELTE\b', "'DELTE' should be 'DELETE'", "ERROR"),
+        (r'\bUPDATE\b.*\bSET\b.*\bWHERE\b.*\bADN\b', "'ADN' should be 'AND'", "ERROR"),
+        (r'\bAD\s+COLUMN\b', "'AD COLUMN' should be 'ADD COLUMN'", "ERROR"),
+        (r'\bAD\s+CONSTRAINT\b', "'AD CONSTRAINT' should be 'ADD CONSTRAINT'", "ERROR"),
+    ]
+    for pattern, msg, severity in typo_patterns:
+        for i, line in enumerate(lines, 1):
+            if is_comment_line(line) or is_rollback_line(line):
+                continue
+            if re.search(pattern, line, re.IGNORECASE):
+                errors.append((i, msg, severity))
+
+    non_comment_lines = []
+    for i, line in enumerate(lines, 1):
+        if not is_comment_line(line) and not is_rollback_line(line):
+            non_comment_lines.append((i, re.sub(r'--.*$', '', line)))
+    total_open = sum(line[1].count('(') for line in non_comment_lines)
+    total_close = sum(line[1].count(')') for line in non_comment_lines)
+    if total_open != total_close:
+        cumulative_open = cumulative_close = 0
+        problem_line = None
+        for i, cleaned_line in non_comment_lines:
+            cumulative_open += cleaned_line.count('(')
+            cumulative_close += cleaned_line.count(')')
+            if cumulative_close > cumulative_open and not problem_line:
+                problem_line = i
+                break
+        if not problem_line:
+            problem_line = non_comment_lines[-1][0] if non_comment_lines else len(lines)
+        errors.append((problem_line, f"Unmatched parentheses: {total_open} '(' vs {total_close} ')'", "ERROR"))
+
+    for i, line in enumerate(lines, 1):
+        if is_comment_line(line) or is_rollback_line(line):
+            continue
+        if re.sub(r'--.*$', '', line).count("'") % 2 != 0:
+            errors.append((i, "Unmatched single quotes", "ERROR"))
+
+    types = r'(TEXT|VARCHAR|VARCHAR2|CHAR|INT|INTEGER|BIGINT|BIGSERIAL|NUMBER|DATE|TIMESTAMP|TIMESTAMPTZ|CLOB|BLOB)'
+    for i, line in enumerate(lines, 1):
+        if is_comment_line(line) or is_rollback_line(line):
+            continue
+        if re.search(rf'\b[A-Z_][A-Z0-9_]*\s+{types}\s+[A-Z_][A-Z0-9_]*\s+{types}', line.upper()):
+            errors.append((i, "Missing comma between column definitions", "ERROR"))
+
+    for i, line in enumerate(lines, 1):
+        if is_comment_line(line) or is_rollback_line(line):
+            continue
+        line_stripped = line.strip()
+        if re.match(r'^(CREATE|ALTER|DROP|INSERT|UPDATE|DELETE|GRANT|REVOKE)\b', line_stripped, re.IGNORECASE):
+            found_semicolon = False
+            for j in range(i - 1, min(i + 30, len(lines))):
+                check_line = lines[j].strip()
+                if is_rollback_line(lines[j]):
+                    continue
+                if check_line.endswith(';'):
+                    found_semicolon = True
+                    break
+                if j > i and re.match(r'^(CREATE|ALTER|DROP|INSERT|UPDATE|DELETE|--|--changeset)', check_line, re.IGNORECASE):
+                    break
+            if not found_semicolon:
+                errors.append((i, "Statement missing terminating semicolon", "WARNING"))
+
+    for i, line in enumerate(lines, 1):
+        if is_comment_line(line) or is_rollback_line(line):
+            continue
+        if re.search(r'\bBEGIN\b', line, re.IGNORECASE):
+            found_end = False
+            for j in range(i, min(i + 100, len(lines))):
+                if is_rollback_line(lines[j]):
+                    continue
+                if re.search(r'\bEND\s*;', lines[j], re.IGNORECASE):
+                    found_end = True
+                    break
+            if not found_end:
+                errors.append((i, "BEGIN without matching END", "ERROR"))
+        if re.search(r'\bIF\b.*\bNOT\b.*\bEXISTS\b', line, re.IGNORECASE):
+            continue
+        if re.search(r'\bIF\s+EXISTS\b', line, re.IGNORECASE):
+            continue
+        if re.search(r'\bIF\b', line, re.IGNORECASE):
+            has_then = re.search(r'\bTHEN\b', line, re.IGNORECASE)
+            if not has_then and i < len(lines):
+                has_then = re.search(r'\bTHEN\b', lines[i], re.IGNORECASE)
+            if not has_then and i + 1 < len(lines):
+                has_then = re.search(r'\bTHEN\b', lines[i + 1], re.IGNORECASE)
+            if not has_then:
+                errors.append((i, "IF without THEN", "ERROR"))
+
+    for i, line in enumerate(lines, 1):
+        if is_comment_line(line) or is_rollback_line(line):
+            continue
+        if ';;' in line:
+            errors.append((i, "Double semicolon (;;)", "WARNING"))
+
+    reserved_words = ['USER', 'LEVEL', 'SIZE', 'ORDER', 'GROUP', 'DATE', 'NUMBER']
+    for i, line in enumerate(lines, 1):
+        if is_comment_line(line) or is_rollback_line(line):
+            continue
+        line_upper = line.upper()
+        for word in reserved_words:
+            if re.search(rf'\b{word}\s+(TEXT|VARCHAR|INT|NOT\s+NULL)', line_upper):
+                errors.append((i, f"Reserved word '{word}' as column name - use quotes", "WARNING"))
+
+    severity_order = {'CRITICAL': 0, 'ERROR': 1, 'WARNING': 2}
+    errors.sort(key=lambda x: (x[0], severity_order.get(x[2], 3)))
+    return errors
+
+
+FRAGMENTS = [
+    "CREATE TABLE t_{n} (\n",
+    "    id_{n} BIGINT NOT NULL,\n",
+    "    name_{n} VARCHAR(100),\n",
+    "    level INT,\n",
+    "    amount_{n} NUMERIC(12,2) DEFAULT 0\n",
+    ");\n",
+    "CREATE INDEX ix_{n} ON t_{n} (id_{n});\n",
+    "ALTER TABLE t_{n} ADD COLUMN c_{n} TEXT;\n",
+    "INSERT INTO t_{n} (id_{n}, name_{n}) VALUES ({n}, 'row {n}');\n",
+    "UPDATE t_{n} SET name_{n} = 'x' WHERE id_{n} = {n};\n",
+    "-- comment line {n}\n",
+    "--rollback DROP TABLE t_{n};\n",
+    "CREATE OR REPLACE FUNCTION f_{n}() RETURNS void AS $$\n",
+    "BEGIN\n",
+    "    IF {n} > 1 THEN\n",
+    "        PERFORM 1;\n",
+    "    END IF;\n",
+    "END;\n",
+    "$$ LANGUAGE plpgsql;\n",
+    "GRANT SELECT ON t_{n} TO reader\n",
+    "SELCT * FROM TABEL;\n",
+    "CREAT TABLE broken_{n} (a INT b INT);;\n",
+    "    IF {n} > 2\n",
+    "    'unterminated {n}\n",
+    "\n",
+]
+
+
+def synthetic_plpgsql(body_lines):
+    """Return the lines of one changeset holding a single long function body"""
+    lines = [
+        "--changeset bench:plpgsql\n",
+        "CREATE OR REPLACE FUNCTION bench_body() RETURNS void AS $$\n",
+        "BEGIN\n",
+    ]
+    for n in range(body_lines // 4):
+        lines.append("    BEGIN\n")
+        lines.append(f"        UPDATE t SET c = 'x;y' WHERE id = {n};\n")
+        lines.append(f"        INSERT INTO log (msg) VALUES ('step {n} -- done');\n")
+        lines.append("    EXCEPTION WHEN others THEN NULL; END;\n")
+    lines.append("END;\n")
+    lines.append("$$ LANGUAGE plpgsql;\n")
+    return lines
+
+
+STRUCTURAL_MESSAGES = (
+    "Unmatched parentheses", "Unmatched single quotes", "Unterminated",
+    "Statement missing terminating semicolon", "BEGIN without matching END",
+    "IF without THEN",
+)
+
+
+def _split_structural(errors):
+    line_based = [e for e in errors if not e[1].startswith(STRUCTURAL_MESSAGES)]
+    return line_based, len(errors) - len(line_based)
+
+
+def synthetic_changeset(statements, seed=42):
+    """Return the lines of one changeset with `statements` random fragments"""
+    rng = random.Random(seed)
+    lines = ["--changeset bench:large labels:bench\n"]
+    for n in range(statements):
+        lines.append(rng.choice(FRAGMENTS).format(n=n))
+    return lines
+
+
+def _best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def padded_typo_catalog(extra, seed=7):
+    """The shipped typo catalog plus `extra` random, never-matching typos"""
+    rng = random.Random(seed)
+    entries = list(syntax_rules.load_typo_catalog())
+    seen = {e['typo'] for e in entries}
+    target = len(entries) + extra
+    while len(entries) < target:
+        words = ' '.join(
+            ''.join(rng.choice('QXZJKVW') + rng.choice('ABCDEFGHIJKLMNOPRSTUY') for _ in range(rng.randint(2, 4)))
+            for _ in range(rng.randint(1, 2)))
+        if words not in seen:
+            seen.add(words)
+            entries.append({'typo': words, 'fix': words.lower(), 'severity': 'ERROR'})
+    return entries
+
+
+def main(statements=50000, repeat=3):
+    lines = synthetic_changeset(statements)
+    legacy_time, legacy_errors = _best_of(lambda: legacy_validate(lines, 1), repeat)
+    engine_time, engine_errors = _best_of(lambda: syntax_rules.validate_lines(lines, 1), repeat)
+
+    legacy_lines, legacy_structural = _split_structural(legacy_errors)
+    engine_lines, engine_structural = _split_structural(engine_errors)
+    if legacy_lines != engine_lines:
+        print("❌ Rule engine and legacy checks disagree on line-based checks")
+        return 1
+
+    print(f"Changeset lines : {len(lines)}")
+    print(f"Line-based hits : {len(engine_lines)}")
+    print(f"Structural hits : {engine_structural} (legacy look-ahead: {legacy_structural})")
+    print(f"Legacy loops    : {legacy_time * 1000:.1f} ms")
+    print(f"Rule engine     : {engine_time * 1000:.1f} ms")
+    print(f"Speedup         : {legacy_time / engine_time:.1f}x")
+
+    body = synthetic_plpgsql(statements // 5)
+    legacy_time, _ = _best_of(lambda: legacy_validate(body, 2), repeat)
+    engine_time, _ = _best_of(lambda: syntax_rules.validate_lines(body, 2), repeat)
+    print(f"PL/pgSQL body   : {len(body)} lines, legacy {legacy_time * 1000:.1f} ms, "
+          f"engine {engine_time * 1000:.1f} ms")
+
+    for extra in (0, 500):
+        entries = padded_typo_catalog(extra)
+        rules = [syntax_rules.TypoCatalogRule(entries)]
+        typo_time, _ = _best_of(lambda: syntax_rules.validate_lines(lines, 2, rules), repeat)
+        print(f"Typo catalog    : {len(entries):4d} entries, {typo_time * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(main(*args))
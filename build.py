@@ -2,9 +2,16 @@
 """
 Liquibase Demo Project Generator
 Creates a complete Liquibase demo structure with PostgreSQL examples
+
+With --generate it instead writes a seeded synthetic changelog tree of any
+size (releases x files x changesets, table widths, PL/pgSQL body sizes,
+injected typo density, personal-data column ratio) for benchmarking the
+validators, plus a generated.json manifest of what was injected.
 """
 
+import json
 import os
+import random
 from pathlib import Path
 
 def create_demo_structure(base_path="."):
@@ -368,14 +375,247 @@ COMMENT ON CONSTRAINT orders_status_check ON app.orders IS 'Valid order status v
     
     return base
 
+# ---------------------------------------------------------------------------
+# Generated changelogs for benchmarking and regression-testing the validators
+# ---------------------------------------------------------------------------
+
+XML_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<databaseChangeLog
+    xmlns="http://www.liquibase.org/xml/ns/dbchangelog"
+    xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+    xsi:schemaLocation="http://www.liquibase.org/xml/ns/dbchangelog
+    http://www.liquibase.org/xml/ns/dbchangelog/dbchangelog-latest.xsd">
+
+"""
+
+PII_COLUMNS = [
+    ("email", "VARCHAR(255)"), ("first_name", "VARCHAR(100)"), ("last_name", "VARCHAR(100)"),
+    ("phone_number", "VARCHAR(20)"), ("date_of_birth", "DATE"), ("iban", "VARCHAR(34)"),
+    ("ip_address", "INET"), ("postal_code", "VARCHAR(10)"), ("street_address", "TEXT"),
+    ("passport_number", "VARCHAR(20)"), ("card_number", "VARCHAR(19)"), ("user_agent", "TEXT"),
+]
+
+PLAIN_COLUMNS = [
+    ("amount", "NUMERIC(12,2)"), ("quantity", "INTEGER"), ("status_code", "VARCHAR(20)"),
+    ("reference_no", "VARCHAR(50)"), ("is_active", "BOOLEAN"), ("description", "TEXT"),
+    ("priority", "SMALLINT"), ("unit_price", "NUMERIC(10,2)"), ("external_ref", "VARCHAR(64)"),
+    ("batch_size", "INTEGER"), ("created_at", "TIMESTAMP"), ("updated_at", "TIMESTAMP"),
+]
+
+# (correct, typo) pairs from scripts/typo_catalog.json
+TYPOS = [
+    ("CREATE TABLE", "CREAT TABLE"), ("ALTER TABLE", "ALTR TABLE"), ("INSERT INTO", "INSERT INT"),
+    ("FUNCTION", "FUNCTIO"), ("TABLE", "TABEL"),
+]
+
+CHANGESET_KINDS = ["table", "table", "index", "column", "insert", "update", "function"]
+
+
+class ChangelogGenerator:
+    """Seeded changeset writer; every file is streamed to disk as it is built"""
+
+    def __init__(self, table_width=12, plpgsql_lines=40, typo_density=0.01, pii_ratio=0.2, seed=42):
+        self.rng = random.Random(seed)
+        self.table_width = table_width
+        self.plpgsql_lines = plpgsql_lines
+        self.typo_density = typo_density
+        self.pii_ratio = pii_ratio
+        self.tables = []
+        self.counts = {"changesets": 0, "tables": 0, "functions": 0, "pii_columns": 0}
+        self.typo_changesets = []
+
+    def _columns(self, count):
+        names = set()
+        columns = []
+        while len(columns) < count:
+            pii = self.rng.random() < self.pii_ratio
+            name, sql_type = self.rng.choice(PII_COLUMNS if pii else PLAIN_COLUMNS)
+            suffix = 2
+            base = name
+            while name in names:
+                name = f"{base}_{suffix}"
+                suffix += 1
+            names.add(name)
+            columns.append((name, sql_type))
+            self.counts["pii_columns"] += pii
+        return columns
+
+    def _table(self, label):
+        table = f"app.t_{label}_{len(self.tables)}"
+        columns = self._columns(max(1, self.table_width - 1))
+        body = ",\n".join(f"    {name} {sql_type}" for name, sql_type in columns)
+        self.tables.append((table, columns))
+        self.counts["tables"] += 1
+        return (f"CREATE TABLE {table} (\n    id BIGSERIAL PRIMARY KEY,\n{body}\n);",
+                [f"DROP TABLE IF EXISTS {table} CASCADE;"])
+
+    def _index(self, serial):
+        table, columns = self.rng.choice(self.tables)
+        column = self.rng.choice(columns)[0]
+        index = f"idx_{table.split('.')[1]}_{column}_{serial}"
+        return f"CREATE INDEX {index} ON {table} ({column});", [f"DROP INDEX IF EXISTS app.{index};"]
+
+    def _column(self, serial):
+        table, _ = self.rng.choice(self.tables)
+        column = f"extra_{serial}"
+        return (f"ALTER TABLE {table} ADD COLUMN {column} VARCHAR(100);",
+                [f"ALTER TABLE {table} DROP COLUMN {column};"])
+
+    def _insert(self):
+        table, columns = self.rng.choice(self.tables)
+        column = columns[0][0]
+        rows = ",\n".join("    (DEFAULT)" for _ in range(self.rng.randint(1, 5)))
+        return (f"INSERT INTO {table} (id)\nVALUES\n{rows};",
+                [f"DELETE FROM {table} WHERE {column} IS NULL;"])
+
+    def _update(self, serial):
+        table, columns = self.rng.choice(self.tables)
+        column = columns[-1][0]
+        sql = f"UPDATE {table}\nSET {column} = {column}\nWHERE id < {serial};"
+        # Re-assigning a column to itself is its own inverse
+        return sql, [" ".join(sql.split())]
+
+    def _function(self, serial):
+        name = f"app.fn_generated_{serial}"
+        lines = [f"CREATE OR REPLACE FUNCTION {name}(p_limit INTEGER)",
+                 "RETURNS INTEGER AS $$",
+                 "DECLARE",
+                 "    v_total INTEGER := 0;",
+                 "BEGIN"]
+        for i in range(self.plpgsql_lines):
+            step = i % 4
+            if step == 0:
+                lines.append(f"    IF p_limit > {i} THEN")
+            elif step == 1:
+                lines.append(f"        v_total := v_total + {i};")
+            elif step == 2:
+                lines.append("    END IF;")
+            else:
+                lines.append(f"    -- step {i}: keep the running total bounded")
+        if self.plpgsql_lines % 4 in (1, 2):
+            lines.append("    END IF;")
+        lines += ["    RETURN v_total;", "END;", "$$ LANGUAGE plpgsql;"]
+        self.counts["functions"] += 1
+        return "\n".join(lines), [f"DROP FUNCTION IF EXISTS {name}(INTEGER);"]
+
+    def changeset(self, release, serial):
+        """(kind, header attributes, sql, rollback lines) for the next changeset"""
+        kind = self.rng.choice(CHANGESET_KINDS) if self.tables else "table"
+        if kind == "table":
+            sql, rollback = self._table(release.replace(".", "_"))
+        elif kind == "insert":
+            sql, rollback = self._insert()
+        else:
+            sql, rollback = getattr(self, f"_{kind}")(serial)
+        attributes = f"labels:{release},{kind} context:dev"
+        if kind == "function":
+            attributes += " splitStatements:false"
+        return kind, attributes, sql, rollback
+
+    def write_file(self, path, release, file_index, changesets):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("--liquibase formatted sql\n")
+            for n in range(changesets):
+                serial = self.counts["changesets"]
+                changeset_id = f"{release}-{file_index:03d}-{n:04d}"
+                kind, attributes, sql, rollback = self.changeset(release, serial)
+                if self.rng.random() < self.typo_density:
+                    for correct, typo in TYPOS:
+                        if correct in sql:
+                            sql = sql.replace(correct, typo, 1)
+                            self.typo_changesets.append(f"generator:{changeset_id}")
+                            break
+                f.write(f"\n--changeset generator:{changeset_id} {attributes}\n")
+                f.write(f"--comment: generated {kind} changeset\n")
+                f.write(sql)
+                f.write("\n")
+                for line in rollback:
+                    f.write(f"--rollback {line}\n")
+                self.counts["changesets"] += 1
+
+
+def create_generated_structure(base_path=".", releases=3, files_per_release=4, changesets_per_file=25,
+                               table_width=12, plpgsql_lines=40, typo_density=0.01, pii_ratio=0.2, seed=42):
+    """Write a seeded synthetic changelog tree of releases x files x changesets"""
+
+    base = Path(base_path) / "liquibase-generated"
+    generator = ChangelogGenerator(table_width, plpgsql_lines, typo_density, pii_ratio, seed)
+
+    print(f"Generating Liquibase changelogs at: {base.absolute()}")
+    (base / "changelogs" / "releases").mkdir(parents=True, exist_ok=True)
+    (base / "liquibase.properties").write_text(
+        "changeLogFile=changelogs/master.root.xml\n"
+        "url=jdbc:postgresql://localhost:5432/demo_db\n"
+        "username=postgres\n"
+        "password=postgres\n"
+        "driver=org.postgresql.Driver\n"
+        "liquibase.hub.mode=off\n")
+
+    with open(base / "changelogs" / "master.root.xml", "w", encoding="utf-8") as root:
+        root.write(XML_HEADER)
+        for r in range(1, releases + 1):
+            release = f"v{r}.0"
+            release_dir = base / "changelogs" / "releases" / release
+            release_dir.mkdir(parents=True, exist_ok=True)
+            with open(release_dir / f"release-{release}.xml", "w", encoding="utf-8") as release_xml:
+                release_xml.write(XML_HEADER)
+                if r == 1:
+                    (release_dir / "000-create-schema.sql").write_text(
+                        "--liquibase formatted sql\n\n"
+                        "--changeset generator:schema labels:schema context:dev\n"
+                        "CREATE SCHEMA IF NOT EXISTS app;\n"
+                        "--rollback DROP SCHEMA IF EXISTS app CASCADE;\n")
+                    release_xml.write('    <include file="000-create-schema.sql" relativeToChangelogFile="true"/>\n')
+                for i in range(1, files_per_release + 1):
+                    name = f"{i:03d}-generated.sql"
+                    generator.write_file(release_dir / name, release, i, changesets_per_file)
+                    release_xml.write(f'    <include file="{name}" relativeToChangelogFile="true"/>\n')
+                release_xml.write("\n</databaseChangeLog>\n")
+            root.write(f'    <include file="releases/{release}/release-{release}.xml" relativeToChangelogFile="true"/>\n')
+            print(f"  ✓ Release {release}: {files_per_release} file(s), {generator.counts['changesets']} changesets so far")
+        root.write("\n</databaseChangeLog>\n")
+
+    manifest = {
+        "parameters": {
+            "releases": releases, "files_per_release": files_per_release,
+            "changesets_per_file": changesets_per_file, "table_width": table_width,
+            "plpgsql_lines": plpgsql_lines, "typo_density": typo_density,
+            "pii_ratio": pii_ratio, "seed": seed,
+        },
+        "counts": dict(generator.counts, typos=len(generator.typo_changesets)),
+        "typo_changesets": generator.typo_changesets,
+    }
+    with open(base / "generated.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"\n✅ Generated {generator.counts['changesets']} changesets "
+          f"({len(generator.typo_changesets)} with injected typos) in {base}")
+    return base
+
 if __name__ == "__main__":
+    import argparse
     import sys
-    
-    # Allow custom base path as argument
-    base_path = sys.argv[1] if len(sys.argv) > 1 else "."
-    
+
+    parser = argparse.ArgumentParser(description="Create the Liquibase demo project or a generated changelog tree")
+    parser.add_argument("base_path", nargs="?", default=".", help="directory to create the project in")
+    parser.add_argument("--generate", action="store_true", help="write a seeded synthetic changelog tree instead of the demo")
+    parser.add_argument("--releases", type=int, default=3, help="number of releases (default: 3)")
+    parser.add_argument("--files", type=int, default=4, help="SQL files per release (default: 4)")
+    parser.add_argument("--changesets", type=int, default=25, help="changesets per file (default: 25)")
+    parser.add_argument("--table-width", type=int, default=12, help="columns per generated table (default: 12)")
+    parser.add_argument("--plpgsql-lines", type=int, default=40, help="PL/pgSQL body lines per function (default: 40)")
+    parser.add_argument("--typo-density", type=float, default=0.01, help="share of changesets with an injected typo (default: 0.01)")
+    parser.add_argument("--pii-ratio", type=float, default=0.2, help="share of personal-data columns (default: 0.2)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed (default: 42)")
+    args = parser.parse_args()
+
     try:
-        create_demo_structure(base_path)
+        if args.generate:
+            create_generated_structure(args.base_path, args.releases, args.files, args.changesets,
+                                       args.table_width, args.plpgsql_lines, args.typo_density,
+                                       args.pii_ratio, args.seed)
+        else:
+            create_demo_structure(args.base_path)
     except Exception as e:
         print(f"❌ Error creating demo structure: {e}")
         sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,121 @@
+###
+### Unbatched Bulk DML Check for Liquibase
+###
+### Flags UPDATE, DELETE and INSERT ... SELECT statements of a formatted-SQL
+### changeset that can reach a whole table in one transaction (see
+### bulk_dml_rules.py). Fires when a row-count manifest puts the table at
+### BULK_ROWS rows or more; without a manifest the statements are logged.
+###
+### SCRIPT_ARGS ROW_COUNTS=<manifest.json> (or BULK_DML_ROW_COUNTS) gives the
+### row counts, in the lock_check.py table-size format; BULK_ROWS=<n>
+### changes the threshold.
+###
+import os
+import sys
+import types
+import liquibase_utilities
+
+###
+### Rules live beside this script
+###
+SCRIPT_DIR = os.path.dirname(os.path.abspath(globals().get('__file__') or os.path.join('scripts', 'bulk_dml_check.py')))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+import bulk_dml_rules
+import changeset_index
+import lock_rules
+
+###
+### Retrieve handlers
+###
+liquibase_logger = liquibase_utilities.get_logger()
+liquibase_status = liquibase_utilities.get_status()
+
+###
+### Get the current changeset being processed
+###
+changeset = liquibase_utilities.get_changeset()
+filepath = changeset.getChangeLog().getPhysicalFilePath()
+
+###
+### Ignore if not sql file
+###
+ext = os.path.splitext(filepath)[-1].lower()
+if ext != ".sql":
+    liquibase_logger.info(f"{ext} file extension skipped.")
+    liquibase_status.fired = False
+    sys.exit(0)
+
+CACHE_DIR = os.environ.get("VALIDATE_SYNTAX_CACHE_DIR", ".liquibase-cache")
+
+# Survives re-execution of this script inside the same interpreter
+_memory_cache = sys.modules.setdefault("_bulk_dml_check_cache", types.ModuleType("_bulk_dml_check_cache"))
+
+def script_arg(name):
+    try:
+        return liquibase_utilities.get_arg(name)
+    except Exception:
+        return None
+
+###
+### Row-count manifest, read once per interpreter
+###
+counts_path = bulk_dml_rules.counts_path(script_arg("ROW_COUNTS"))
+sizes = None
+if counts_path:
+    cached = getattr(_memory_cache, "sizes", None)
+    if cached and cached[0] == counts_path:
+        sizes = cached[1]
+    else:
+        try:
+            sizes = lock_rules.TableSizes.load(counts_path)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            liquibase_status.fired = True
+            liquibase_status.message = f"Failed to read row counts {counts_path}: {str(e)}"
+            sys.exit(1)
+        _memory_cache.sizes = (counts_path, sizes)
+bulk_rows = int(script_arg("BULK_ROWS") or bulk_dml_rules.BULK_ROWS)
+
+###
+### Locate the changeset through the shared index
+###
+try:
+    current_changeset_id = f"{changeset.getAuthor()}:{changeset.getId()}"
+except:
+    current_changeset_id = None
+
+try:
+    file_index = changeset_index.load(filepath, CACHE_DIR, liquibase_logger.info)
+    entry = file_index.get(current_changeset_id) if current_changeset_id else None
+    lines = file_index.lines(entry) if entry else None
+except Exception as e:
+    liquibase_status.fired = True
+    liquibase_status.message = f"Failed to read file: {str(e)}"
+    sys.exit(1)
+
+if not entry:
+    liquibase_logger.info(f"Changeset {current_changeset_id} not found")
+    liquibase_status.fired = False
+    sys.exit(0)
+
+###
+### Only changesets with DML statements are tokenized again
+###
+findings = []
+if bulk_dml_rules.may_be_bulk(entry.statements):
+    findings = bulk_dml_rules.analyze_lines(lines, entry.start_line, sizes, bulk_rows)
+
+if findings:
+    report = bulk_dml_rules.format_report(current_changeset_id, findings)
+    liquibase_logger.info(report)
+    if any(severity == 'ERROR' for _, _, severity in findings):
+        liquibase_status.fired = True
+        liquibase_status.message = report
+        sys.exit(1)
+
+###
+### Success
+###
+liquibase_logger.info(f"✓ Bulk DML checked: {current_changeset_id}")
+liquibase_status.fired = False
+False
@@ -0,0 +1,280 @@
+###
+### Unbatched bulk DML rules for bulk_dml_check.py and bulk_dml_scan.py
+###
+### A data migration written as one UPDATE, DELETE or INSERT ... SELECT runs
+### as a single transaction: every row it touches stays locked and its WAL
+### cannot be recycled until the end, and replicas fall behind by the whole
+### statement. A statement is reported when it can reach a whole table: no
+### WHERE, or a WHERE that neither pins single keys nor bounds a key range or
+### LIMITs a subquery. With a row-count manifest (lock_rules.TableSizes) the
+### rows it can touch are estimated and only tables from BULK_ROWS rows up
+### are reported, as errors; without one every such statement is a warning.
+###
+### batched_changeset() rewrites a changeset into the keyset-batched form:
+### one DO block that walks the table's key in ordered slices of BATCH_SIZE
+### rows and commits after each, so no transaction outlives a slice.
+###
+import os
+import re
+
+import changeset_index
+import sql_tokenizer
+
+BULK_ROWS = 100_000
+BATCH_SIZE = 10_000
+DEFAULT_KEY = 'id'
+
+NAME = r'(?:"[^"]+"|[A-Za-z_][\w$]*)(?:\.(?:"[^"]+"|[A-Za-z_][\w$]*))*'
+IDENT = r'[A-Za-z_][\w$]*'
+
+UPDATE = re.compile(rf'^update\s+(?:only\s+)?({NAME})(?:\s+(?:as\s+)?(?!set\b)({IDENT}))?\s+set\b', re.I | re.S)
+DELETE = re.compile(rf'^delete\s+from\s+(?:only\s+)?({NAME})(?:\s+(?:as\s+)?(?!where\b|using\b|returning\b)({IDENT}))?',
+                    re.I | re.S)
+INSERT_SELECT = re.compile(rf'^insert\s+into\s+({NAME})\s*(?:\([^)]*\)\s*)?(?:overriding\s+\w+\s+value\s+)?select\b',
+                           re.I | re.S)
+SOURCE = re.compile(rf'\s*(?:only\s+)?({NAME})(?:\s+(?:as\s+)?(?!where\b|join\b|inner\b|left\b|right\b|full\b|cross\b|'
+                    rf'natural\b|group\b|order\b|limit\b|on\b|union\b)({IDENT}))?', re.I)
+CREATE_TABLE = re.compile(rf'^create\s+(?:(?:global\s+|local\s+)?(?:temp|temporary|unlogged)\s+)?table\s+'
+                          rf'(?:if\s+not\s+exists\s+)?({NAME})', re.I)
+
+TOKEN = re.compile(r"'(?:[^']|'')*'|\"[^\"]*\"|[()]|[A-Za-z_][\w$]*", re.S)
+LITERAL = r"(?:-?\d+(?:\.\d+)?|'(?:[^']|'')*'|\$\d+|:\w+|\?)"
+RANGE_BOUND = re.compile(rf'({IDENT}(?:\.{IDENT})?)\s*(>=?|<=?)\s*')
+WHITESPACE = re.compile(r'\s+')
+
+# Clauses that end a WHERE; the SELECT ones change meaning if the rows are split
+WHERE_ENDS = ('returning', 'group', 'order', 'limit', 'union', 'intersect', 'except', 'on', 'having', 'window',
+              'offset', 'fetch', 'for')
+NOT_SPLITTABLE = ('returning', 'group', 'limit', 'union', 'intersect', 'except', 'having', 'window', 'offset', 'fetch')
+
+def _last(name):
+    return name.replace('"', '').rsplit('.', 1)[-1].lower()
+
+def _top_level(text):
+    """(position, lower-case word) of every word outside parentheses and quotes"""
+    depth = 0
+    words = []
+    for match in TOKEN.finditer(text):
+        token = match.group()
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif depth == 0 and token[0] not in '\'"':
+            words.append((match.start(), token.lower()))
+    return words
+
+###
+### Detection
+###
+class Bulk:
+    """One DML statement that can reach a whole table"""
+    __slots__ = ('verb', 'table', 'scanned', 'source', 'alias', 'text', 'where', 'where_end', 'where_start', 'clauses')
+
+    def __init__(self, verb, table, source, alias, text, where_start, where, where_end, clauses):
+        self.verb = verb                # 'UPDATE', 'DELETE' or 'INSERT ... SELECT'
+        self.table = table              # table written to
+        self.source = source            # table whose rows are walked, as written (the SELECT's for INSERT)
+        self.scanned = _last(source)
+        self.alias = alias or source    # how the statement refers to it
+        self.text = text
+        self.where_start = where_start  # offset of the top-level WHERE keyword, or None
+        self.where = where              # its condition, as written
+        self.where_end = where_end      # offset where the condition ends
+        self.clauses = clauses          # top-level clause words after the WHERE
+
+    def __repr__(self):
+        return f"<Bulk {self.verb} {self.table}>"
+
+def _where(text, words, after):
+    """(where offset, condition, end offset, later clause words) of the first top-level WHERE after offset"""
+    later = [(pos, word) for pos, word in words if pos > after]
+    start = next((pos for pos, word in later if word == 'where'), None)
+    stops = [(pos, word) for i, (pos, word) in enumerate(later)
+             if word in WHERE_ENDS and (start is None or pos > start)
+             # ON ends the WHERE only as ON CONFLICT, not as a join condition
+             and (word != 'on' or (i + 1 < len(later) and later[i + 1][1] == 'conflict'))]
+    end = stops[0][0] if stops else len(text.rstrip().rstrip(';'))
+    clauses = {word for _, word in stops}
+    if start is None:
+        return None, '', end, clauses
+    return start, text[start + len('where'):end].strip(), end, clauses
+
+def bulk_statement(text):
+    """Bulk for one statement as written, or None when it is not bulk DML"""
+    text = text.strip()
+    words = _top_level(text)
+    match = UPDATE.match(text) or DELETE.match(text)
+    if match:
+        verb = 'UPDATE' if text[:6].lower() == 'update' else 'DELETE'
+        start, where, end, clauses = _where(text, words, match.end() - 1)
+        return Bulk(verb, _last(match.group(1)), match.group(1), match.group(2), text, start, where, end, clauses)
+
+    match = INSERT_SELECT.match(text)
+    if match:
+        select = match.end() - len('select')
+        source = next((pos for pos, word in words if pos > select and word == 'from'), None)
+        if source is None:
+            return None  # INSERT ... SELECT of constants
+        found = SOURCE.match(text, source + len('from'))
+        if not found:
+            return None
+        start, where, end, clauses = _where(text, words, found.end() - 1)
+        return Bulk('INSERT ... SELECT', _last(match.group(1)), found.group(1), found.group(2),
+                    text, start, where, end, clauses)
+    return None
+
+def may_be_bulk(statements):
+    """False when the indexed statements of a changeset hold no UPDATE, DELETE or INSERT ... SELECT.
+
+    INSERT heads cut at HEAD_LENGTH may hide the SELECT, so those are kept.
+    """
+    for _, _, keyword, _, head in statements:
+        if keyword in ('UPDATE', 'DELETE'):
+            return True
+        if keyword == 'INSERT' and (len(head) >= changeset_index.HEAD_LENGTH or 'select' in head.lower()):
+            return True
+    return False
+
+def is_bounded(bulk, key):
+    """True when the WHERE already limits the rows: single keys, a key range, or a LIMITed subquery"""
+    condition = WHITESPACE.sub(' ', bulk.where.lower())
+    if not condition:
+        return False
+    if re.search(r'\blimit\b|\bbetween\b', condition):
+        return True
+    keys = {key, DEFAULT_KEY}
+    for column in keys:
+        if re.search(rf'(?:^|[\s(.]){re.escape(column)}\s*(?:=\s*{LITERAL}|in\s*\(\s*{LITERAL}(?:\s*,\s*{LITERAL})*\s*\))',
+                     condition):
+            return True
+    lower = {m.group(1).split('.')[-1] for m in RANGE_BOUND.finditer(condition) if m.group(2)[0] == '>'}
+    upper = {m.group(1).split('.')[-1] for m in RANGE_BOUND.finditer(condition) if m.group(2)[0] == '<'}
+    return bool(lower & upper)
+
+def analyze_lines(lines, start_line, sizes=None, bulk_rows=BULK_ROWS, batch_size=BATCH_SIZE):
+    """Unbatched bulk DML of one changeset: [(file line, message, severity)]"""
+    scanner = sql_tokenizer.Scanner(keep_text=True)
+    for i, line in enumerate(lines, start_line):
+        scanner.feed(i, line)
+    statements = [(s.start_line, s.text) for s in scanner.close().statements if s.text]
+    created = {_last(m.group(1)) for m in (CREATE_TABLE.match(text) for _, text in statements) if m}
+
+    findings = []
+    for line, text in statements:
+        bulk = bulk_statement(text)
+        if bulk is None or bulk.scanned in created:
+            continue
+        key = (sizes.key(bulk.scanned) if sizes else None) or DEFAULT_KEY
+        if is_bounded(bulk, key):
+            continue
+        size = sizes.get(bulk.scanned) if sizes else None
+        if size is not None and size[0] < bulk_rows:
+            continue
+
+        scope = "every row of" if not bulk.where else "filtered rows of"
+        if bulk.verb == 'INSERT ... SELECT':
+            statement = f"INSERT ... SELECT into {bulk.table} from {scope} {bulk.scanned}"
+        else:
+            statement = f"{bulk.verb} of {scope} {bulk.table}"
+        estimate = ''
+        if size is not None:
+            estimate = f" ({'' if not bulk.where else 'up to '}{size[0]:,} rows)"
+        message = (f"{statement}{estimate} runs as one transaction: every row stays locked and its "
+                   f"WAL is retained until it commits; batch it by {key} in slices of {batch_size:,} rows with a "
+                   f"COMMIT after each (bulk_dml_scan.py --emit generates the changeset)")
+        findings.append((line, message, 'ERROR' if size is not None else 'WARNING'))
+    return findings
+
+def format_report(changeset_id, findings):
+    """Compact report in the shape validate_syntax.py prints"""
+    errors = sum(1 for f in findings if f[2] == 'ERROR')
+    warnings = sum(1 for f in findings if f[2] == 'WARNING')
+    report = f"\nUNBATCHED DML: {changeset_id}\n"
+    report += f"Errors: {errors} | Warnings: {warnings}\n"
+    report += f"{'-'*55}\n"
+    for line, message, severity in findings:
+        report += f"[{severity[:4]}] Line {line}: {message}\n"
+    report += f"{'-'*55}\n"
+    return report
+
+###
+### Keyset-batched rewrite
+###
+def _sliced(bulk, key, number):
+    """The statement restricted to one key slice, or None when splitting would change its result"""
+    if bulk.clauses & set(NOT_SPLITTABLE):
+        return None
+    column = f"{bulk.alias}.{key}"
+    condition = f"{column} >= lower_{number} AND {column} <= upper_{number}"
+    if bulk.where:
+        condition += f"\n   AND ({bulk.where})"
+    text = bulk.text.rstrip().rstrip(';').rstrip()
+    head = text[:bulk.where_end if bulk.where_start is None else bulk.where_start].rstrip()
+    tail = text[bulk.where_end:].strip()
+    return f"{head}\n WHERE {condition}" + (f"\n{tail}" if tail else '')
+
+
+def _indent(text, prefix):
+    return '\n'.join(prefix + line if line.strip() else line for line in text.splitlines())
+
+def batched_changeset(entry, lines, sizes=None, key=None, batch_size=BATCH_SIZE):
+    """Formatted-SQL text of a keyset-batched equivalent of one changeset.
+
+    Returns (text, problems); problems lists the statements that could not
+    be sliced, and text is None when nothing could be.
+    """
+    scanner = sql_tokenizer.Scanner(keep_text=True)
+    for i, line in enumerate(lines, entry.start_line):
+        scanner.feed(i, line)
+    statements = [s for s in scanner.close().statements if s.text]
+
+    declarations, body, problems = [], [], []
+    for statement in statements:
+        bulk = bulk_statement(statement.text)
+        column = bulk and (key or (sizes.key(bulk.scanned) if sizes else None) or DEFAULT_KEY)
+        if bulk is None or is_bounded(bulk, column):
+            body.append(statement.text.rstrip().rstrip(';') + ';')
+            continue
+        number = len(declarations) // 2 + 1
+        sliced = _sliced(bulk, column, number)
+        if sliced is None:
+            problems.append(f"line {statement.start_line}: {bulk.verb} with "
+                            f"{', '.join(sorted(bulk.clauses & set(NOT_SPLITTABLE))).upper()} cannot be split into slices")
+            body.append(statement.text.rstrip().rstrip(';') + ';')
+            continue
+        table = bulk.source
+        declarations += [f"lower_{number} {table}.{column}%TYPE;", f"upper_{number} {table}.{column}%TYPE;"]
+        body.append('\n'.join([
+            f"-- {bulk.verb} {bulk.table}, {batch_size:,} {bulk.scanned} rows per transaction",
+            f"SELECT min({column}) INTO lower_{number} FROM {table};",
+            f"WHILE lower_{number} IS NOT NULL LOOP",
+            f"    SELECT max({column}) INTO upper_{number}",
+            f"      FROM (SELECT {column} FROM {table} WHERE {column} >= lower_{number}"
+            f" ORDER BY {column} LIMIT {batch_size}) slice;",
+            _indent(sliced, '    ') + ';',
+            "    COMMIT;",
+            f"    SELECT min({column}) INTO lower_{number} FROM {table} WHERE {column} > upper_{number};",
+            "END LOOP;",
+        ]))
+    if not declarations:
+        return None, problems or ["no unbatched UPDATE, DELETE or INSERT ... SELECT to slice"]
+
+    header = lines[0].rstrip('\r\n') if lines else f"--changeset {entry.id}"
+    for attribute in ('runInTransaction', 'splitStatements'):
+        header = re.sub(rf'\s+{attribute}:\S+', '', header, flags=re.I)
+    header += " runInTransaction:false splitStatements:false"
+    text = [header,
+            f"--comment: Keyset-batched: {batch_size:,} rows per transaction, committed slice by slice",
+            "DO $$",
+            "DECLARE",
+            _indent('\n'.join(declarations), '    '),
+            "BEGIN",
+            _indent('\n\n'.join(body), '    '),
+            "END $$;"]
+    text += [f"--rollback {rollback}" for _, rollback in entry.rollback]
+    return '\n'.join(text) + '\n', problems
+
+def counts_path(setting=None):
+    """Row-count manifest from a script argument, BULK_DML_ROW_COUNTS or LOCK_CHECK_TABLE_SIZES, or None"""
+    return setting or os.environ.get("BULK_DML_ROW_COUNTS") or os.environ.get("LOCK_CHECK_TABLE_SIZES") or None
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Batch Unbatched-DML Scanner and Keyset-Batching Generator
+
+Runs the bulk_dml_check.py rules over every formatted-SQL changeset of a
+changelog tree: UPDATE, DELETE and INSERT ... SELECT statements that can
+reach a whole table in a single transaction. With a row-count manifest
+(the lock_scan.py table-size format, optionally with a "key" per table)
+the rows each statement can touch are estimated.
+
+--emit prints a keyset-batched equivalent of one changeset instead: a DO
+block (runInTransaction:false, splitStatements:false) that walks the
+table's key in ordered slices and commits after each, with the original
+rollback. Review it, then replace the changeset with it before it is
+deployed; a changeset that already ran changes its checksum.
+
+Usage:
+  python scripts/bulk_dml_scan.py                                   # liquibase.properties changeLogFile
+  python scripts/bulk_dml_scan.py --row-counts counts.json changelog-sql/main.root.xml
+  python scripts/bulk_dml_scan.py --emit architect:v2.0-003 --key customer_id --batch-size 5000
+  python scripts/bulk_dml_scan.py --json ...
+
+Exit code: 0 when no large unbatched DML is found (or the changeset was
+emitted), 1 on errors (and warnings with --strict, or when --emit finds
+nothing to batch), 2 when the changelog tree or the manifest cannot be read.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+import bulk_dml_rules
+import changeset_index
+import lock_rules
+import validate_changelog
+
+
+def scan_file(path, sizes=None, bulk_rows=bulk_dml_rules.BULK_ROWS, batch_size=bulk_dml_rules.BATCH_SIZE):
+    """(path, changeset count, [(changeset id, line, severity, message)])"""
+    index = changeset_index.load(path)
+    findings = []
+    seen = set()
+    for entry in index:
+        if entry.id in seen:
+            continue
+        seen.add(entry.id)
+        if not bulk_dml_rules.may_be_bulk(entry.statements):
+            continue
+        for line, message, severity in bulk_dml_rules.analyze_lines(index.lines(entry), entry.start_line,
+                                                                    sizes, bulk_rows, batch_size):
+            findings.append((entry.id, line, severity, message))
+    return path, len(seen), findings
+
+
+def run(files, jobs, scanner):
+    if jobs > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(files))) as pool:
+            return list(pool.map(scanner, files, chunksize=4))
+    return [scanner(path) for path in files]
+
+
+def emit(files, changeset_id, sizes, key, batch_size):
+    """Print the batched form of the first changeset called changeset_id"""
+    for path in files:
+        index = changeset_index.load(path)
+        entry = index.get(changeset_id)
+        if entry is None:
+            continue
+        text, problems = bulk_dml_rules.batched_changeset(entry, index.lines(entry), sizes, key, batch_size)
+        for problem in problems:
+            print(f"⚠️  {os.path.relpath(path)} {changeset_id} {problem}", file=sys.stderr)
+        if text is None:
+            return 1
+        print(text, end='')
+        return 0
+    print(f"❌ Changeset {changeset_id} not found", file=sys.stderr)
+    return 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find unbatched bulk DML and generate keyset-batched changesets")
+    parser.add_argument('paths', nargs='*', help="root changelog(s), SQL files or directories")
+    parser.add_argument('--search-path', default='.', help="base for non-relative includes (default: .)")
+    parser.add_argument('--row-counts', default=bulk_dml_rules.counts_path(),
+                        help="row-count manifest JSON (default: $BULK_DML_ROW_COUNTS or $LOCK_CHECK_TABLE_SIZES)")
+    parser.add_argument('--bulk-rows', type=int, default=bulk_dml_rules.BULK_ROWS,
+                        help=f"rows from which a table counts as large (default: {bulk_dml_rules.BULK_ROWS})")
+    parser.add_argument('--batch-size', type=int, default=bulk_dml_rules.BATCH_SIZE,
+                        help=f"rows per transaction (default: {bulk_dml_rules.BATCH_SIZE})")
+    parser.add_argument('--emit', metavar='AUTHOR:ID', help="print a keyset-batched equivalent of this changeset")
+    parser.add_argument('--key', help="key column to batch by for --emit (default: the manifest's, else id)")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--strict', action='store_true', help="also fail on warnings")
+    parser.add_argument('--json', action='store_true', help="print findings as JSON")
+    args = parser.parse_args(argv)
+
+    sizes = None
+    if args.row_counts:
+        try:
+            sizes = lock_rules.TableSizes.load(args.row_counts)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            print(f"❌ Cannot read row counts {args.row_counts}: {e}")
+            return 2
+
+    started = time.perf_counter()
+    try:
+        files = validate_changelog.collect_sql_files(args.paths or [validate_changelog.default_changelog()],
+                                                     args.search_path)
+        if args.emit:
+            return emit(files, args.emit, sizes, args.key, args.batch_size)
+        results = run(files, args.jobs, partial(scan_file, sizes=sizes, bulk_rows=args.bulk_rows,
+                                                batch_size=args.batch_size))
+    except (OSError, SyntaxError, UnicodeDecodeError) as e:
+        print(f"❌ Cannot read changelog tree: {e}")
+        return 2
+    elapsed = time.perf_counter() - started
+
+    total = sum(count for _, count, _ in results)
+    findings = [{'file': os.path.relpath(path), 'changeset': changeset_id, 'line': line,
+                 'severity': severity, 'message': message}
+                for path, _, found in results for changeset_id, line, severity, message in found]
+    errors = sum(1 for f in findings if f['severity'] == 'ERROR')
+    warnings = len(findings) - errors
+
+    if args.json:
+        print(json.dumps(findings, indent=2))
+    else:
+        for f in findings:
+            print(f"{f['file']}:{f['line']}: [{f['severity'][:4]}] {f['changeset']}: {f['message']}")
+        print(f"\nScanned {total} changeset(s) in {len(files)} file(s) in {elapsed:.2f}s: "
+              f"{errors} error(s), {warnings} warning(s)"
+              f"{'' if sizes else ' (no row-count manifest)'}")
+    return 1 if errors or (args.strict and warnings) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+###
+### Changelog include resolution
+###
+### Walks <include> and <includeAll> elements of XML changelogs the way
+### Liquibase does and returns every changelog file in execution order.
+###
+### load_graph() is the one resolver, and doubles as a precheck: files are
+### read and parsed concurrently, a level of the include tree at a time,
+### and the result is an IncludeGraph with every file's sha256, size and
+### changeset count, its includes, and any missing file or include cycle.
+### The graph is saved as a JSON manifest under <cache dir>/manifests/;
+### files whose mtime and size still match the manifest are not read again,
+### except changelogs with an <includeAll>, whose directories are listed
+### afresh on every run.
+###
+###   python scripts/changelog_includes.py [root changelog] [--manifest PATH]
+###
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+CHANGELOG_EXTENSIONS = ('.xml', '.sql', '.yaml', '.yml', '.json')
+CACHE_DIR = os.environ.get("VALIDATE_SYNTAX_CACHE_DIR", ".liquibase-cache")
+MANIFEST_VERSION = 2
+
+# Changeset markers per changelog format
+SQL_CHANGESET = re.compile(rb'^[ \t\f\v]*--[ \t\f\v]*changeset(?=\s)', re.IGNORECASE | re.MULTILINE)
+STRUCTURED_CHANGESET = re.compile(rb'(?:^|[\s{,])["\']?changeSet["\']?\s*:', re.MULTILINE)
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+def _is_true(value):
+    return str(value).strip().lower() == 'true'
+
+def _resolve(path, parent, relative, search_path):
+    if path.startswith('classpath:'):
+        path = path[len('classpath:'):]
+    if os.path.isabs(path):
+        return os.path.normpath(path)
+    base = os.path.dirname(parent) if relative else search_path
+    return os.path.normpath(os.path.join(base, path))
+
+def list_changelogs(directory):
+    """Files under directory in Liquibase's includeAll order (sorted by path)"""
+    found = []
+    for root, dirs, names in os.walk(directory):
+        dirs.sort()
+        for name in names:
+            if name.lower().endswith(CHANGELOG_EXTENSIONS):
+                found.append(os.path.join(root, name))
+    return sorted(found, key=lambda p: os.path.relpath(p, directory).replace(os.sep, '/'))
+
+def _includes(path, root, search_path):
+    """([included files], [missing includeAll directories]) of one parsed XML changelog"""
+    children = []
+    missing = []
+    for element in root.iter():
+        name = _local_name(element.tag)
+        relative = _is_true(element.get('relativeToChangelogFile', 'false'))
+        if name == 'include' and element.get('file'):
+            children.append(_resolve(element.get('file'), path, relative, search_path))
+        elif name == 'includeAll' and element.get('path'):
+            directory = _resolve(element.get('path'), path, relative, search_path)
+            if os.path.isdir(directory):
+                children.extend(list_changelogs(directory))
+            else:
+                missing.append(directory)
+    return children, missing
+
+###
+### Include graph precheck
+###
+class ChangelogFile:
+    """One node of the include graph"""
+    __slots__ = ('path', 'sha256', 'size', 'mtime_ns', 'changesets', 'includes', 'error', 'include_all')
+
+    def __init__(self, path, sha256, size, mtime_ns, changesets, includes, error=None, include_all=False):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.changesets = changesets
+        self.includes = includes
+        self.error = error
+        self.include_all = include_all  # includes depend on directory listings, not just this file
+
+    def to_json(self):
+        return {'path': self.path, 'sha256': self.sha256, 'size': self.size, 'mtime_ns': self.mtime_ns,
+                'changesets': self.changesets, 'includes': self.includes, 'error': self.error,
+                'include_all': self.include_all}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['path'], data['sha256'], data['size'], data['mtime_ns'], data['changesets'],
+                   data['includes'], data.get('error'), data['include_all'])
+
+class IncludeGraph:
+    """Files reachable from a root changelog, in Liquibase execution order"""
+
+    def __init__(self, root, search_path, nodes, order, missing, cycles):
+        self.root = root
+        self.search_path = search_path
+        self.nodes = nodes            # path -> ChangelogFile
+        self.order = order            # execution order, each file once
+        self.missing = missing        # [(missing path, including file)]
+        self.cycles = cycles          # [[path, ..., path]]
+        self.reused = 0
+
+    @property
+    def files(self):
+        return list(self.order)
+
+    @property
+    def errors(self):
+        return [(path, self.nodes[path].error) for path in self.order if self.nodes[path].error]
+
+    @property
+    def ok(self):
+        return not (self.missing or self.cycles or self.errors)
+
+    @property
+    def changesets(self):
+        return sum(self.nodes[path].changesets for path in self.order)
+
+    def problems(self):
+        """Human-readable list of everything that would stop Liquibase"""
+        found = [f"Changelog not found: {path}" + (f" (included from {parent})" if parent else "")
+                 for path, parent in self.missing]
+        found.extend("Include cycle: " + " -> ".join(cycle) for cycle in self.cycles)
+        found.extend(f"Cannot parse {path}: {error}" for path, error in self.errors)
+        return found
+
+    def to_json(self):
+        return {'version': MANIFEST_VERSION, 'root': self.root, 'search_path': self.search_path,
+                'order': self.order, 'missing': self.missing, 'cycles': self.cycles,
+                'changesets': self.changesets, 'files': [self.nodes[p].to_json() for p in sorted(self.nodes)]}
+
+def count_changesets(path, content):
+    if path.lower().endswith('.sql'):
+        return len(SQL_CHANGESET.findall(content))
+    if path.lower().endswith('.xml'):
+        return 0  # counted from the parsed tree
+    return len(STRUCTURED_CHANGESET.findall(content))
+
+def load_file(path, search_path, previous=None):
+    """Read, hash and parse one changelog; reuses previous when mtime and size match.
+
+    A changelog with an <includeAll> is always parsed again: what it includes
+    changes whenever files are added to or removed from its directories.
+    Returns (ChangelogFile, [missing includeAll directories]), or
+    (previous, None) when previous was reused.
+    """
+    st = os.stat(path)
+    if previous is not None and previous.mtime_ns == st.st_mtime_ns and previous.size == st.st_size \
+            and previous.error is None and not previous.include_all:
+        return previous, None
+    with open(path, 'rb') as f:
+        content = f.read()
+    includes = []
+    missing = []
+    error = None
+    include_all = False
+    changesets = count_changesets(path, content)
+    if path.lower().endswith('.xml'):
+        try:
+            root = ET.fromstring(content)
+            includes, missing = _includes(path, root, search_path)
+            names = [_local_name(element.tag) for element in root.iter()]
+            changesets = names.count('changeSet')
+            include_all = 'includeAll' in names
+        except ET.ParseError as e:
+            error = str(e)
+    node = ChangelogFile(path, hashlib.sha256(content).hexdigest(), st.st_size, st.st_mtime_ns,
+                         changesets, includes, error, include_all)
+    return node, missing
+
+def _manifest_path(root, cache_dir):
+    digest = hashlib.sha1(root.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, 'manifests', f"{digest}.json")
+
+def read_manifest(path):
+    """{path: ChangelogFile} of a manifest file, or {} when it cannot be used"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != MANIFEST_VERSION:
+            return {}
+        return {entry['path']: ChangelogFile.from_json(entry) for entry in data['files']}
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+def write_manifest(graph, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(graph.to_json(), f, indent=1)
+    os.replace(tmp, path)
+
+def load_graph(root_path, search_path='.', cache_dir=CACHE_DIR, jobs=8, manifest=None):
+    """Resolve the include graph of root_path, loading each level concurrently.
+
+    With a cache_dir (or an explicit manifest path) the previous manifest is
+    reused for unchanged files and the new one is written back.
+    """
+    root = os.path.normpath(os.path.abspath(root_path))
+    search_path = os.path.abspath(search_path)
+    manifest = manifest or (_manifest_path(root, cache_dir) if cache_dir else None)
+    previous = read_manifest(manifest) if manifest else {}
+
+    nodes = {}
+    missing = []
+    reused = 0
+    frontier = [(root, None)]
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while frontier:
+            batch = []
+            for path, parent in frontier:
+                if path in nodes or any(path == p for p, _ in batch):
+                    continue
+                if not os.path.isfile(path):
+                    if (path, parent) not in missing:
+                        missing.append((path, parent))
+                    continue
+                batch.append((path, parent))
+            loaded = list(pool.map(lambda item: load_file(item[0], search_path, previous.get(item[0])), batch))
+            frontier = []
+            for (path, _), (node, missing_dirs) in zip(batch, loaded):
+                if missing_dirs is None:
+                    reused += 1
+                nodes[path] = node
+                missing.extend((directory, path) for directory in missing_dirs or [])
+                frontier.extend((child, path) for child in node.includes)
+
+    order, cycles = _walk(root, nodes)
+    graph = IncludeGraph(root, search_path, nodes, order, missing, cycles)
+    graph.reused = reused
+    if manifest:
+        try:
+            write_manifest(graph, manifest)
+        except OSError:
+            pass
+    return graph
+
+def _walk(root, nodes):
+    """Depth-first document-order walk: (execution order, include cycles)"""
+    order = []
+    cycles = []
+    seen = set()
+    if root not in nodes:
+        return order, cycles
+    stack = [root]
+    on_path = {root}
+    iterators = [iter(nodes[root].includes)]
+    seen.add(root)
+    order.append(root)
+    while iterators:
+        child = next(iterators[-1], None)
+        if child is None:
+            iterators.pop()
+            on_path.discard(stack.pop())
+            continue
+        if child in on_path:
+            cycles.append(stack[stack.index(child):] + [child])
+            continue
+        if child in seen or child not in nodes:
+            continue
+        seen.add(child)
+        order.append(child)
+        stack.append(child)
+        on_path.add(child)
+        iterators.append(iter(nodes[child].includes))
+    return order, cycles
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check a changelog include graph and write its manifest")
+    parser.add_argument('changelog', nargs='?', default=os.path.join('changelog-sql', 'main.root.xml'),
+                        help="root changelog (default: changelog-sql/main.root.xml)")
+    parser.add_argument('--search-path', default='.', help="base for non-relative includes (default: .)")
+    parser.add_argument('--manifest', help="manifest JSON to write (default: under the cache directory)")
+    parser.add_argument('-j', '--jobs', type=int, default=8, help="files loaded at once (default: 8)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="list every file")
+    args = parser.parse_args(argv)
+
+    graph = load_graph(args.changelog, args.search_path, jobs=args.jobs, manifest=args.manifest)
+    if args.verbose:
+        for path in graph.order:
+            node = graph.nodes[path]
+            print(f"  {node.changesets:6d}  {node.sha256[:12]}  {os.path.relpath(path)}")
+    for problem in graph.problems():
+        print(f"❌ {problem}")
+    print(f"Resolved {len(graph.order)} file(s) with {graph.changesets} changeset(s) from "
+          f"{os.path.relpath(graph.root)}: {len(graph.problems())} problem(s), {graph.reused} unchanged")
+    return 0 if graph.ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
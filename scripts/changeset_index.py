@@ -0,0 +1,261 @@
+###
+### Shared changeset index for formatted-SQL checks
+###
+### Any check in scripts/ can ask for the index of a formatted-SQL file
+### instead of parsing it again:
+###
+###   import changeset_index
+###   index = changeset_index.load(path)
+###   entry = index.get("author:id")
+###   entry.start_line, entry.end_line, entry.start_byte, entry.end_byte
+###   entry.labels, entry.contexts, entry.attributes
+###   entry.rollback      [(line, text)] of its '--rollback' lines
+###   entry.statements    [(start_line, end_line, keyword, terminated, head)]
+###   index.lines(entry)  the changeset's own lines, decoded on demand
+###   index.blocks()      (id, start_line, lines) of every changeset, untokenized
+###
+### Headers are found by changeset_locator's memory-mapped scan and
+### changesets are tokenized with sql_tokenizer. Line numbers are file line
+### numbers; a statement's head is its text with whitespace collapsed, cut at
+### HEAD_LENGTH characters.
+###
+### Looking up one changeset costs its own bytes: the header offsets and the
+### content sha256 come from changeset_locator.load_index(), whose sidecar is
+### keyed by path + mtime + size, and get() tokenizes only that changeset.
+### Iterating the index tokenizes every changeset once and keeps the result
+### under <cache dir>/changesets/<digest>.json, so it is rebuilt only when
+### the file changes and is shared by every copy of the same file. Indexes
+### are also kept in the interpreter (per path + mtime + size).
+###
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import types
+
+import changeset_locator
+import sql_tokenizer
+
+CACHE_DIR = os.environ.get("VALIDATE_SYNTAX_CACHE_DIR", ".liquibase-cache")
+INDEX_VERSION = 1
+HEAD_LENGTH = 160
+
+HEADER_ATTRIBUTE = re.compile(r'([A-Za-z]+):("[^"]*"|\'[^\']*\'|\S+)')
+CONTEXT_ATTRIBUTES = ('context', 'contexts', 'contextfilter')
+WHITESPACE = re.compile(r'\s+')
+
+# Survives re-execution of the check scripts inside the same interpreter
+_memory_cache = sys.modules.setdefault("_changeset_index_cache", types.ModuleType("_changeset_index_cache"))
+if not hasattr(_memory_cache, "indexes"):
+    _memory_cache.indexes = {}
+
+_tokenizer_fingerprint = None
+
+def tokenizer_fingerprint():
+    """Hash of this module and the tokenizer; cached indexes carry it"""
+    global _tokenizer_fingerprint
+    if _tokenizer_fingerprint is None:
+        digest = hashlib.sha256(str(INDEX_VERSION).encode('utf-8'))
+        for path in (__file__, sql_tokenizer.__file__):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        _tokenizer_fingerprint = digest.hexdigest()
+    return _tokenizer_fingerprint
+
+###
+### Index
+###
+class Changeset:
+    """One changeset of an indexed file; attributes, rollback and statements are tokenized on first use"""
+    __slots__ = ('id', 'start_line', 'end_line', 'start_byte', 'end_byte', 'path', '_details')
+
+    def __init__(self, changeset_id, start_line, end_line, start_byte, end_byte, path=None, details=None):
+        self.id = changeset_id
+        self.start_line = start_line
+        self.end_line = end_line
+        self.start_byte = start_byte
+        self.end_byte = end_byte
+        self.path = path
+        self._details = details       # (attributes, rollback, statements)
+
+    @property
+    def details(self):
+        if self._details is None:
+            self._details = _tokenize(changeset_locator.read_lines(self.path, self.range), self.start_line)
+        return self._details
+
+    @property
+    def attributes(self):
+        return self.details[0]
+
+    @property
+    def rollback(self):
+        return self.details[1]
+
+    @property
+    def statements(self):
+        return self.details[2]
+
+    @property
+    def labels(self):
+        return _split_list(self.attributes.get('labels', ''))
+
+    @property
+    def contexts(self):
+        return _split_list(next((v for k, v in self.attributes.items() if k.lower() in CONTEXT_ATTRIBUTES), ''))
+
+    @property
+    def author(self):
+        return self.id.partition(':')[0]
+
+    @property
+    def range(self):
+        """(start_line, end_line, start_byte, end_byte), as changeset_locator returns it"""
+        return (self.start_line, self.end_line, self.start_byte, self.end_byte)
+
+    def __repr__(self):
+        return f"<Changeset {self.id} lines {self.start_line}-{self.end_line}>"
+
+    def to_json(self):
+        return [self.id, self.start_line, self.end_line, self.start_byte, self.end_byte] + list(self.details)
+
+    @classmethod
+    def from_json(cls, data, path=None):
+        changeset_id, start_line, end_line, start_byte, end_byte, attributes, rollback, statements = data
+        return cls(changeset_id, start_line, end_line, start_byte, end_byte, path,
+                   (attributes, [tuple(r) for r in rollback], [tuple(s) for s in statements]))
+
+class FileIndex:
+    """Every changeset of one file, in file order; get(id) follows Liquibase's first-wins rule"""
+
+    def __init__(self, path, headers, cache_dir=CACHE_DIR, log=None):
+        self.path = path
+        self.headers = headers        # changeset_locator.ChangesetIndex
+        self.digest = headers.digest
+        self.cache_dir = cache_dir
+        self.log = log
+        self._changesets = None
+        self._by_id = None
+
+    def __len__(self):
+        return len(self.headers)
+
+    def __iter__(self):
+        return iter(self.changesets)
+
+    @property
+    def ids(self):
+        return self.headers.ids
+
+    @property
+    def changesets(self):
+        """Every changeset, tokenized; read from or written to the digest sidecar"""
+        if self._changesets is None:
+            self._changesets = _load_changesets(self)
+        return self._changesets
+
+    def get(self, changeset_id):
+        if self._changesets is not None:
+            if self._by_id is None:
+                by_id = {}
+                for entry in self._changesets:
+                    by_id.setdefault(entry.id, entry)
+                self._by_id = by_id
+            return self._by_id.get(changeset_id)
+        entry = self.headers.entry(changeset_id)
+        return Changeset(changeset_id, *entry, path=self.path) if entry else None
+
+    def lines(self, entry):
+        """Lines of one changeset, decoded from its byte range only"""
+        return changeset_locator.read_lines(self.path, entry.range)
+
+    def blocks(self):
+        """(id, start_line, lines) of every changeset in file order, from one read of the file"""
+        with open(self.path, 'rb') as f:
+            content = f.read()
+        for position, changeset_id in enumerate(self.headers.ids):
+            start_line, _, start_byte, end_byte = self.headers.at(position)
+            text = content[start_byte:end_byte].decode('utf-8')
+            yield changeset_id, start_line, io.StringIO(text, newline=None).readlines()
+
+def _split_list(value):
+    value = value.strip().strip('"\'')
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def header_attributes(header):
+    """name:value pairs that follow author:id on a '--changeset' line"""
+    match = changeset_locator.CHANGESET_ID.search(header.encode('utf-8'))
+    rest = header[match.end():] if match else ''
+    return {name: value.strip('"\'') for name, value in HEADER_ATTRIBUTE.findall(rest)}
+
+def _head(text):
+    return WHITESPACE.sub(' ', text or '').strip()[:HEAD_LENGTH]
+
+def _tokenize(lines, start_line):
+    """(attributes, rollback, statements) of one changeset's lines"""
+    scanner = sql_tokenizer.Scanner(keep_text=True)
+    for i, line in enumerate(lines, start_line):
+        scanner.feed(i, line)
+    structure = scanner.close()
+    statements = [(s.start_line, s.end_line, s.keyword, s.terminated, _head(s.text))
+                  for s in structure.statements]
+    return header_attributes(lines[0]) if lines else {}, structure.rollback, statements
+
+def index_changeset(changeset_id, lines, start_line, start_byte, end_byte, path=None):
+    """Tokenize one changeset's lines into a Changeset"""
+    return Changeset(changeset_id, start_line, start_line + len(lines) - 1, start_byte, end_byte, path,
+                     _tokenize(lines, start_line))
+
+def build(path, headers):
+    """Tokenize every changeset headers lists; the file is read one changeset at a time"""
+    changesets = []
+    for position, changeset_id in enumerate(headers.ids):
+        entry = headers.at(position)
+        lines = changeset_locator.read_lines(path, entry)
+        changesets.append(index_changeset(changeset_id, lines, entry[0], entry[2], entry[3], path))
+    return changesets
+
+###
+### Cache
+###
+def _cache_path(digest, cache_dir):
+    return os.path.join(cache_dir, 'changesets', f"{digest}.json")
+
+def _load_changesets(file_index):
+    sidecar = _cache_path(file_index.digest, file_index.cache_dir)
+    try:
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('tokenizer') == tokenizer_fingerprint() and data.get('digest') == file_index.digest:
+            return [Changeset.from_json(c, file_index.path) for c in data['changesets']]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    changesets = build(file_index.path, file_index.headers)
+    try:
+        os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+        tmp = f"{sidecar}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'tokenizer': tokenizer_fingerprint(), 'digest': file_index.digest,
+                       'changesets': [entry.to_json() for entry in changesets]}, f)
+        os.replace(tmp, sidecar)
+    except OSError as e:
+        if file_index.log:
+            file_index.log(f"Changeset index cache not written: {str(e)}")
+    return changesets
+
+def load(path, cache_dir=CACHE_DIR, log=None):
+    """Return the FileIndex for path; only its header offsets are read until changesets are iterated"""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+
+    cached = _memory_cache.indexes.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    index = FileIndex(path, changeset_locator.load_index(path, cache_dir, log), cache_dir, log)
+    _memory_cache.indexes[path] = (key, index)
+    return index
@@ -0,0 +1,189 @@
+###
+### Memory-mapped changeset locator for formatted-SQL files
+###
+### A formatted-SQL file is mapped, not read: one regex pass over the mapping,
+### a window at a time, finds every '--changeset' header, and the index keeps
+### only their byte offsets and line numbers in two array('q') columns plus
+### the list of IDs.
+### Looking up a changeset decodes just its own byte range, so the memory a
+### check needs is bounded by the largest changeset rather than the file;
+### hundred-megabyte seed files never get loaded whole.
+###
+### The same pass takes the sha256 of the content. Indexes are cached in the
+### interpreter and in an on-disk sidecar keyed by path + mtime + size, so
+### later invocations for the same file go straight to their own block and
+### never read the rest of it.
+###
+import array
+import hashlib
+import io
+import json
+import mmap
+import os
+import re
+import sys
+import types
+
+CACHE_DIR = os.environ.get("VALIDATE_SYNTAX_CACHE_DIR", ".liquibase-cache")
+CACHE_VERSION = 3
+
+# Same header rule as a per-line '^\s*--\s*changeset\s+' match
+HEADER = re.compile(rb'^[ \t\f\v]*--[ \t\f\v]*changeset(?=\s)', re.IGNORECASE | re.MULTILINE)
+CHANGESET_ID = re.compile(rb'changeset\s+([^:\s]+):([^\s]+)', re.IGNORECASE)
+
+# Survives re-execution of the check scripts inside the same interpreter
+_memory_cache = sys.modules.setdefault("_changeset_locator_cache", types.ModuleType("_changeset_locator_cache"))
+if not hasattr(_memory_cache, "indexes"):
+    _memory_cache.indexes = {}
+
+class ChangesetIndex:
+    """Header offsets of one file; entry(id) -> (start_line, end_line, start_byte, end_byte)"""
+
+    def __init__(self, ids, offsets, lines, size, total_lines, digest=None):
+        self.ids = ids
+        self.offsets = offsets
+        self.lines = lines
+        self.size = size
+        self.total_lines = total_lines
+        self.digest = digest          # sha256 of the content
+        self._positions = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def entry(self, changeset_id):
+        if self._positions is None:
+            positions = {}
+            for position, cid in enumerate(self.ids):
+                # Liquibase resolves author:id to the first block that carries it
+                positions.setdefault(cid, position)
+            self._positions = positions
+        position = self._positions.get(changeset_id)
+        if position is None:
+            return None
+        return self.at(position)
+
+    def at(self, position):
+        """Range of the changeset at position, in file order"""
+        if position + 1 < len(self.ids):
+            return (self.lines[position], self.lines[position + 1] - 1,
+                    self.offsets[position], self.offsets[position + 1])
+        return (self.lines[position], self.total_lines, self.offsets[position], self.size)
+
+    def to_json(self):
+        return {'ids': self.ids, 'offsets': self.offsets.tolist(), 'lines': self.lines.tolist(),
+                'size': self.size, 'total_lines': self.total_lines, 'digest': self.digest}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['ids'], array.array('q', data['offsets']), array.array('q', data['lines']),
+                   data['size'], data['total_lines'], data['digest'])
+
+def _header_id(mapped, start, line_no):
+    end = mapped.find(b'\n', start)
+    match = CHANGESET_ID.search(mapped[start:end if end != -1 else len(mapped)])
+    if match:
+        return f"{match.group(1).decode('utf-8')}:{match.group(2).decode('utf-8')}"
+    return f"unknown:{line_no}"
+
+# Files are mapped a window at a time, so resident pages stay bounded too
+WINDOW = 16 << 20
+
+def build_index(path, window=WINDOW):
+    """Map the file window by window, index its '--changeset' headers and hash it"""
+    ids = []
+    digest = hashlib.sha256()
+    offsets = array.array('q')
+    lines = array.array('q')
+    size = os.path.getsize(path)
+    line_no = 1
+    pos = 0
+    with open(path, 'rb') as f:
+        while pos < size:
+            base = pos - pos % mmap.ALLOCATIONGRANULARITY
+            length = min(size - base, pos - base + window)
+            with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ, offset=base) as mapped:
+                rel = pos - base
+                if base + length == size:
+                    end = length
+                else:
+                    # Stop after the last complete line; a header never straddles windows
+                    end = mapped.rfind(b'\n', rel) + 1
+                    if end == 0:
+                        end = length
+                previous = rel
+                for match in HEADER.finditer(mapped, rel, end):
+                    start = match.start()
+                    if start == 0 and base > 0 and not _after_newline(f, base):
+                        continue
+                    line_no += mapped[previous:start].count(b'\n')
+                    previous = start
+                    ids.append(_header_id(mapped, start, line_no))
+                    offsets.append(base + start)
+                    lines.append(line_no)
+                tail = mapped[previous:end]
+                line_no += tail.count(b'\n')
+                digest.update(mapped[rel:end])
+                pos = base + end
+    # A last line without a trailing newline still counts
+    total_lines = line_no - 1 if size == 0 or _ends_with_newline(path, size) else line_no
+    return ChangesetIndex(ids, offsets, lines, size, total_lines, digest.hexdigest())
+
+def _after_newline(f, offset):
+    f.seek(offset - 1)
+    return f.read(1) == b'\n'
+
+def _ends_with_newline(path, size):
+    with open(path, 'rb') as f:
+        f.seek(size - 1)
+        return f.read(1) == b'\n'
+
+def _sidecar_path(path, cache_dir):
+    digest = hashlib.sha1(path.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f"{digest}.json")
+
+def load_index(path, cache_dir=CACHE_DIR, log=None):
+    """Return the ChangesetIndex for path, rebuilding it only when the file changed"""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    key = [CACHE_VERSION, st.st_mtime_ns, st.st_size]
+
+    cached = _memory_cache.indexes.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    sidecar = _sidecar_path(path, cache_dir)
+    index = None
+    try:
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('path') == path and data.get('key') == key:
+            index = ChangesetIndex.from_json(data['index'])
+    except (OSError, ValueError, KeyError):
+        index = None
+
+    if index is None:
+        index = build_index(path)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{sidecar}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'path': path, 'key': key, 'index': index.to_json()}, f)
+            os.replace(tmp, sidecar)
+        except OSError as e:
+            if log:
+                log(f"Changeset index cache not written: {str(e)}")
+
+    _memory_cache.indexes[path] = (key, index)
+    return index
+
+def read_lines(path, entry):
+    """Decode only the byte range of one changeset and split it into lines"""
+    start_byte, end_byte = entry[2], entry[3]
+    if end_byte <= start_byte:
+        return []
+    base = start_byte - start_byte % mmap.ALLOCATIONGRANULARITY
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), end_byte - base, access=mmap.ACCESS_READ, offset=base) as mapped:
+        chunk = mapped[start_byte - base:end_byte - base]
+    return io.StringIO(chunk.decode('utf-8'), newline=None).readlines()
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Warm Worker for the Python Custom Checks
+
+Liquibase starts the ValidateSQL and gdpr scripts once per changeset or
+database object, so on a large changelog or snapshot most of the time goes
+to interpreter start-up, imports, and compiling rule patterns and catalogs.
+This worker loads all of that once and keeps it (with the index, verdict
+and classifier caches) in memory. Each check is then run inside the worker
+for scripts/warm_check.py, which forwards a Liquibase invocation from a
+fresh interpreter over a Unix socket and replays the status, message and
+log lines. An interpreter that is already warm runs the check itself: a
+round trip to the worker costs more than the check does there.
+
+The worker calls the check scripts' own check() with a liquibase_shim.py
+stand-in for liquibase_utilities, one request at a time, in the caller's
+working directory, with the caller's SCRIPT_ARGS and VALIDATE_SYNTAX_*
+settings, so its verdicts are the scripts' own. When one of its modules or
+catalogs changes on disk it restarts itself and the caller runs that check
+in-process. One worker serves one socket: $CHECK_WORKER_SOCKET, or
+check-worker.sock in the cache directory, created accessible to its owner
+only. Requests and replies are length-prefixed marshal data, and the client
+side imports nothing beyond _socket and marshal, so a fresh interpreter
+reaches the worker without paying for json, re or enum: start the worker
+with the same Python the checks run under.
+
+Usage:
+  python scripts/check_worker.py start                 # in the background, returns once it answers
+  python scripts/check_worker.py serve                 # in the foreground
+  python scripts/check_worker.py ping                  # pid, uptime, checks served
+  python scripts/check_worker.py stop
+
+Exit code: 0 on success, 1 when no worker answers (ping, stop) or one is
+already running (serve, start), 2 when the worker cannot start.
+"""
+
+import _socket
+import marshal
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+# Checks the worker runs, with the SCRIPT_ARGS each one reads
+CHECKS = {
+    'validate_syntax': ('FULL_RESCAN', 'PROFILE'),
+    'gdpr_check': ('CATALOG', 'THRESHOLD', 'SAMPLE_URL', 'SAMPLE_BUDGETS'),
+}
+# Environment read by the scripts on every run, passed along per request
+FORWARDED_ENV = ('VALIDATE_SYNTAX_CACHE_DIR', 'VALIDATE_SYNTAX_FULL_RESCAN', 'VALIDATE_SYNTAX_PROFILE',
+                 'LIQUIBASE_LOG_FILE')
+# Seconds a caller waits for one check (value sampling may query a database)
+TIMEOUT = 300.0
+# Seconds between checks of the loaded modules for edits
+STALE_INTERVAL = 1.0
+
+
+def socket_path(setting=None):
+    """Absolute socket path from an argument, CHECK_WORKER_SOCKET or the cache directory"""
+    path = setting or os.environ.get("CHECK_WORKER_SOCKET") or os.path.join(
+        os.environ.get("VALIDATE_SYNTAX_CACHE_DIR", ".liquibase-cache"), "check-worker.sock")
+    return os.path.abspath(path)
+
+
+###
+### Client side: used by warm_check.py and the ping/stop commands
+###
+def encode(message):
+    """One frame: 4-byte big-endian length, then the marshal data"""
+    data = marshal.dumps(message)
+    return len(data).to_bytes(4, 'big') + data
+
+
+def decode(read):
+    """Next message from read(n), or None at end of stream"""
+    header = read(4)
+    if not header:
+        return None
+    if len(header) < 4:
+        raise ConnectionError("truncated frame")
+    size = int.from_bytes(header, 'big')
+    data = read(size)
+    if len(data) < size:
+        raise ConnectionError("truncated frame")
+    try:
+        return marshal.loads(data)
+    except (EOFError, TypeError) as e:
+        raise ValueError(f"bad frame: {e}") from None
+
+
+class Connection:
+    """One socket to the worker; requests and replies are marshal frames"""
+
+    def __init__(self, path, timeout=TIMEOUT):
+        self.path = path
+        self.sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+        try:
+            self.sock.settimeout(timeout)
+            self.sock.connect(path)
+        except OSError:
+            self.sock.close()
+            raise
+
+    def _read(self, size):
+        chunks = []
+        while size:
+            chunk = self.sock.recv(size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def call(self, message):
+        self.sock.sendall(encode(message))
+        reply = decode(self._read)
+        if reply is None:
+            raise ConnectionError("worker closed the connection")
+        return reply
+
+    def close(self):
+        self.sock.close()
+
+
+def forward(cache, message, path=None):
+    """Reply to message over the connection kept on cache, reconnecting once.
+
+    Raises OSError (or ValueError) when no worker answers.
+    """
+    path = socket_path(path)
+    for attempt in (1, 2):
+        connection = getattr(cache, 'connection', None)
+        if connection is None or connection.path != path:
+            connection = cache.connection = Connection(path)
+        try:
+            return connection.call(message)
+        except (OSError, ValueError):
+            connection.close()
+            cache.connection = None
+            if attempt == 2:
+                raise
+
+
+def _name(item):
+    try:
+        return item.getName()
+    except Exception:
+        try:
+            return str(item)
+        except Exception:
+            return None
+
+
+def describe(lb):
+    """The changeset and database object of the current invocation, as JSON-able dicts"""
+    description = {}
+    try:
+        changeset = lb.get_changeset()
+    except Exception:
+        changeset = None
+    if changeset is not None:
+        description['changeset'] = {'path': changeset.getChangeLog().getPhysicalFilePath(),
+                                    'author': changeset.getAuthor(), 'id': changeset.getId()}
+    try:
+        obj = lb.get_database_object()
+    except Exception:
+        obj = None
+    if obj is not None:
+        if lb.is_table(obj):
+            try:
+                columns = list(obj.getColumns() or [])
+            except Exception:
+                columns = list(lb.get_columns(obj) or [])
+            description['object'] = {'type': 'table', 'name': _name(obj), 'columns': [_name(c) for c in columns]}
+        elif lb.is_column(obj):
+            try:
+                table = _name(obj.getTable())
+            except Exception:
+                table = None
+            description['object'] = {'type': 'column', 'name': _name(obj), 'table': table}
+        else:
+            description['object'] = {'type': lb.get_object_type_name(obj), 'name': _name(obj)}
+    return description
+
+
+###
+### Worker side
+###
+class Worker:
+    def __init__(self, path):
+        self.path = path
+        self.started = time.time()
+        self.served = 0
+        self.seconds = 0.0
+        self.restart = False
+        self.watched = {}
+        self.checked = 0.0
+        self.cwd = None
+        self.env = None
+
+    def preload(self):
+        """Import the checks and their modules, compile the patterns and catalogs"""
+        import importlib
+        import gdpr_rules
+        import gdpr_sampling
+        import liquibase_shim
+        import syntax_rules
+        self.shim = liquibase_shim
+        self.checks = {check: importlib.import_module(check) for check in CHECKS}
+        syntax_rules.rules_fingerprint()
+        gdpr_rules.get_classifier()
+        watched = [os.path.join(SCRIPT_DIR, f"{check}.py") for check in CHECKS]
+        watched += [module.__file__ for module in list(sys.modules.values())
+                    if os.path.dirname(os.path.abspath(getattr(module, '__file__', None) or '')) == SCRIPT_DIR]
+        watched += [syntax_rules.TYPO_CATALOG, gdpr_rules.GDPR_CATALOG]
+        self.watched = {path: self._mtime(path) for path in watched}
+        self.checked = time.monotonic()
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def stale(self):
+        """True once a loaded module or catalog changed; looked at every STALE_INTERVAL"""
+        now = time.monotonic()
+        if now - self.checked < STALE_INTERVAL:
+            return False
+        self.checked = now
+        return any(self._mtime(path) != mtime for path, mtime in self.watched.items())
+
+    def context(self, message):
+        """install() keywords for one request"""
+        shim = self.shim
+        context = {'args': message.get('args') or {}, 'log': []}
+        changeset = message.get('changeset')
+        if changeset:
+            context['changeset'] = shim.ChangeSet(changeset['path'], changeset['author'], changeset['id'])
+        obj = message.get('object')
+        if obj:
+            if obj['type'] == 'table':
+                context['database_object'] = shim.table(obj['name'], obj.get('columns') or [])
+            elif obj['type'] == 'column':
+                table = shim.DatabaseObject(obj['table'], 'table') if obj.get('table') else None
+                context['database_object'] = shim.DatabaseObject(obj['name'], 'column', table=table)
+            else:
+                context['database_object'] = shim.DatabaseObject(obj['name'], obj['type'])
+        return context
+
+    def check(self, message):
+        check = message.get('check')
+        if check not in CHECKS:
+            return {'error': f"unknown check {check!r}"}
+        if self.stale():
+            self.restart = True
+            return {'error': "worker is restarting to load changed modules"}
+        context = self.context(message)
+        started = time.perf_counter()
+        try:
+            # Successive requests mostly come from one caller: only switch
+            # directory and settings when they differ from the last request's
+            cwd = message.get('cwd')
+            if cwd and cwd != self.cwd:
+                os.chdir(cwd)
+                self.cwd = cwd
+            env = message.get('env') or {}
+            if env != self.env:
+                for name in FORWARDED_ENV:
+                    os.environ.pop(name, None)
+                os.environ.update(env)
+                self.env = env
+            lb = self.shim.install(**context)
+            try:
+                exit_code = self.checks[check].check(lb)
+            except SystemExit as e:
+                exit_code = e.code
+            status = lb.get_status()
+        except Exception as e:
+            self.cwd = self.env = None
+            return {'error': f"{type(e).__name__}: {e}"}
+        finally:
+            self.served += 1
+            self.seconds += time.perf_counter() - started
+        return {'fired': bool(status.fired), 'message': status.message,
+                'exit': exit_code if isinstance(exit_code, int) else (1 if exit_code else None),
+                'log': context['log']}
+
+    def ping(self):
+        return {'pid': os.getpid(), 'uptime': round(time.time() - self.started, 1), 'served': self.served,
+                'mean_us': round(self.seconds / self.served * 1e6, 1) if self.served else 0.0}
+
+
+def serve(path):
+    import signal
+    import socketserver
+    import threading
+
+    worker = Worker(path)
+    worker.preload()
+    lock = threading.Lock()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            while True:
+                try:
+                    message = decode(self.rfile.read)
+                except (OSError, ValueError):
+                    break
+                if not isinstance(message, dict):
+                    break
+                op = message.get('op')
+                with lock:
+                    if op == 'check':
+                        reply = worker.check(message)
+                    elif op == 'ping':
+                        reply = worker.ping()
+                    elif op == 'stop':
+                        reply = {'stopping': True}
+                    else:
+                        reply = {'error': f"unknown op {op!r}"}
+                try:
+                    self.wfile.write(encode(reply))
+                    self.wfile.flush()
+                except OSError:
+                    break
+                if op == 'stop' or worker.restart:
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    break
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        os.unlink(path)
+    # The socket is created owner-only; a chmod after bind() would leave a window
+    umask = os.umask(0o077)
+    try:
+        server = Server(path, Handler)
+    finally:
+        os.umask(umask)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+    if worker.restart:
+        # Requests may have changed the working directory
+        os.execv(sys.executable, [sys.executable, os.path.join(SCRIPT_DIR, 'check_worker.py'), 'serve', '--socket', path])
+    return 0
+
+
+def _answering(path):
+    try:
+        connection = Connection(path, timeout=5.0)
+    except OSError:
+        return None
+    try:
+        return connection.call({'op': 'ping'})
+    except (OSError, ValueError):
+        return None
+    finally:
+        connection.close()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Keep the Python custom checks loaded between invocations")
+    parser.add_argument('command', choices=('serve', 'start', 'ping', 'stop'))
+    parser.add_argument('--socket', help="socket path (default: $CHECK_WORKER_SOCKET or <cache dir>/check-worker.sock)")
+    args = parser.parse_args(argv)
+    path = socket_path(args.socket)
+    running = _answering(path)
+
+    if args.command == 'ping':
+        if running is None:
+            print(f"❌ No worker at {path}")
+            return 1
+        print(f"✓ Worker {running['pid']} up {running['uptime']}s, {running['served']} check(s), "
+              f"{running['mean_us']} µs mean")
+        return 0
+    if args.command == 'stop':
+        if running is None:
+            print(f"❌ No worker at {path}")
+            return 1
+        connection = Connection(path)
+        try:
+            connection.call({'op': 'stop'})
+        finally:
+            connection.close()
+        print(f"✓ Worker {running['pid']} stopped")
+        return 0
+    if running is not None:
+        print(f"❌ Worker {running['pid']} already serves {path}")
+        return 1
+    if args.command == 'serve':
+        try:
+            return serve(path)
+        except OSError as e:
+            print(f"❌ Cannot serve {path}: {e}")
+            return 2
+
+    import subprocess
+    with open(os.devnull, 'rb') as devnull:
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), 'serve', '--socket', path],
+                                   stdin=devnull, start_new_session=True)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        running = _answering(path)
+        if running is not None:
+            print(f"✓ Worker {running['pid']} serving {path}")
+            return 0
+        if process.poll() is not None:
+            break
+        time.sleep(0.05)
+    print(f"❌ Worker did not start at {path}")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+###
+### DB-API connections from URLs
+###
+### Shared by gdpr_sampling.py (value sampling) and snapshot_cache.py (schema
+### fingerprints): sqlite:///path (or sqlite:///:memory:) opens with the
+### standard library, postgresql:// URLs with psycopg2 or psycopg when one of
+### them is installed.
+###
+
+def connect(url):
+    """DB-API connection for a sqlite:/// or postgresql:// URL"""
+    if url.startswith('sqlite:///'):
+        import sqlite3
+        return sqlite3.connect(url[len('sqlite:///'):])
+    if url.startswith(('postgresql://', 'postgres://')):
+        try:
+            import psycopg2 as driver
+        except ImportError:
+            try:
+                import psycopg as driver
+            except ImportError:
+                raise ImportError("Connecting to a PostgreSQL database needs psycopg2 or psycopg installed")
+        return driver.connect(url)
+    raise ValueError(f"Unsupported database URL: {url} (use sqlite:///path or postgresql://...)")
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Parallel Liquibase Flow Runner
+
+Runs the actions of a Liquibase flowfile (liquibase.flowfile.yaml) the way
+`liquibase flow` does -- same globalVariables, same `if:` toggles
+(RUN_DRIFT, RUN_POLICIES, RUN_AUDIT, RELEASE_TAG), same continueOnError --
+but schedules them by what they touch:
+
+  - read-only actions (diff, checks run, status, snapshot, history, ...)
+    that sit between two changing actions run concurrently
+  - changing actions (tag, update, rollback, ...) run alone, after every
+    earlier action finished and before any later one starts
+
+so the default flow runs as [diff | checks run | status | snapshot] -> tag ->
+update -> history, and its wall time is the critical path rather than the
+sum of every step. Several environments run side by side, at most --max-envs
+at a time, each with the URLs and credentials the deployment workflow uses:
+
+  dev   LB_URL=$DEV_URL   reference $TEST_URL   LB_USER_DEV / LB_PASSWORD_DEV
+  test  LB_URL=$TEST_URL  reference $DEV_URL    LB_USER_TEST / LB_PASSWORD_TEST
+  prod  LB_URL=$PROD_URL  reference $TEST_URL   LB_USER_PROD / LB_PASSWORD_PROD
+
+(per-environment credentials fall back to LB_USER / LB_PASSWORD). Every
+action still starts its own Liquibase process; its output and Liquibase log
+go to <log dir>/<env>/, so concurrent actions never share a log file.
+
+With --snapshot-cache, diff and JSON snapshots (--snapshot-format=json)
+are served from snapshot_cache.py: each database is snapshotted once per
+user and reused until its schema fingerprint changes, and diff compares
+the two cached snapshots offline.
+
+Usage:
+  python scripts/flow_runner.py --targets dev
+  python scripts/flow_runner.py --targets dev,test,prod --max-envs 2
+  python scripts/flow_runner.py --targets dev,test --dry-run      # print the schedule only
+  RUN_DRIFT=off RELEASE_TAG=v1.3.0 python scripts/flow_runner.py --targets prod
+  python scripts/flow_runner.py --targets dev,test --snapshot-cache
+  python scripts/flow_runner.py --targets dev --precheck   # check the include graph first
+
+Exit code: 0 when every environment deployed (failures of continueOnError
+actions are reported but tolerated), 1 when an environment failed, 2 when
+the flowfile cannot be read or an environment is unknown.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+FLOW_FILE = 'liquibase.flowfile.yaml'
+LOG_DIR = os.path.join('logs', 'flow')
+
+# Commands that only read the database or the changelog
+READ_ONLY_COMMANDS = {
+    'diff', 'diff-changelog', 'checks run', 'checks show', 'status', 'snapshot', 'history',
+    'validate', 'update-sql', 'rollback-sql', 'db-doc',
+}
+
+# cmdArgs passed through the environment instead of the command line
+SECRET_ARGS = {'password', 'reference-password'}
+
+# name: (target URL variable, reference URL variable, default URL)
+ENVIRONMENTS = {
+    'dev': ('DEV_URL', 'TEST_URL', 'jdbc:postgresql://localhost:5433/postgres'),
+    'test': ('TEST_URL', 'DEV_URL', 'jdbc:postgresql://localhost:5434/postgres'),
+    'prod': ('PROD_URL', 'TEST_URL', 'jdbc:postgresql://localhost:5435/postgres'),
+}
+
+VARIABLE = re.compile(r'\$\{([A-Za-z_][A-Za-z0-9_]*)(?::-([^}]*))?\}')
+CONDITION = re.compile(r"""^\s*([A-Za-z_][A-Za-z0-9_]*)\s*(==|!=)\s*(?:'([^']*)'|"([^"]*)")\s*$""")
+
+
+###
+### Flowfile
+###
+class Action:
+    """One liquibase action of a flowfile stage"""
+
+    def __init__(self, position, stage, command, cmd_args, condition, continue_on_error):
+        self.position = position
+        self.stage = stage
+        self.command = ' '.join(str(command).split())
+        self.cmd_args = cmd_args
+        self.condition = condition
+        self.continue_on_error = continue_on_error
+
+    @property
+    def read_only(self):
+        return self.command in READ_ONLY_COMMANDS
+
+    @property
+    def label(self):
+        return f"{self.position:02d}-{self.command.replace(' ', '-')}"
+
+    def __repr__(self):
+        return f"<Action {self.label}>"
+
+
+def load_flowfile(path):
+    """(globalVariables, [Action]) of a flowfile, stages in file order"""
+    try:
+        import yaml
+    except ImportError:
+        raise ValueError("PyYAML is required to read flowfiles (pip install pyyaml)")
+    with open(path, 'r', encoding='utf-8') as f:
+        flow = yaml.safe_load(f) or {}
+
+    variables = {name: '' if value is None else str(value)
+                 for name, value in (flow.get('globalVariables') or {}).items()}
+    actions = []
+    for stage, body in (flow.get('stages') or {}).items():
+        for item in (body or {}).get('actions') or []:
+            if item.get('type', 'liquibase') != 'liquibase':
+                raise ValueError(f"Unsupported action type '{item.get('type')}' in stage {stage}")
+            if not item.get('command'):
+                raise ValueError(f"Action without a command in stage {stage}")
+            cmd_args = {name: '' if value is None else str(value)
+                        for name, value in (item.get('cmdArgs') or {}).items()}
+            actions.append(Action(len(actions) + 1, stage, item['command'], cmd_args,
+                                  item.get('if'), bool(item.get('continueOnError', False))))
+    return variables, actions
+
+
+def expand(value, variables):
+    """Substitute ${NAME} and ${NAME:-default}"""
+    def replace(match):
+        current = variables.get(match.group(1))
+        if current:
+            return current
+        return match.group(2) if match.group(2) is not None else ''
+    return VARIABLE.sub(replace, value)
+
+
+def resolve_variables(global_variables, environ):
+    """globalVariables expanded against the environment, which wins over them"""
+    resolved = dict(environ)
+    for name, value in global_variables.items():
+        resolved[name] = expand(value, resolved)
+    return resolved
+
+
+def evaluate(condition, variables):
+    """Evaluate an `if:` of ==/!= comparisons joined by && and ||"""
+    if condition is None or str(condition).strip() == '':
+        return True
+    for alternative in str(condition).split('||'):
+        matched = True
+        for comparison in alternative.split('&&'):
+            match = CONDITION.match(comparison)
+            if not match:
+                raise ValueError(f"Unsupported condition: {comparison.strip()}")
+            name, operator, single, double = match.groups()
+            literal = single if single is not None else double
+            equal = variables.get(name, '') == literal
+            if equal != (operator == '=='):
+                matched = False
+                break
+        if matched:
+            return True
+    return False
+
+
+###
+### Schedule
+###
+def schedule(actions, variables):
+    """Group the enabled actions into waves that may run concurrently.
+
+    Consecutive read-only actions share a wave; every changing action is a
+    wave of its own, so it never overlaps anything before or after it.
+    """
+    waves = []
+    for action in actions:
+        if not evaluate(action.condition, variables):
+            continue
+        if action.read_only and waves and waves[-1][0].read_only:
+            waves[-1].append(action)
+        else:
+            waves.append([action])
+    return waves
+
+
+def environment_variables(name, environ):
+    """Connection variables for one target, as the deployment workflow sets them"""
+    url_var, reference_var, _ = ENVIRONMENTS[name]
+    urls = {var: environ.get(var) or default for var, _, default in ENVIRONMENTS.values()}
+    suffix = name.upper()
+    env = dict(environ)
+    env['LB_URL'] = urls[url_var]
+    env['TEST_URL'] = urls[reference_var]
+    env['LB_USER'] = environ.get(f'LB_USER_{suffix}') or environ.get('LB_USER', '')
+    env['LB_PASSWORD'] = environ.get(f'LB_PASSWORD_{suffix}') or environ.get('LB_PASSWORD', '')
+    return env
+
+
+###
+### Execution
+###
+class Result:
+    def __init__(self, action, returncode, seconds, log_path):
+        self.action = action
+        self.returncode = returncode
+        self.seconds = seconds
+        self.log_path = log_path
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
+
+def action_args(action, variables):
+    """cmdArgs with variables expanded; empty ones are left to liquibase.properties"""
+    expanded = {}
+    for name, value in action.cmd_args.items():
+        value = expand(value, variables)
+        if value != '':
+            expanded[name] = value
+    return expanded
+
+
+def command_line(command, args, liquibase):
+    """argv and extra environment for one action; secrets never reach argv"""
+    argv = [liquibase] + command.split()
+    extra = {}
+    for name, value in args.items():
+        if name in SECRET_ARGS:
+            extra['LIQUIBASE_COMMAND_' + name.upper().replace('-', '_')] = value
+        else:
+            argv.append(f"--{name}={value}")
+    return argv, extra
+
+
+def use_snapshot_cache(action, args, liquibase, cache_dir, log):
+    """Serve diff and snapshot from snapshot_cache.py.
+
+    Returns the args diff should run with (both sides as offline: URLs), a
+    return code when the action was answered from the cache, or None when
+    the action is not one the cache can serve.
+    """
+    import snapshot_cache
+
+    def cached(url_arg, user_arg, password_arg):
+        url = args.get(url_arg, '')
+        if not snapshot_cache.dialect(url):
+            return None
+        path, reused = snapshot_cache.snapshot(url, args.get(user_arg), args.get(password_arg),
+                                               liquibase, cache_dir, log=log)
+        log.write(f"{'Reused' if reused else 'Took'} snapshot of {url}: {path}\n")
+        log.flush()
+        return path
+
+    # Liquibase writes txt snapshots unless json is asked for
+    if action.command == 'snapshot' and str(args.get('snapshot-format', '')).lower() == 'json':
+        path = cached('url', 'username', 'password')
+        if path is None:
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        if args.get('output-file'):
+            with open(args['output-file'], 'w', encoding='utf-8') as f:
+                f.write(content)
+        else:
+            log.write(content)
+        return 0
+
+    if action.command == 'diff':
+        target = cached('url', 'username', 'password')
+        reference = cached('reference-url', 'reference-username', 'reference-password')
+        if target is None or reference is None:
+            return None
+        served = {name: value for name, value in args.items()
+                  if name not in ('username', 'password', 'reference-username', 'reference-password')}
+        served['url'] = snapshot_cache.offline_url(args['url'], target)
+        served['reference-url'] = snapshot_cache.offline_url(args['reference-url'], reference)
+        return served
+    return None
+
+
+def run_action(action, variables, liquibase, log_dir, env, snapshot_cache_dir=None):
+    args = action_args(action, variables)
+    log_path = os.path.join(log_dir, f"{action.label}.log")
+    started = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        if snapshot_cache_dir:
+            try:
+                served = use_snapshot_cache(action, args, liquibase, snapshot_cache_dir, log)
+            except (OSError, RuntimeError) as e:
+                log.write(f"Snapshot cache: {e}\n")
+                served = 1
+            if isinstance(served, int):
+                return Result(action, served, time.perf_counter() - started, log_path)
+            if served is not None:
+                args = served
+        argv, extra = command_line(action.command, args, liquibase)
+        process_env = dict(env, **extra)
+        process_env['LIQUIBASE_LOG_FILE'] = os.path.join(log_dir, f"{action.label}.liquibase.json")
+        log.flush()
+        try:
+            returncode = subprocess.run(argv, stdout=log, stderr=subprocess.STDOUT, env=process_env).returncode
+        except OSError as e:
+            log.write(f"Cannot start {argv[0]}: {e}\n")
+            returncode = 127
+    return Result(action, returncode, time.perf_counter() - started, log_path)
+
+
+def run_environment(name, global_variables, actions, options, report):
+    """Run every wave of one environment; returns (ok, [Result], wall seconds)"""
+    env = environment_variables(name, os.environ)
+    variables = resolve_variables(global_variables, env)
+    waves = schedule(actions, variables)
+    log_dir = os.path.join(options.log_dir, name)
+    os.makedirs(log_dir, exist_ok=True)
+
+    results = []
+    started = time.perf_counter()
+    for wave in waves:
+        workers = max(1, min(options.max_steps, len(wave)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            done = list(pool.map(lambda a: run_action(a, variables, options.liquibase, log_dir, env,
+                                                      options.snapshot_cache), wave))
+        results.extend(done)
+        for result in done:
+            report(name, result)
+        if any(not r.ok and not r.action.continue_on_error for r in done):
+            return False, results, time.perf_counter() - started
+    return True, results, time.perf_counter() - started
+
+
+def precheck(plans, global_variables, targets):
+    """Resolve every changelog the plans use once, before any action starts"""
+    import changelog_includes
+
+    changelogs = set()
+    for name in targets:
+        variables = resolve_variables(global_variables, environment_variables(name, os.environ))
+        for wave in plans[name]:
+            for action in wave:
+                changelog = action_args(action, variables).get('changelog-file')
+                if changelog:
+                    changelogs.add(changelog)
+    ok = True
+    for changelog in sorted(changelogs):
+        graph = changelog_includes.load_graph(changelog)
+        for problem in graph.problems():
+            print(f"❌ {problem}")
+        ok = ok and graph.ok
+        print(f"{'✓' if graph.ok else '❌'} {changelog}: {len(graph.order)} file(s), {graph.changesets} changeset(s)")
+    return ok
+
+
+def describe(waves):
+    return ' -> '.join('[' + ' | '.join(a.command for a in wave) + ']' if len(wave) > 1 else wave[0].command
+                       for wave in waves)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a Liquibase flowfile concurrently across environments")
+    parser.add_argument('--targets', default='dev', help="comma-separated environments (%s)" % ', '.join(ENVIRONMENTS))
+    parser.add_argument('--flow-file', default=FLOW_FILE, help=f"flowfile to run (default: {FLOW_FILE})")
+    parser.add_argument('--max-envs', type=int, default=len(ENVIRONMENTS), help="environments run at once")
+    parser.add_argument('--max-steps', type=int, default=4, help="read-only actions run at once per environment")
+    parser.add_argument('--liquibase', default=os.environ.get('LIQUIBASE_BIN', 'liquibase'),
+                        help="Liquibase executable (default: $LIQUIBASE_BIN or liquibase)")
+    parser.add_argument('--log-dir', default=LOG_DIR, help=f"per-action output (default: {LOG_DIR})")
+    parser.add_argument('--snapshot-cache', nargs='?', const=os.environ.get('VALIDATE_SYNTAX_CACHE_DIR', '.liquibase-cache'),
+                        metavar='DIR', help="reuse cached snapshots for diff and snapshot (see snapshot_cache.py)")
+    parser.add_argument('--precheck', action='store_true',
+                        help="resolve the changelog include graph first and stop on missing files or cycles")
+    parser.add_argument('--dry-run', action='store_true', help="print each environment's schedule and exit")
+    args = parser.parse_args(argv)
+
+    targets = list(dict.fromkeys(t.strip().lower() for t in args.targets.split(',') if t.strip()))
+    unknown = [t for t in targets if t not in ENVIRONMENTS]
+    if unknown or not targets:
+        print(f"❌ Unknown environment: {', '.join(unknown) or '(none)'}")
+        return 2
+    try:
+        global_variables, actions = load_flowfile(args.flow_file)
+        plans = {}
+        for name in targets:
+            variables = resolve_variables(global_variables, environment_variables(name, os.environ))
+            plans[name] = schedule(actions, variables)
+    except (OSError, ValueError) as e:
+        print(f"❌ Cannot read flowfile: {e}")
+        return 2
+
+    for name in targets:
+        print(f"{name:5s} {describe(plans[name]) or '(nothing to run)'}")
+    if args.precheck and not precheck(plans, global_variables, targets):
+        return 2
+    if args.dry_run:
+        return 0
+
+    def report(name, result):
+        state = '✓' if result.ok else ('⚠' if result.action.continue_on_error else '❌')
+        print(f"{state} {name:5s} {result.action.command:12s} {result.seconds:7.1f}s"
+              + ('' if result.ok else f"  exit {result.returncode}, see {result.log_path}"), flush=True)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(args.max_envs, len(targets)))) as pool:
+        outcomes = dict(zip(targets, pool.map(
+            lambda name: run_environment(name, global_variables, actions, args, report), targets)))
+    elapsed = time.perf_counter() - started
+
+    failed = [name for name, (ok, _, _) in outcomes.items() if not ok]
+    serial = sum(r.seconds for _, results, _ in outcomes.values() for r in results)
+    print(f"\nRan {len(targets)} environment(s) in {elapsed:.1f}s "
+          f"({serial:.1f}s of Liquibase time): {len(failed)} failed")
+    for name in failed:
+        print(f"❌ {name} stopped after a failed action; logs in {os.path.join(args.log_dir, name)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,65 +1,24 @@
-# import Liquibase modules containing useful functions
-import liquibase_utilities as lb
-import sys
-
-# define reusable variables
-obj = lb.get_database_object()  # database or changelog object to examine
-liquibase_status = lb.get_status()  # Status object of the check
+# GDPR column-name check. Liquibase runs it once per database object, under
+# whatever module name it picks; scripts/gdpr_scan.py classifies a whole
+# snapshot in one pass. Importing it by name (check_worker.py,
+# warm_check.py) only defines check(): the catalog is compiled on the first
+# object checked, and the sampling module is loaded only when SAMPLE_URL is
+# set.
 
-# -----------------------------
-# GDPR keyword catalog (names only; no regex/imports)
-# -----------------------------
-_GDPR_TOKENS = [
-    # Names
-    "name", "full_name", "firstname", "first_name", "givenname", "given_name",
-    "lastname", "last_name", "surname", "middlename", "middle_name", "maiden_name",
-    # Contact
-    "email", "emailaddress", "email_address", "phone", "telephone", "mobile",
-    "cell", "msisdn",
-    # Address / location
-    "address", "address1", "address2", "street", "street1", "street2",
-    "city", "town", "county", "state", "province", "region",
-    "postal", "postcode", "postalcode", "zip", "zipcode", "country",
-    "latitude", "longitude", "lat", "lon", "geocode",
-    # DOB / age
-    "dob", "dateofbirth", "date_of_birth", "birthdate", "birthday", "age", "yob",
-    # Government IDs / identifiers
-    "ssn", "sin", "nin", "nino", "nationalinsurance", "national_insurance",
-    "nationalid", "national_id", "passport", "passportno", "passport_number",
-    "driverslicense", "driver_license", "driving_license", "license_number",
-    "taxid", "tax_id", "tin", "ein", "itn",
-    "siret", "siren", "nif", "nie", "curp", "rfc",
-    "aadhaar", "pan", "uin", "bsn", "pesel",
-    # Financial
-    "iban", "bic", "swift", "bankaccount", "bank_account", "accountno",
-    "account_number", "cardnumber", "card_number", "creditcard", "ccnum",
-    "cc_number", "cvv", "cvc", "expiry", "exp_date",
-    # Online identifiers
-    "ip", "ipaddress", "ip_address", "ipv4", "ipv6", "mac",
-    "deviceid", "device_id", "cookie", "session", "sessionid", "session_id",
-    "trackingid", "tracking_id", "useragent", "user_agent", "userid", "user_id", "username",
-    # Health (special category)
-    "nhs_number", "medical", "health", "diagnosis", "patientid", "patient_id", "patient",
-    # Biometric (special category)
-    "biometric", "fingerprint", "face", "iris", "retina", "voiceprint", "dna"
-]
+import os
+import sys
 
-# Normalize and match helpers (no regex)
-def _normalize(s):
-    s = (s or "").lower()
-    out = []
-    for ch in s:
-        # keep only letters and digits; everything else becomes nothing
-        if ch.isalnum():
-            out.append(ch)
-    return "".join(out)
+# column-name classifier lives beside this script
+SCRIPT_DIR = os.path.dirname(os.path.abspath(globals().get('__file__') or os.path.join('scripts', 'gdpr_check.py')))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+import gdpr_rules
 
-def _matches_gdpr(name):
-    n = _normalize(name)
-    for token in _GDPR_TOKENS:
-        if token in n:
-            return token
-    return None
+def _script_arg(lb, name):
+    try:
+        return lb.get_arg(name)
+    except Exception:
+        return None
 
 def _safe_get_name(x):
     try:
@@ -70,7 +29,7 @@ def _safe_get_name(x):
         except Exception:
             return None
 
-def _collect_table_columns(table_obj):
+def _collect_table_columns(lb, table_obj):
     # Try typical column access patterns without importing anything else
     cols = []
     try:
@@ -90,49 +49,100 @@ def _collect_table_columns(table_obj):
 # Check logic
 # -----------------------------
 
-# If the current object is a TABLE, scan its columns
-if lb.is_table(obj):
-    table_name = _safe_get_name(obj)
-    offending = []
-    for col in _collect_table_columns(obj):
-        col_name = _safe_get_name(col)
-        if col_name:
-            token = _matches_gdpr(col_name)
-            if token:
-                offending.append(col_name)
-    if offending:
-        liquibase_status.fired = True
-        liquibase_status.message = (
-            "GDPR: Table '{tbl}' contains potential personal-data columns: {cols}. "
-            "Review retention, masking, and access controls."
-        ).format(tbl=table_name, cols=", ".join(sorted(set(offending))))
-        sys.exit(1)
+def check(lb):
+    """Check the database object lb serves; sets lb's status, returns the exit code or None"""
+    obj = lb.get_database_object()  # database or changelog object to examine
+    liquibase_status = lb.get_status()  # Status object of the check
+
+    # Catalog and threshold can be overridden through SCRIPT_ARGS, e.g.
+    #   CATALOG=scripts/gdpr_catalog.json,THRESHOLD=1.0
+    threshold = _script_arg(lb, "THRESHOLD") or None
+    if threshold is not None:
+        try:
+            threshold = float(threshold)
+        except ValueError:
+            lb.get_logger().warning(f"GDPR: ignoring THRESHOLD={threshold!r}, not a number; "
+                                    "using the catalog's threshold.")
+            threshold = None
+    classifier = gdpr_rules.get_classifier(_script_arg(lb, "CATALOG"), threshold)
 
-# If the current object is a COLUMN, check its name directly
-# (Works when Liquibase iterates columns as individual objects.)
-try:
-    if lb.is_column(obj):
-        col_name = _safe_get_name(obj)
-        token = _matches_gdpr(col_name)
-        if token:
-            # Try to include parent table if available
-            table_name = None
+    # Opt-in value sampling of table columns, e.g.
+    #   SAMPLE_URL=sqlite:///app.db,SAMPLE_BUDGETS=gdpr_budgets.json
+    sample_url = _script_arg(lb, "SAMPLE_URL")
+    sample_budgets = _script_arg(lb, "SAMPLE_BUDGETS")
+
+    # If the current object is a TABLE, scan its columns
+    if lb.is_table(obj):
+        table_name = _safe_get_name(obj)
+        offending = {}
+        for col in _collect_table_columns(lb, obj):
+            col_name = _safe_get_name(col)
+            if col_name:
+                category = classifier.category(col_name)
+                if category:
+                    offending[col_name] = category
+        if sample_url:
+            import gdpr_sampling
+            logger = lb.get_logger()
             try:
-                parent = obj.getTable()
-                table_name = _safe_get_name(parent)
-            except Exception:
-                table_name = None
-            if table_name:
-                msg = "GDPR: Column '{col}' in table '{tbl}' may contain personal data."
-                msg = msg.format(col=col_name, tbl=table_name)
-            else:
-                msg = "GDPR: Column '{col}' may contain personal data.".format(col=col_name)
+                default, budgets = gdpr_sampling.DEFAULT_BUDGET, {}
+                if sample_budgets:
+                    default, budgets = gdpr_sampling.load_budgets(sample_budgets)
+                connection = gdpr_sampling.shared_connection(sample_url)
+            except Exception as e:
+                # Sampling is opt-in on top of the name check; without it
+                # the name-only result stands
+                logger.warning(f"GDPR sampling unavailable, name check only: {e}")
+                connection = None
+            if connection is not None:
+                cols = [_safe_get_name(col) for col in _collect_table_columns(lb, obj)]
+                found = {table_name: offending}
+                gdpr_sampling.sample_findings(connection, [(table_name, cols)], found, default, budgets,
+                                              log=logger.warning)
+                offending = found.get(table_name, {})
+        if offending:
             liquibase_status.fired = True
-            liquibase_status.message = msg + " Review retention, masking, and access controls."
-            sys.exit(1)
-except Exception:
-    # If the environment doesn't provide lb.is_column or obj isn't a column-like object, ignore.
-    pass
+            liquibase_status.message = gdpr_rules.table_message(table_name, offending)
+            return 1
+
+    # If the current object is a COLUMN, check its name directly
+    # (Works when Liquibase iterates columns as individual objects.)
+    try:
+        if lb.is_column(obj):
+            col_name = _safe_get_name(obj)
+            category = classifier.category(col_name)
+            if category:
+                # Try to include parent table if available
+                table_name = None
+                try:
+                    parent = obj.getTable()
+                    table_name = _safe_get_name(parent)
+                except Exception:
+                    table_name = None
+                if table_name:
+                    msg = "GDPR: Column '{col}' in table '{tbl}' may contain personal data ({cat})."
+                    msg = msg.format(col=col_name, tbl=table_name, cat=category)
+                else:
+                    msg = "GDPR: Column '{col}' may contain personal data ({cat}).".format(col=col_name, cat=category)
+                liquibase_status.fired = True
+                liquibase_status.message = msg + " Review retention, masking, and access controls."
+                return 1
+    except Exception:
+        # If the environment doesn't provide lb.is_column or obj isn't a column-like object, ignore.
+        pass
+    return None
+
+# run by Liquibase: any run but an import by name, whenever Liquibase's
+# module containing useful functions is there
+if __name__ != "gdpr_check":
+    try:
+        import liquibase_utilities
+    except ImportError:
+        liquibase_utilities = None
+    if liquibase_utilities is not None:
+        exit_code = check(liquibase_utilities)
+        if exit_code is not None:
+            sys.exit(exit_code)
 
 # default return code
 False
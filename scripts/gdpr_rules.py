@@ -0,0 +1,254 @@
+###
+### GDPR column-name classifier
+###
+### Column names are split into lower-case words (snake_case, camelCase and
+### digits all separate words) and scored against a weighted catalog loaded
+### from JSON. Each entry has a category, a weight and a match mode:
+###   word    the token's words appear as whole words ("ip" hits client_ip,
+###           not shipping); first_name also matches the single word firstname
+###   prefix  a word starts with the token ("email" hits emailaddress)
+###   suffix  a word ends with the token ("address" hits homeaddress)
+### A column's score is the sum, over categories, of the highest weight it
+### matched in that category; it is flagged when the score reaches the
+### catalog threshold. Weak tokens such as "name" or "state" fall short of
+### it on their own and only count next to a data-subject word, so
+### table_name stays quiet while customer_name is reported.
+###
+### The catalog is compiled into hash tables keyed by word, prefix and
+### suffix, so the cost per column does not grow with the catalog. Loading
+### only sorts the entries by the letter their keys start with (suffixes:
+### end with); a letter's entries are compiled when a column first has a
+### word that starts or ends with it, so a fresh interpreter checking one
+### table compiles a fraction of a large catalog. Results are memoized per
+### column name in an LRU: warehouse snapshots repeat the same names (id,
+### email, created_at, ...) across thousands of tables.
+###
+import functools
+import json
+import os
+import re
+
+GDPR_CATALOG = os.environ.get(
+    "GDPR_CATALOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "gdpr_catalog.json"))
+
+MATCH_MODES = ('word', 'prefix', 'suffix')
+
+NAME_CACHE_SIZE = 1 << 18
+
+_WORD = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+|[^\W\d_A-Za-z]+')
+# What an ASCII token's words never contain: stripped, its first and last
+# characters are those of its first and last word
+_ASCII_SEPARATORS = ''.join(chr(c) for c in range(128) if not chr(c).isalnum())
+
+def split_words(name):
+    """Lower-case words of a column name: 'billingZipCode' -> ('billing', 'zip', 'code')"""
+    return tuple(w.lower() for w in _WORD.findall(name or ''))
+
+def load_catalog(path=GDPR_CATALOG):
+    """Read the catalog: {"threshold": n, "entries": [{token, category, weight[, match]}]}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+class Classifier:
+    """Weighted column-name classifier compiled from catalog entries"""
+
+    def __init__(self, entries, threshold=1.0, cache_size=NAME_CACHE_SIZE):
+        self.threshold = float(threshold)
+        self.catalog = entries
+        self.entries = [None] * len(entries)   # index -> (category, rank) once compiled
+        self.words = {}
+        self.prefixes = {}
+        self.suffixes = {}
+        self.gram_sizes = []
+        self.prefix_sizes = []
+        self.suffix_sizes = []
+        # Entries not compiled yet, by the first (word, prefix) or last
+        # (suffix) character of their keys; non-ASCII tokens compile now
+        self.pending_first = {}
+        self.pending_last = {}
+        now = []
+        for index, entry in enumerate(entries):
+            mode = entry.get('match', 'word')
+            if mode not in MATCH_MODES:
+                raise ValueError(f"Unknown match mode '{mode}' for GDPR token '{entry.get('token')}'")
+            token = entry['token']
+            if not token.isascii():
+                now.append(index)
+                continue
+            core = token.strip(_ASCII_SEPARATORS)
+            if not core:
+                raise ValueError(f"GDPR catalog entry {index} has no usable token")
+            if mode == 'suffix':
+                self.pending_last.setdefault(core[-1].lower(), []).append(index)
+            else:
+                self.pending_first.setdefault(core[0].lower(), []).append(index)
+        self._compile(now)
+        self.classify = functools.lru_cache(maxsize=cache_size)(self._classify)
+
+    def _compile(self, indexes):
+        """Add catalog entries to the hash tables"""
+        for index in indexes:
+            entry = self.catalog[index]
+            mode = entry.get('match', 'word')
+            words = split_words(entry['token'])
+            if not words:
+                raise ValueError(f"GDPR catalog entry {index} has no usable token")
+            # Ties within a column go to the higher weight, then the longer token
+            self.entries[index] = (entry['category'], (-float(entry['weight']), -len(''.join(words)), index))
+            if mode == 'word':
+                keys = {words, (''.join(words),)}
+                table = self.words
+            else:
+                keys = {''.join(words)}
+                table = self.prefixes if mode == 'prefix' else self.suffixes
+            for key in keys:
+                table.setdefault(key, []).append(index)
+        if indexes:
+            self.gram_sizes = sorted({len(key) for key in self.words})
+            self.prefix_sizes = sorted({len(key) for key in self.prefixes})
+            self.suffix_sizes = sorted({len(key) for key in self.suffixes})
+
+    def _load(self, words):
+        """Compile the pending entries that could match these words"""
+        indexes = []
+        for word in words:
+            indexes += self.pending_first.pop(word[0], ())
+            indexes += self.pending_last.pop(word[-1], ())
+        self._compile(indexes)
+
+    def _hits(self, words):
+        if self.pending_first or self.pending_last:
+            self._load(words)
+        count = len(words)
+        for i, word in enumerate(words):
+            for size in self.gram_sizes:
+                if i + size > count:
+                    break
+                yield from self.words.get(words[i:i + size], ())
+            length = len(word)
+            for size in self.prefix_sizes:
+                if size > length:
+                    break
+                yield from self.prefixes.get(word[:size], ())
+            for size in self.suffix_sizes:
+                if size > length:
+                    break
+                yield from self.suffixes.get(word[-size:], ())
+
+    def _classify(self, name):
+        best = {}
+        for index in self._hits(split_words(name)):
+            category, rank = self.entries[index]
+            current = best.get(category)
+            if current is None or rank < current:
+                best[category] = rank
+        if not best:
+            return 0.0, ()
+        score = -sum(rank[0] for rank in best.values())
+        ranked = sorted(best, key=best.get)
+        return score, tuple(ranked)
+
+    def category(self, name):
+        """Top category of a flagged column name, or None below the threshold"""
+        score, categories = self.classify(name)
+        return categories[0] if score >= self.threshold - 1e-9 else None
+
+_classifiers = {}
+
+def get_classifier(path=None, threshold=None):
+    """Classifier for a catalog file, compiled once per interpreter.
+
+    threshold overrides the catalog's own; both may come from SCRIPT_ARGS.
+    """
+    path = os.path.abspath(path or GDPR_CATALOG)
+    key = (path, threshold)
+    if key not in _classifiers:
+        catalog = load_catalog(path)
+        if threshold is None:
+            threshold = catalog.get('threshold', 1.0)
+        _classifiers[key] = Classifier(catalog['entries'], threshold)
+    return _classifiers[key]
+
+def matches_gdpr(name, classifier=None):
+    """Category of a personal-data column name, or None"""
+    return (classifier or get_classifier()).category(name)
+
+# -----------------------------
+# Reports and batch classification
+# -----------------------------
+def _describe(columns):
+    return ", ".join(f"{col} ({columns[col]})" for col in sorted(columns))
+
+def table_message(table_name, columns):
+    """The check's finding for one table's flagged {column: category}"""
+    return (
+        "GDPR: Table '{tbl}' contains potential personal-data columns: {cols}. "
+        "Review retention, masking, and access controls."
+    ).format(tbl=table_name, cols=_describe(columns))
+
+def classify_tables(tables, classifier=None):
+    """{table: {column: category}} for an iterable of (table, column names).
+
+    Every distinct column name in the batch is classified exactly once.
+    """
+    classifier = classifier or get_classifier()
+    tables = list(tables)
+    distinct = {col for _, cols in tables for col in cols if col}
+    flagged = {col: category for col in distinct
+               for category in (classifier.category(col),) if category}
+    findings = {}
+    for table_name, cols in tables:
+        hits = {col: flagged[col] for col in cols if col in flagged}
+        if hits:
+            findings[table_name] = hits
+    return findings
+
+SNAPSHOT_TABLE = "liquibase.structure.core.Table"
+SNAPSHOT_COLUMN = "liquibase.structure.core.Column"
+SNAPSHOT_SCHEMA = "liquibase.structure.core.Schema"
+
+def _snapshot_objects(objects, type_name):
+    key = type_name.rsplit('.', 1)[-1].lower()
+    for entry in objects.get(type_name) or []:
+        yield entry.get(key, entry)
+
+def tables_from_snapshot(snapshot):
+    """Yield (table, [column names]) from `liquibase snapshot --snapshot-format=json` output.
+
+    Tables are named schema.table when the snapshot records their schema.
+    Columns are attached through their 'relation' reference, so view columns
+    are left out just as the per-object check only scans tables.
+    """
+    objects = snapshot.get('snapshot', snapshot).get('objects', {})
+    schemas = {s.get('snapshotId'): s.get('name') for s in _snapshot_objects(objects, SNAPSHOT_SCHEMA)}
+
+    tables = {}
+    for t in _snapshot_objects(objects, SNAPSHOT_TABLE):
+        schema = schemas.get(str(t.get('schema', '')).rpartition('#')[2])
+        name = f"{schema}.{t.get('name')}" if schema else t.get('name')
+        tables[t.get('snapshotId')] = (name, [])
+
+    for c in _snapshot_objects(objects, SNAPSHOT_COLUMN):
+        relation = str(c.get('relation', ''))
+        owner, _, ref = relation.rpartition('#')
+        if owner == SNAPSHOT_TABLE and ref in tables:
+            tables[ref][1].append(c.get('name'))
+
+    for name, cols in tables.values():
+        yield name, cols
+
+def tables_from_objects(objects):
+    """Yield (table, [column names]) from Liquibase-style table objects"""
+    for obj in objects:
+        get_columns = getattr(obj, 'getColumns', None)
+        cols = get_columns() if get_columns else []
+        yield obj.getName(), [col.getName() for col in cols or []]
+
+def format_report(findings):
+    """One consolidated report for {table: {column: category}}, grouped by table"""
+    lines = [f"GDPR: {sum(map(len, findings.values()))} potential personal-data column(s) "
+             f"in {len(findings)} table(s). Review retention, masking, and access controls."]
+    for table_name in sorted(findings):
+        lines.append(f"  {table_name}: {_describe(findings[table_name])}")
+    return "\n".join(lines)
@@ -0,0 +1,270 @@
+###
+### Opt-in GDPR data sampling
+###
+### Name-based classification misses columns such as notes or payload that
+### hold e-mail addresses or IBANs. This module reads a bounded number of
+### rows per table through a streaming DB-API cursor and runs compiled value
+### detectors over them:
+###   email   address syntax
+###   iban    country/length shape plus the ISO 13616 mod-97 checksum
+###   card    13-19 digit card number passing the Luhn checksum
+###   phone   9-15 digit numbers with a country code, or grouped with a
+###           final group of four digits, that are not part of a code
+### Values are checked a batch at a time: one regex pass over the batch
+### joined into a single string, with match offsets mapped back to rows.
+### A column is reported once enough rows match; it stops being scanned as
+### soon as that is settled, and a table stops when every column is settled
+### or its row, byte or time budget runs out.
+###
+### Any DB-API connection works; shared_connection() opens one per URL
+### through db_connect.connect().
+###
+import bisect
+import collections
+import json
+import re
+import time
+
+import db_connect
+
+Budget = collections.namedtuple('Budget', 'rows bytes seconds')
+
+DEFAULT_BUDGET = Budget(rows=1000, bytes=1 << 20, seconds=2.0)
+
+BATCH_SIZE = 200
+MIN_HITS = 3           # matching rows needed before a column is reported
+MIN_RATIO = 0.1        # ...and the share of sampled values they must reach
+
+# -----------------------------
+# Value detectors
+# -----------------------------
+def _luhn(digits):
+    total = 0
+    for i, ch in enumerate(reversed(digits)):
+        d = ord(ch) - 48
+        if i % 2:
+            d *= 2
+            if d > 9:
+                d -= 9
+        total += d
+    return total % 10 == 0
+
+def _valid_card(text):
+    digits = re.sub(r'[ -]', '', text)
+    return 13 <= len(digits) <= 19 and _luhn(digits)
+
+def _valid_iban(text):
+    iban = text.replace(' ', '').upper()
+    if not 15 <= len(iban) <= 34:
+        return False
+    rotated = iban[4:] + iban[:4]
+    number = ''.join(str(int(ch, 36)) for ch in rotated)
+    return int(number) % 97 == 1
+
+def _valid_phone(text):
+    return 9 <= sum(ch.isdigit() for ch in text) <= 15
+
+Detector = collections.namedtuple('Detector', 'name category finditer validate')
+
+DETECTORS = [
+    Detector('email', 'contact',
+             re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}').finditer,
+             None),
+    Detector('iban', 'financial',
+             re.compile(r'\b[A-Z]{2}[0-9]{2}(?: ?[A-Z0-9]{4}){2,7}(?: ?[A-Z0-9]{1,4})?\b').finditer,
+             _valid_iban),
+    Detector('card', 'financial',
+             re.compile(r'(?<![\d-])\d(?:[ -]?\d){12,18}(?![\d-])').finditer,
+             _valid_card),
+    Detector('phone', 'contact',
+             # Not part of a code such as ORD-2024-000123: no word
+             # character or hyphen right before it, nor a word character
+             # and a hyphen or dot, nor a digit and a space (free text such
+             # as 'call 555-123-4567' still counts); without a country
+             # code the last group has four digits
+             re.compile(r'(?<![\w+-])(?<!\w[.-])(?<!\d )'
+                        r'(?:\+\d{1,3}[ .-]?\(?\d{2,4}\)?[ .-]\d{3,4}[ .-]?\d{3,4}'
+                        r'|\(?\d{2,4}\)?[ .-]\d{3,4}[ .-]?\d{4})'
+                        r'(?![\w-])(?![ .]\d)').finditer,
+             _valid_phone),
+]
+
+def detect_batch(values, detectors=DETECTORS):
+    """{detector name: number of values with a valid match} for a list of strings"""
+    if not values:
+        return {}
+    text = '\n'.join(values)
+    starts = []
+    offset = 0
+    for value in values:
+        starts.append(offset)
+        offset += len(value) + 1
+    counts = {}
+    claimed = set()
+    # Detectors run most specific first; a row counts for the first that
+    # matched it, so a card or IBAN is never also read as a phone number
+    for detector in detectors:
+        rows = set()
+        for match in detector.finditer(text):
+            if detector.validate is None or detector.validate(match.group(0)):
+                rows.add(bisect.bisect_right(starts, match.start()) - 1)
+        rows -= claimed
+        if rows:
+            counts[detector.name] = len(rows)
+            claimed |= rows
+    return counts
+
+# -----------------------------
+# Table sampling
+# -----------------------------
+def quote_name(name):
+    """Quote a possibly schema-qualified name as ANSI identifiers"""
+    return '.'.join('"' + part.replace('"', '""') + '"' for part in name.split('.'))
+
+class _ColumnState:
+    __slots__ = ('values', 'hits', 'settled')
+
+    def __init__(self):
+        self.values = 0
+        self.hits = collections.Counter()
+        self.settled = False
+
+    def best(self):
+        if not self.hits:
+            return None, 0
+        return self.hits.most_common(1)[0]
+
+    def confident(self, min_hits, min_ratio):
+        _, hits = self.best()
+        return hits >= min_hits and hits >= min_ratio * self.values
+
+def sample_table(connection, table_name, columns, budget=DEFAULT_BUDGET,
+                 batch_size=BATCH_SIZE, min_hits=MIN_HITS, min_ratio=MIN_RATIO,
+                 detectors=DETECTORS):
+    """{column: category} for the columns whose sampled values look personal.
+
+    At most budget.rows rows are requested from the database. No row past
+    budget.bytes of text is examined, later fetches shrink to what the byte
+    budget has room for, and reading stops once budget.seconds have been
+    spent or every column has been settled.
+    """
+    columns = [col for col in columns if col]
+    if not columns:
+        return {}
+    by_name = {d.name: d for d in detectors}
+    states = [_ColumnState() for _ in columns]
+    started = time.perf_counter()
+    text_read = 0
+    rows_read = 0
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT {cols} FROM {tbl} LIMIT {n}".format(
+            cols=", ".join(quote_name(col) for col in columns),
+            tbl=quote_name(table_name), n=int(budget.rows)))
+        fetch = batch_size
+        while True:
+            if time.perf_counter() - started >= budget.seconds:
+                break
+            rows = cursor.fetchmany(fetch)
+            if not rows:
+                break
+            # Budgets hold per row: a batch is cut at the first row that
+            # would take the text read past budget.bytes
+            open_columns = [index for index, state in enumerate(states) if not state.settled]
+            kept = 0
+            for row in rows:
+                size = sum(len(row[index]) for index in open_columns if isinstance(row[index], (str, bytes)))
+                if text_read + size > budget.bytes:
+                    break
+                text_read += size
+                kept += 1
+            exhausted = kept < len(rows)
+            rows = rows[:kept]
+            for index in open_columns:
+                state = states[index]
+                values = [row[index] for row in rows]
+                values = [v.decode('utf-8', 'replace') if isinstance(v, bytes) else v
+                          for v in values if isinstance(v, (str, bytes))]
+                if not values:
+                    continue
+                state.values += len(values)
+                state.hits.update(detect_batch(values, detectors))
+                if state.confident(min_hits, min_ratio):
+                    state.settled = True
+            if exhausted or all(state.settled for state in states):
+                break
+            # Wide rows: fetch no more than the byte budget has room for
+            rows_read += kept
+            if text_read:
+                fetch = max(1, min(batch_size, (budget.bytes - text_read) * rows_read // text_read))
+    finally:
+        cursor.close()
+
+    findings = {}
+    for col, state in zip(columns, states):
+        if state.confident(min_hits, min_ratio):
+            name, _ = state.best()
+            findings[col] = f"{by_name[name].category}, sampled {name}"
+    return findings
+
+# -----------------------------
+# Configuration
+# -----------------------------
+def load_budgets(path):
+    """(default Budget, {table: Budget}) from a JSON budgets file.
+
+    {"default": {"rows": 1000, "bytes": 1048576, "seconds": 2},
+     "tables": {"app.events": {"rows": 100}}}
+    Missing fields fall back to the default budget.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    default = DEFAULT_BUDGET._replace(**config.get('default', {}))
+    tables = {name: default._replace(**limits) for name, limits in config.get('tables', {}).items()}
+    return default, tables
+
+_connections = {}
+
+def shared_connection(url):
+    """db_connect.connect(url), opened once per interpreter"""
+    if url not in _connections:
+        _connections[url] = db_connect.connect(url)
+    return _connections[url]
+
+def _rollback(connection):
+    # PostgreSQL refuses every statement after an error until a rollback
+    try:
+        connection.rollback()
+    except Exception:
+        pass
+
+def sample_findings(connection, tables, findings, default=DEFAULT_BUDGET, budgets=None, log=None):
+    """Add sampled columns to {table: {column: category}} for (table, columns) pairs.
+
+    Only columns the name classifier did not already flag are read. When the
+    table cannot be read as a whole (missing table, permissions, a value the
+    driver cannot convert), each column is sampled on its own; the columns
+    that still fail are passed to log and keep their name-only result.
+    """
+    budgets = budgets or {}
+    database_error = getattr(connection, 'Error', Exception)
+    for table_name, cols in tables:
+        flagged = findings.get(table_name, {})
+        remaining = [col for col in cols if col and col not in flagged]
+        budget = budgets.get(table_name, default)
+        try:
+            sampled = sample_table(connection, table_name, remaining, budget)
+        except database_error:
+            _rollback(connection)
+            sampled = {}
+            for col in remaining:
+                try:
+                    sampled.update(sample_table(connection, table_name, [col], budget))
+                except database_error as e:
+                    _rollback(connection)
+                    if log:
+                        log(f"GDPR sampling skipped {table_name}.{col}: {e}")
+        if sampled:
+            findings[table_name] = {**flagged, **sampled}
+    return findings
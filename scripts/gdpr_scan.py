@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Batch GDPR Column Scanner
+
+Classifies every column of a database snapshot in one pass with the
+gdpr_check.py classifier and prints one report grouped by table, instead of
+running the check once per database object inside Liquibase.
+
+Produce the snapshot with:
+  liquibase snapshot --snapshot-format=json --output-file=snapshot.json
+
+Usage:
+  python scripts/gdpr_scan.py snapshot.json
+  python scripts/gdpr_scan.py --json snapshot.json    # machine-readable findings
+  python scripts/gdpr_scan.py --catalog my_catalog.json --threshold 1.5 snapshot.json
+  python scripts/gdpr_scan.py --sample sqlite:///app.db --sample-rows 500 snapshot.json
+
+--sample also reads a bounded number of rows per table and flags columns
+whose values look like e-mail addresses, IBANs, card numbers or phone
+numbers (see gdpr_sampling.py). --sample-budgets takes a JSON file with
+per-table row/byte/time limits.
+  liquibase snapshot --snapshot-format=json | python scripts/gdpr_scan.py -
+
+--url snapshots a database through snapshot_cache.py instead, reusing the
+cached snapshot while the schema fingerprint is unchanged:
+  python scripts/gdpr_scan.py --url jdbc:postgresql://localhost:5433/postgres
+
+Exit code: 0 when no column is flagged, 1 on findings, 2 when the snapshot
+or catalog cannot be read or sampling fails.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+import db_connect
+import gdpr_rules
+import gdpr_sampling
+import snapshot_cache
+
+
+def load_snapshot(path):
+    if path == '-':
+        return json.load(sys.stdin)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan a Liquibase JSON snapshot for personal-data columns")
+    parser.add_argument('snapshots', nargs='*', help="snapshot JSON file(s), or - for stdin")
+    parser.add_argument('--url', action='append', default=[],
+                        help="JDBC URL to snapshot through the snapshot cache (repeatable)")
+    parser.add_argument('--username', default=os.environ.get('LB_USER'), help="--url user (default: $LB_USER)")
+    parser.add_argument('--password', default=os.environ.get('LB_PASSWORD'), help="--url password (default: $LB_PASSWORD)")
+    parser.add_argument('--liquibase', default=os.environ.get('LIQUIBASE_BIN', 'liquibase'),
+                        help="Liquibase executable for --url (default: $LIQUIBASE_BIN or liquibase)")
+    parser.add_argument('--catalog', help="GDPR catalog JSON (default: scripts/gdpr_catalog.json)")
+    parser.add_argument('--threshold', type=float, help="score needed to flag a column (default: the catalog's)")
+    parser.add_argument('--sample', metavar='URL',
+                        help="also sample row values (sqlite:///path or postgresql://...)")
+    parser.add_argument('--sample-budgets', metavar='FILE', help="JSON with default and per-table sampling budgets")
+    parser.add_argument('--sample-rows', type=int, help="rows read per table (default: %d)" % gdpr_sampling.DEFAULT_BUDGET.rows)
+    parser.add_argument('--sample-bytes', type=int, help="text read per table (default: %d)" % gdpr_sampling.DEFAULT_BUDGET.bytes)
+    parser.add_argument('--sample-seconds', type=float, help="time spent per table (default: %s)" % gdpr_sampling.DEFAULT_BUDGET.seconds)
+    parser.add_argument('--json', action='store_true', help="print findings as JSON {table: {column: category}}")
+    args = parser.parse_args(argv)
+    if not args.snapshots and not args.url:
+        parser.error("give a snapshot file or --url")
+
+    started = time.perf_counter()
+    tables = []
+    try:
+        classifier = gdpr_rules.get_classifier(args.catalog, args.threshold)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Cannot load GDPR catalog: {e}")
+        return 2
+    snapshots = list(args.snapshots)
+    for url in args.url:
+        try:
+            path, _ = snapshot_cache.snapshot(url, args.username, args.password, args.liquibase, log=sys.stderr)
+        except (OSError, RuntimeError) as e:
+            print(f"❌ Cannot snapshot {url}: {e}")
+            return 2
+        snapshots.append(path)
+    try:
+        for path in snapshots:
+            tables.extend(gdpr_rules.tables_from_snapshot(load_snapshot(path)))
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"❌ Cannot read snapshot: {e}")
+        return 2
+
+    findings = gdpr_rules.classify_tables(tables, classifier)
+    if args.sample:
+        try:
+            default, budgets = gdpr_sampling.DEFAULT_BUDGET, {}
+            if args.sample_budgets:
+                default, budgets = gdpr_sampling.load_budgets(args.sample_budgets)
+            overrides = {'rows': args.sample_rows, 'bytes': args.sample_bytes, 'seconds': args.sample_seconds}
+            default = default._replace(**{k: v for k, v in overrides.items() if v is not None})
+            connection = db_connect.connect(args.sample)
+            gdpr_sampling.sample_findings(connection, tables, findings, default, budgets,
+                                          log=lambda message: print(f"⚠️  {message}", file=sys.stderr))
+            connection.close()
+        except Exception as e:
+            print(f"❌ Sampling failed: {e}")
+            return 2
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps(findings, indent=2, sort_keys=True))
+    else:
+        if findings:
+            print(gdpr_rules.format_report(findings))
+        columns = sum(len(cols) for _, cols in tables)
+        print(f"\nScanned {columns} column(s) in {len(tables)} table(s) in {elapsed:.2f}s: "
+              f"{len(findings)} table(s) flagged")
+    return 1 if findings else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
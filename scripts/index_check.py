@@ -0,0 +1,510 @@
+#!/usr/bin/env python3
+"""
+Index Usefulness Analyzer
+
+Replays the DDL of every formatted-SQL changeset of a changelog tree, in
+include order, into an in-memory model of the tables, indexes and PRIMARY
+KEY / UNIQUE constraints it declares (following later drops and renames),
+then reports the indexes that only slow writes down:
+
+  duplicate      same table, columns, method and predicate as an earlier index
+  constraint     repeats a PRIMARY KEY or UNIQUE constraint's own index, e.g.
+                 CREATE INDEX idx_customers_email ON customers (email) next to
+                 email ... UNIQUE
+  left-prefix    its columns are a leading prefix of another B-tree index
+                 with the same predicate, which serves the same lookups
+
+Unique indexes are never called prefix-redundant: they enforce something.
+Per table the report gives the write amplification: the index entries every
+INSERT writes (one per index, plus the heap row), and what it drops to once
+the redundant indexes are gone.
+
+Only changesets whose statements create, alter or drop tables and indexes
+are read at all, and a statement the shared changeset index already holds
+in full (its head was not cut) is taken from the index without tokenizing.
+The extracted DDL of each file is cached by content hash under
+<cache dir>/ddl/, and files are read in parallel with -j.
+
+Usage:
+  python scripts/index_check.py                          # liquibase.properties changeLogFile
+  python scripts/index_check.py changelog-sql/main.root.xml
+  python scripts/index_check.py --tables ...             # list write amplification of every table
+  python scripts/index_check.py --json ...
+
+Exit code: 0 when no redundant index is found, 1 when there are some, 2 when
+the changelog tree cannot be read.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+import changeset_index
+import sql_tokenizer
+import validate_changelog
+
+CACHE_DIR = os.environ.get("VALIDATE_SYNTAX_CACHE_DIR", ".liquibase-cache")
+
+NAME = r'(?:"[^"]+"|[a-z_][\w$]*)(?:\.(?:"[^"]+"|[a-z_][\w$]*))*'
+
+# Heads worth tokenizing in full; everything else cannot change the model
+RELEVANT_HEAD = re.compile(r'^\s*(?:create\s+(?:unique\s+)?index|create\s+(?:\w+\s+)*?table|alter\s+table|'
+                           r'alter\s+index|drop\s+(?:index|table))\b', re.IGNORECASE)
+
+CREATE_TABLE = re.compile(rf'^create\s+(?:(?:global\s+|local\s+)?(?:temp|temporary|unlogged)\s+)?table\s+'
+                          rf'(?:if\s+not\s+exists\s+)?({NAME})\s*\((.*)\)', re.S)
+CREATE_INDEX = re.compile(rf'^create\s+(unique\s+)?index\s+(?:concurrently\s+)?(?:if\s+not\s+exists\s+)?'
+                          rf'(?:({NAME})\s+)?on\s+(?:only\s+)?({NAME})\s*(?:using\s+(\w+)\s*)?\(', re.S)
+ALTER_TABLE = re.compile(rf'^alter\s+table\s+(?:if\s+exists\s+)?(?:only\s+)?({NAME})\s+(.*)$', re.S)
+ALTER_INDEX_RENAME = re.compile(rf'^alter\s+index\s+(?:if\s+exists\s+)?({NAME})\s+rename\s+to\s+({NAME})')
+DROP_INDEX = re.compile(rf'^drop\s+index\s+(?:concurrently\s+)?(?:if\s+exists\s+)?(.*?)(?:\s+(?:cascade|restrict))?\s*;?$', re.S)
+DROP_TABLE = re.compile(rf'^drop\s+table\s+(?:if\s+exists\s+)?(.*?)(?:\s+(?:cascade|restrict))?\s*;?$', re.S)
+
+CONSTRAINT_NAME = re.compile(rf'^constraint\s+({NAME})\s+(.*)$', re.S)
+KEY_CONSTRAINT = re.compile(r'^(primary\s+key|unique)(?:\s+nulls\s+(?:not\s+)?distinct)?\s*\((.*?)\)(.*)$', re.S)
+USING_INDEX = re.compile(rf'\busing\s+index\s+({NAME})')
+ADD = re.compile(rf'^add\s+(?:constraint\s+({NAME})\s+)?(primary\s+key|unique)\b(.*)$', re.S)
+ADD_COLUMN = re.compile(rf'^add\s+(?:column\s+)?(?:if\s+not\s+exists\s+)?({NAME})\s+(.*)$', re.S)
+DROP_CONSTRAINT = re.compile(rf'^drop\s+constraint\s+(?:if\s+exists\s+)?({NAME})')
+DROP_COLUMN = re.compile(rf'^drop\s+(?:column\s+)?(?:if\s+exists\s+)?({NAME})')
+RENAME_TABLE = re.compile(rf'^rename\s+to\s+({NAME})')
+RENAME_COLUMN = re.compile(rf'^rename\s+(?:column\s+)?({NAME})\s+to\s+({NAME})')
+RENAME_CONSTRAINT = re.compile(rf'^rename\s+constraint\s+({NAME})\s+to\s+({NAME})')
+INLINE_KEY = re.compile(r'\b(primary\s+key|unique)\b')
+DEFAULT_ORDER = re.compile(r'\s+(?:asc|nulls\s+last)$')
+
+PUNCTUATION = re.compile(r"[(),']")
+
+NOT_COLUMNS = ('constraint', 'primary', 'unique', 'foreign', 'check', 'exclude', 'like')
+WHITESPACE = re.compile(r'\s+')
+
+
+def _normalize(text):
+    return WHITESPACE.sub(' ', text.replace('"', '').lower()).strip()
+
+
+def _last(name):
+    return name.rsplit('.', 1)[-1]
+
+
+def _split(text):
+    """Split on commas outside parentheses and quotes"""
+    parts, depth, quoted, start = [], 0, False, 0
+    for match in PUNCTUATION.finditer(text):
+        ch = match.group()
+        if ch == "'":
+            quoted = not quoted
+        elif not quoted:
+            if ch == '(':
+                depth += 1
+            elif ch == ')':
+                depth -= 1
+            elif depth == 0:
+                parts.append(text[start:match.start()].strip())
+                start = match.end()
+    parts.append(text[start:].strip())
+    return [p for p in parts if p]
+
+
+def _closing(text, start):
+    """Index of the parenthesis closing the one at text[start]"""
+    depth, quoted = 0, False
+    for match in PUNCTUATION.finditer(text, start):
+        ch = match.group()
+        if ch == "'":
+            quoted = not quoted
+        elif not quoted:
+            if ch == '(':
+                depth += 1
+            elif ch == ')':
+                depth -= 1
+                if depth == 0:
+                    return match.start()
+    return len(text)
+
+
+def _key_columns(text):
+    """Normalized index key: ('email',), ('lower(email)',), ('created_at desc',)"""
+    return tuple(DEFAULT_ORDER.sub('', column.strip()) for column in _split(text))
+
+
+###
+### Model
+###
+class Index:
+    """One index, whether from CREATE INDEX or a PRIMARY KEY / UNIQUE constraint"""
+    __slots__ = ('name', 'table', 'columns', 'unique', 'kind', 'method', 'predicate', 'include', 'where')
+
+    def __init__(self, name, table, columns, unique, kind, where, method='btree', predicate='', include=()):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.unique = unique
+        self.kind = kind            # 'index', 'primary key' or 'unique'
+        self.method = method
+        self.predicate = predicate
+        self.include = include
+        self.where = where          # (file, line, changeset id)
+
+    @property
+    def constraint(self):
+        return self.kind != 'index'
+
+    def describe(self):
+        label = self.kind.upper() if self.constraint else ('unique index' if self.unique else 'index')
+        partial = f" WHERE {self.predicate}" if self.predicate else ''
+        return f"{label} {self.name} ({', '.join(self.columns)}){partial}"
+
+
+class Schema:
+    """Tables and their indexes as the changelog leaves them, built statement by statement"""
+
+    def __init__(self):
+        self.tables = {}            # table -> {index name: Index}
+        self.index_tables = {}      # index name -> table
+
+    def _add(self, index):
+        self.tables.setdefault(index.table, {})[index.name] = index
+        self.index_tables[index.name] = index.table
+
+    def _drop_index(self, name):
+        table = self.index_tables.pop(name, None)
+        if table is not None:
+            self.tables.get(table, {}).pop(name, None)
+
+    def _drop_table(self, table):
+        for name in self.tables.pop(table, {}):
+            self.index_tables.pop(name, None)
+
+    def _key_constraint(self, table, name, kind, columns, where):
+        kind = WHITESPACE.sub(' ', kind)
+        if name is None:
+            name = f"{table}_pkey" if kind == 'primary key' else f"{table}_{'_'.join(columns)}_key"
+        self._add(Index(name, table, columns, True, kind, where))
+
+    def apply(self, statement, where):
+        """Replay one normalized statement"""
+        match = CREATE_INDEX.match(statement)
+        if match:
+            unique, name, table, method = match.groups()
+            start = match.end() - 1
+            end = _closing(statement, start)
+            rest = statement[end + 1:]
+            include = ()
+            included = re.match(r'\s*include\s*\((.*?)\)', rest)
+            if included:
+                include = _key_columns(included.group(1))
+            predicate = rest.split(' where ', 1)[1].strip().rstrip(';').strip() if ' where ' in f" {rest}" else ''
+            table = _last(table)
+            name = _last(name) if name else f"{table}_{'_'.join(_key_columns(statement[start + 1:end]))}_idx"
+            self._add(Index(name, table, _key_columns(statement[start + 1:end]), bool(unique), 'index', where,
+                            method or 'btree', predicate, include))
+            return
+
+        match = CREATE_TABLE.match(statement)
+        if match:
+            table = _last(match.group(1))
+            self._drop_table(table)
+            self.tables[table] = {}
+            body = statement[statement.index('(', match.start(2) - 1) + 1:_closing(statement, match.start(2) - 1)]
+            for element in _split(body):
+                self._table_element(table, element, where)
+            return
+
+        match = ALTER_TABLE.match(statement)
+        if match:
+            table = _last(match.group(1))
+            for action in _split(match.group(2).rstrip(';')):
+                self._alter_action(table, action, where)
+            return
+
+        match = ALTER_INDEX_RENAME.match(statement)
+        if match:
+            self._rename_index(_last(match.group(1)), _last(match.group(2)))
+            return
+
+        match = DROP_INDEX.match(statement)
+        if match:
+            for name in _split(match.group(1)):
+                self._drop_index(_last(name))
+            return
+
+        match = DROP_TABLE.match(statement)
+        if match:
+            for table in _split(match.group(1)):
+                self._drop_table(_last(table))
+
+    def _table_element(self, table, element, where):
+        name = None
+        named = CONSTRAINT_NAME.match(element)
+        if named:
+            name, element = _last(named.group(1)), named.group(2)
+        key = KEY_CONSTRAINT.match(element)
+        if key:
+            self._key_constraint(table, name, key.group(1), _key_columns(key.group(2)), where)
+            return
+        column = element.split(' ', 1)[0]
+        if column in NOT_COLUMNS or named:
+            return
+        self._inline_keys(table, column, element, where)
+
+    def _inline_keys(self, table, column, definition, where):
+        # Constraint clauses after the type: [CONSTRAINT x] PRIMARY KEY | UNIQUE
+        for match in INLINE_KEY.finditer(definition.split(' references ', 1)[0]):
+            before = definition[:match.start()].split()
+            name = _last(before[-1]) if len(before) >= 2 and before[-2] == 'constraint' else None
+            self._key_constraint(table, name, match.group(1), (column,), where)
+
+    def _alter_action(self, table, action, where):
+        match = ADD.match(action)
+        if match:
+            name, kind, rest = match.groups()
+            name = _last(name) if name else None
+            using = USING_INDEX.search(rest)
+            if using:
+                # The existing index becomes the constraint's index
+                index = self.tables.get(table, {}).get(_last(using.group(1)))
+                self._drop_index(_last(using.group(1)))
+                if index:
+                    self._key_constraint(table, name or index.name, kind, index.columns, index.where)
+                return
+            columns = re.match(r'\s*(?:nulls\s+(?:not\s+)?distinct\s*)?\((.*?)\)', rest)
+            if columns:
+                self._key_constraint(table, name, kind, _key_columns(columns.group(1)), where)
+            return
+
+        match = DROP_CONSTRAINT.match(action)
+        if match:
+            self._drop_index(_last(match.group(1)))
+            return
+
+        match = RENAME_CONSTRAINT.match(action)
+        if match:
+            self._rename_index(_last(match.group(1)), _last(match.group(2)))
+            return
+
+        match = RENAME_TABLE.match(action)
+        if match:
+            new = _last(match.group(1))
+            indexes = self.tables.pop(table, {})
+            for index in indexes.values():
+                index.table = new
+                self.index_tables[index.name] = new
+            self.tables[new] = indexes
+            return
+
+        match = RENAME_COLUMN.match(action)
+        if match:
+            old, new = _last(match.group(1)), _last(match.group(2))
+            for index in self.tables.get(table, {}).values():
+                index.columns = tuple(new if c == old else c for c in index.columns)
+            return
+
+        if action.startswith('drop'):
+            match = DROP_COLUMN.match(action)
+            if match and match.group(1) not in NOT_COLUMNS:
+                column = _last(match.group(1))
+                for index in list(self.tables.get(table, {}).values()):
+                    if column in index.columns:
+                        self._drop_index(index.name)
+            return
+
+        match = ADD_COLUMN.match(action)
+        if match and match.group(1) not in NOT_COLUMNS:
+            self._inline_keys(table, _last(match.group(1)), match.group(2), where)
+
+    def _rename_index(self, old, new):
+        table = self.index_tables.pop(old, None)
+        if table is None:
+            return
+        index = self.tables[table].pop(old)
+        index.name = new
+        self._add(index)
+
+
+###
+### Findings
+###
+def redundant(indexes):
+    """[(index, category, the index that makes it redundant)] for one table's indexes, in declaration order"""
+    found = []
+    ordered = list(indexes)
+    for position, index in enumerate(ordered):
+        if index.constraint:
+            continue
+        for other in ordered:
+            if other is index or other.method != index.method or other.predicate != index.predicate:
+                continue
+            if other.columns == index.columns:
+                if other.constraint:
+                    if not index.unique or other.kind in ('primary key', 'unique'):
+                        found.append((index, 'constraint', other))
+                        break
+                elif ordered.index(other) < position and (other.unique or not index.unique) \
+                        and set(index.include) <= set(other.include):
+                    found.append((index, 'duplicate', other))
+                    break
+            elif (not index.unique and index.method == 'btree'
+                  and len(other.columns) > len(index.columns)
+                  and other.columns[:len(index.columns)] == index.columns and not index.include):
+                found.append((index, 'left-prefix', other))
+                break
+    return found
+
+
+_ddl_fingerprint = None
+
+
+def _fingerprint():
+    """Hash of this script and the tokenizer; cached DDL carries it"""
+    global _ddl_fingerprint
+    if _ddl_fingerprint is None:
+        digest = hashlib.sha256(changeset_index.tokenizer_fingerprint().encode('utf-8'))
+        with open(__file__, 'rb') as f:
+            digest.update(f.read())
+        _ddl_fingerprint = digest.hexdigest()
+    return _ddl_fingerprint
+
+
+def _statements(file_index):
+    seen = set()
+    for entry in file_index:
+        if entry.id in seen:
+            continue
+        seen.add(entry.id)
+        relevant = [(line, head) for line, _, _, _, head in entry.statements if RELEVANT_HEAD.match(head)]
+        if not relevant:
+            continue
+        if all(len(head) < changeset_index.HEAD_LENGTH for _, head in relevant):
+            # A head shorter than the cut is the whole statement
+            for line, head in relevant:
+                yield line, entry.id, _normalize(head)
+            continue
+        scanner = sql_tokenizer.Scanner(keep_text=True)
+        for i, line in enumerate(file_index.lines(entry), entry.start_line):
+            scanner.feed(i, line)
+        for statement in scanner.close().statements:
+            if statement.text and RELEVANT_HEAD.match(statement.text):
+                yield statement.start_line, entry.id, _normalize(statement.text)
+
+
+def statements_of(path, cache_dir=CACHE_DIR):
+    """(changeset count, [(file line, changeset id, normalized statement)]) for the DDL of one file.
+
+    Kept under <cache dir>/ddl/<sha256 of the file>.json, so a file is only
+    tokenized again when it changes.
+    """
+    file_index = changeset_index.load(path, cache_dir)
+    sidecar = os.path.join(cache_dir, 'ddl', f"{file_index.digest}.json")
+    fingerprint = _fingerprint()
+    try:
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('fingerprint') == fingerprint:
+            return data['changesets'], [tuple(s) for s in data['statements']]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    changesets = len({entry.id for entry in file_index})
+    statements = list(_statements(file_index))
+    try:
+        os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+        tmp = f"{sidecar}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': fingerprint, 'changesets': changesets, 'statements': statements}, f)
+        os.replace(tmp, sidecar)
+    except OSError:
+        pass
+    return changesets, statements
+
+
+def analyze(files, jobs=1):
+    """(Schema, findings, changeset count) for the changelog files in include order"""
+    if jobs > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(files))) as pool:
+            extracted = list(pool.map(statements_of, files, chunksize=4))
+    else:
+        extracted = [statements_of(path) for path in files]
+
+    # Replaying is sequential: later files alter what earlier ones declared
+    schema = Schema()
+    count = 0
+    for path, (changesets, statements) in zip(files, extracted):
+        relative = os.path.relpath(path)
+        for line, changeset_id, statement in statements:
+            schema.apply(statement, (relative, line, changeset_id))
+        count += changesets
+    findings = {table: redundant(indexes.values()) for table, indexes in schema.tables.items()}
+    return schema, findings, count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find duplicate and redundant indexes declared in a changelog tree")
+    parser.add_argument('paths', nargs='*', help="root changelog(s), SQL files or directories")
+    parser.add_argument('--search-path', default='.', help="base for non-relative includes (default: .)")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--tables', action='store_true', help="list write amplification of every table")
+    parser.add_argument('--json', action='store_true', help="print findings and per-table counts as JSON")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        files = validate_changelog.collect_sql_files(args.paths or [validate_changelog.default_changelog()],
+                                                     args.search_path)
+        schema, findings, count = analyze(files, args.jobs)
+    except (OSError, SyntaxError, UnicodeDecodeError) as e:
+        print(f"❌ Cannot read changelog tree: {e}")
+        return 2
+    elapsed = time.perf_counter() - started
+
+    rows = []
+    tables = []
+    for table in sorted(schema.tables):
+        indexes = schema.tables[table]
+        extra = findings.get(table, [])
+        # Every INSERT writes the heap row and one entry per index
+        tables.append({'table': table, 'indexes': len(indexes), 'redundant': len(extra),
+                       'writes_per_insert': 1 + len(indexes), 'without_redundant': 1 + len(indexes) - len(extra)})
+        for index, category, other in extra:
+            file, line, changeset_id = index.where
+            rows.append({'file': file, 'line': line, 'changeset': changeset_id, 'table': table,
+                         'index': index.name, 'category': category, 'covered_by': other.name,
+                         'message': f"{index.describe()} is redundant: {_reason(category, other)}"})
+    rows.sort(key=lambda r: (r['file'], r['line']))
+
+    if args.json:
+        print(json.dumps({'findings': rows, 'tables': tables}, indent=2))
+    else:
+        for r in rows:
+            print(f"{r['file']}:{r['line']}: [WARN] {r['changeset']}: {r['message']}")
+        affected = [t for t in tables if t['redundant'] or args.tables]
+        if affected:
+            print("\nWrite amplification (entries written per INSERT, heap row included):")
+            for t in affected:
+                after = f" -> {t['without_redundant']} without the redundant index(es)" if t['redundant'] else ''
+                print(f"  {t['table']}: {t['writes_per_insert']} ({t['indexes']} index(es)){after}")
+        total = sum(t['indexes'] for t in tables)
+        print(f"\nModeled {total} index(es) on {len(tables)} table(s) from {count} changeset(s) "
+              f"in {len(files)} file(s) in {elapsed:.2f}s: {len(rows)} redundant")
+    return 1 if rows else 0
+
+
+def _reason(category, other):
+    if category == 'constraint':
+        return f"{other.describe()} already indexes the same columns"
+    if category == 'duplicate':
+        return f"same definition as {other.describe()}"
+    return f"its columns lead {other.describe()}, which serves the same lookups"
+
+
+if __name__ == "__main__":
+    sys.exit(main())
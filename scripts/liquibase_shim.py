@@ -0,0 +1,143 @@
+###
+### Stand-in for Liquibase's liquibase_utilities module
+###
+### Lets the custom check scripts run outside the JVM: install() registers a
+### fake 'liquibase_utilities' in sys.modules that serves the given changeset
+### or database object, and run_check() executes a check script against it
+### exactly as Liquibase would, returning (fired, message). Scripts are
+### compiled once per file version, so repeated runs only pay for the check.
+###
+### The module is deliberately not named liquibase_utilities so it can never
+### shadow the real one when scripts/ is on sys.path inside Liquibase.
+###
+import builtins
+import os
+import sys
+import types
+
+class Status:
+    def __init__(self):
+        self.fired = False
+        self.message = None
+
+class Logger:
+    def __init__(self, sink=None):
+        self.sink = sink
+
+    def _log(self, level, message):
+        if self.sink is not None:
+            self.sink.append((level, message))
+
+    def info(self, message):
+        self._log('INFO', message)
+
+    def warning(self, message):
+        self._log('WARNING', message)
+
+    def severe(self, message):
+        self._log('SEVERE', message)
+
+    def fine(self, message):
+        self._log('FINE', message)
+
+class ChangeLog:
+    def __init__(self, physical_path):
+        self.physical_path = physical_path
+
+    def getPhysicalFilePath(self):
+        return self.physical_path
+
+class ChangeSet:
+    def __init__(self, physical_path, author, changeset_id):
+        self.changelog = ChangeLog(physical_path)
+        self.author = author
+        self.changeset_id = changeset_id
+
+    def getChangeLog(self):
+        return self.changelog
+
+    def getAuthor(self):
+        return self.author
+
+    def getId(self):
+        return self.changeset_id
+
+class DatabaseObject:
+    """Minimal table/column object: getName(), getColumns(), getTable()"""
+
+    def __init__(self, name, object_type, columns=None, table=None):
+        self.name = name
+        self.object_type = object_type
+        self.columns = columns or []
+        self.table = table
+
+    def getName(self):
+        return self.name
+
+    def getColumns(self):
+        return self.columns
+
+    def getTable(self):
+        return self.table
+
+    def __str__(self):
+        return self.name
+
+def table(name, column_names):
+    """Build a TABLE object whose columns point back at it"""
+    tbl = DatabaseObject(name, 'table')
+    tbl.columns = [DatabaseObject(col, 'column', table=tbl) for col in column_names]
+    return tbl
+
+def install(changeset=None, database_object=None, args=None, log=None):
+    """Register a fake liquibase_utilities module and return it"""
+    module = types.ModuleType('liquibase_utilities')
+    status = Status()
+    logger = Logger(log)
+    args = dict(args or {})
+
+    module.get_logger = lambda: logger
+    module.get_status = lambda: status
+    module.get_changeset = lambda: changeset
+    module.get_database_object = lambda: database_object
+    module.get_arg = lambda name: args.get(name)
+    module.get_object_type_name = lambda obj: getattr(obj, 'object_type', None)
+    module.is_table = lambda obj: getattr(obj, 'object_type', None) == 'table'
+    module.is_column = lambda obj: getattr(obj, 'object_type', None) == 'column'
+    module.get_columns = lambda obj: list(getattr(obj, 'columns', []))
+
+    sys.modules['liquibase_utilities'] = module
+    return module
+
+_compiled = {}
+
+def compiled(script_path):
+    """Code object of a check script, compiled once per file version"""
+    stat = os.stat(script_path)
+    key = (os.path.abspath(script_path), stat.st_mtime_ns, stat.st_size)
+    code = _compiled.get(key)
+    if code is None:
+        with open(script_path, 'rb') as f:
+            code = _compiled[key] = compile(f.read(), script_path, 'exec')
+    return code
+
+def execute(script_path, **context):
+    """Run one check script with install(**context); return (status, exit code or None)"""
+    previous = sys.modules.get('liquibase_utilities')
+    module = install(**context)
+    exit_code = None
+    try:
+        exec(compiled(script_path), {'__name__': '__main__', '__file__': script_path, '__builtins__': builtins})
+    except SystemExit as e:
+        exit_code = e.code
+    finally:
+        if previous is not None:
+            sys.modules['liquibase_utilities'] = previous
+        else:
+            sys.modules.pop('liquibase_utilities', None)
+    return module.get_status(), exit_code
+
+def run_check(script_path, **context):
+    """Run one check script with install(**context); return (fired, message)"""
+    status, _ = execute(script_path, **context)
+    return status.fired, status.message
@@ -0,0 +1,115 @@
+###
+### Lock-Contention and Long-DDL Risk Check for Liquibase
+###
+### Classifies the lock each statement of a formatted-SQL changeset takes and
+### what it costs while holding it (see lock_rules.py). Fires on statements
+### that would block traffic on a large table and on CONCURRENTLY inside a
+### transaction; other blocking builds, scans and rewrites are logged.
+###
+### SCRIPT_ARGS TABLE_SIZES=<manifest.json> (or LOCK_CHECK_TABLE_SIZES) gives
+### the row and byte counts that decide which tables are large.
+###
+import os
+import sys
+import types
+import liquibase_utilities
+
+###
+### Rules live beside this script
+###
+SCRIPT_DIR = os.path.dirname(os.path.abspath(globals().get('__file__') or os.path.join('scripts', 'lock_check.py')))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+import changeset_index
+import lock_rules
+
+###
+### Retrieve handlers
+###
+liquibase_logger = liquibase_utilities.get_logger()
+liquibase_status = liquibase_utilities.get_status()
+
+###
+### Get the current changeset being processed
+###
+changeset = liquibase_utilities.get_changeset()
+filepath = changeset.getChangeLog().getPhysicalFilePath()
+
+###
+### Ignore if not sql file
+###
+ext = os.path.splitext(filepath)[-1].lower()
+if ext != ".sql":
+    liquibase_logger.info(f"{ext} file extension skipped.")
+    liquibase_status.fired = False
+    sys.exit(0)
+
+CACHE_DIR = os.environ.get("VALIDATE_SYNTAX_CACHE_DIR", ".liquibase-cache")
+
+# Survives re-execution of this script inside the same interpreter
+_memory_cache = sys.modules.setdefault("_lock_check_cache", types.ModuleType("_lock_check_cache"))
+
+def script_arg(name):
+    try:
+        return liquibase_utilities.get_arg(name)
+    except Exception:
+        return None
+
+###
+### Table-size manifest, read once per interpreter
+###
+sizes_path = lock_rules.sizes_path(script_arg("TABLE_SIZES"))
+sizes = None
+if sizes_path:
+    cached = getattr(_memory_cache, "sizes", None)
+    if cached and cached[0] == sizes_path:
+        sizes = cached[1]
+    else:
+        try:
+            sizes = lock_rules.TableSizes.load(sizes_path)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            liquibase_status.fired = True
+            liquibase_status.message = f"Failed to read table sizes {sizes_path}: {str(e)}"
+            sys.exit(1)
+        _memory_cache.sizes = (sizes_path, sizes)
+
+###
+### Locate the changeset through the shared index
+###
+try:
+    current_changeset_id = f"{changeset.getAuthor()}:{changeset.getId()}"
+except:
+    current_changeset_id = None
+
+try:
+    file_index = changeset_index.load(filepath, CACHE_DIR, liquibase_logger.info)
+    entry = file_index.get(current_changeset_id) if current_changeset_id else None
+    lines = file_index.lines(entry) if entry else None
+except Exception as e:
+    liquibase_status.fired = True
+    liquibase_status.message = f"Failed to read file: {str(e)}"
+    sys.exit(1)
+
+if not entry:
+    liquibase_logger.info(f"Changeset {current_changeset_id} not found")
+    liquibase_status.fired = False
+    sys.exit(0)
+
+###
+### Classify and report
+###
+findings = lock_rules.analyze_lines(lines, entry.start_line, sizes, entry.attributes)
+if findings:
+    report = lock_rules.format_report(current_changeset_id, findings)
+    liquibase_logger.info(report)
+    if any(severity == 'ERROR' for _, _, severity in findings):
+        liquibase_status.fired = True
+        liquibase_status.message = report
+        sys.exit(1)
+
+###
+### Success
+###
+liquibase_logger.info(f"✓ Lock risk checked: {current_changeset_id}")
+liquibase_status.fired = False
+False
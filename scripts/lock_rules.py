@@ -0,0 +1,352 @@
+###
+### Lock-level and rewrite-cost rules for lock_check.py and lock_scan.py
+###
+### Every statement of a changeset is classified by the PostgreSQL lock it
+### takes on the table it touches and by what it costs while holding it:
+###   metadata  catalog change only, done as soon as the lock is granted
+###   build     builds an index over every row
+###   scan      reads every row (validating a constraint, SET NOT NULL)
+###   rewrite   writes a new copy of the table (volatile default, TYPE change)
+### A build, scan or rewrite under a lock that blocks writes is an outage on
+### a busy table. With a table-size manifest the risk is judged per table:
+### large tables are errors, small ones are left alone. Without one every
+### such statement is a warning. Each finding names the non-blocking form.
+###
+### Tables created in the same changeset are empty and never reported.
+###
+import json
+import os
+import re
+
+import changeset_index
+import sql_tokenizer
+
+ACCESS_EXCLUSIVE = 'ACCESS EXCLUSIVE'
+EXCLUSIVE = 'EXCLUSIVE'
+SHARE_ROW_EXCLUSIVE = 'SHARE ROW EXCLUSIVE'
+SHARE = 'SHARE'
+SHARE_UPDATE_EXCLUSIVE = 'SHARE UPDATE EXCLUSIVE'
+
+BLOCKS = {
+    ACCESS_EXCLUSIVE: "blocks reads and writes",
+    EXCLUSIVE: "blocks writes",
+    SHARE_ROW_EXCLUSIVE: "blocks writes",
+    SHARE: "blocks writes",
+}
+COSTS = {
+    'build': "builds an index over every row",
+    'scan': "scans every row",
+    'rewrite': "rewrites the whole table",
+}
+
+# A table counts as large from either limit; a manifest may override both
+LARGE_ROWS = 1_000_000
+LARGE_BYTES = 1 << 30
+
+NAME = r'(?:"[^"]+"|[a-z_][\w$]*)(?:\.(?:"[^"]+"|[a-z_][\w$]*))*'
+
+CREATE_TABLE = re.compile(rf'^create\s+(?:(?:global\s+|local\s+)?(?:temp|temporary|unlogged)\s+)?table\s+'
+                          rf'(?:if\s+not\s+exists\s+)?({NAME})')
+CREATE_INDEX = re.compile(rf'^create\s+(unique\s+)?index\s+(concurrently\s+)?(?:if\s+not\s+exists\s+)?'
+                          rf'(?:{NAME}\s+)?on\s+(?:only\s+)?({NAME})')
+ALTER_TABLE = re.compile(rf'^alter\s+table\s+(?:if\s+exists\s+)?(?:only\s+)?({NAME})\s+(.*)$', re.S)
+REINDEX = re.compile(rf'^reindex\s+(?:\([^)]*\)\s+)?(table|index)\s+(concurrently\s+)?({NAME})')
+VACUUM_FULL = re.compile(rf'^vacuum\s+(?:\((?=[^)]*\bfull\b)[^)]*\)|full(?:\s+(?:freeze|verbose|analyze))*)\s+({NAME})')
+CLUSTER = re.compile(rf'^cluster\s+(?:verbose\s+)?({NAME})')
+REFRESH = re.compile(rf'^refresh\s+materialized\s+view\s+(concurrently\s+)?({NAME})')
+LOCK_TABLE = re.compile(rf'^lock\s+(?:table\s+)?(?:only\s+)?({NAME})(?:\s+in\s+([a-z ]+?)\s+mode)?')
+CREATE_TRIGGER = re.compile(rf'^create\s+(?:or\s+replace\s+)?(?:constraint\s+)?trigger\s+.*?\s+on\s+({NAME})', re.S)
+CONCURRENTLY = re.compile(r'^(?:create|drop|reindex|refresh)\b.*\bconcurrently\b', re.S)
+LOCK_TIMEOUT = re.compile(r'^set\s+(?:local\s+)?lock_timeout\b')
+
+ADD_CONSTRAINT = re.compile(r'^add\s+(?:constraint\s+\S+\s+)?(primary\s+key|unique|foreign\s+key|check|exclude)\b')
+ADD_COLUMN = re.compile(rf'^add\s+(?:column\s+)?(?:if\s+not\s+exists\s+)?({NAME})\s+(.*)$', re.S)
+ALTER_COLUMN_TYPE = re.compile(rf'^alter\s+(?:column\s+)?({NAME})\s+(?:set\s+data\s+)?type\b')
+SET_NOT_NULL = re.compile(rf'^alter\s+(?:column\s+)?({NAME})\s+set\s+not\s+null\b')
+NON_BLOCKING_ACTIONS = re.compile(r'^(?:validate\s+constraint|set\s+statistics|alter\s+(?:column\s+)?\S+\s+set\s+statistics)\b')
+REWRITING_ACTIONS = re.compile(r'^(?:set\s+(?:logged|unlogged|tablespace|without\s+oids)\b|cluster\s+on\b)')
+
+VOLATILE_DEFAULT = re.compile(r'\bdefault\s+.*\b(random|clock_timestamp|timeofday|gen_random_uuid|'
+                              r'uuid_generate_v\w+|nextval|txid_current)\s*\(', re.S)
+SERIAL_TYPE = re.compile(r'^(?:small|big)?serial\d?\b')
+STORED_COLUMN = re.compile(r'\bgenerated\s+(?:always\s+as\s*\(.*\)\s*stored|(?:always|by\s+default)\s+as\s+identity)', re.S)
+INLINE_INDEX = re.compile(r'\b(?:primary\s+key|unique)\b')
+
+WHITESPACE = re.compile(r'\s+')
+
+def _normalize(text):
+    return WHITESPACE.sub(' ', text.replace('"', '').lower()).strip()
+
+def _last(name):
+    return name.rsplit('.', 1)[-1]
+
+def _split_actions(rest):
+    """ALTER TABLE actions: the text split on commas outside parentheses and quotes"""
+    actions, depth, quoted, current = [], 0, False, []
+    for ch in rest:
+        if ch == "'":
+            quoted = not quoted
+        elif not quoted:
+            if ch == '(':
+                depth += 1
+            elif ch == ')':
+                depth -= 1
+            elif ch == ',' and depth == 0:
+                actions.append(''.join(current).strip())
+                current = []
+                continue
+        current.append(ch)
+    actions.append(''.join(current).strip().rstrip(';').strip())
+    return [a for a in actions if a]
+
+###
+### Classification
+###
+class Risk:
+    """What one statement does to one table while it holds its lock"""
+    __slots__ = ('table', 'lock', 'cost', 'operation', 'suggestion')
+
+    def __init__(self, table, lock, cost, operation, suggestion=None):
+        self.table = table
+        self.lock = lock
+        self.cost = cost
+        self.operation = operation
+        self.suggestion = suggestion
+
+    @property
+    def blocking(self):
+        return self.lock in BLOCKS
+
+    def __repr__(self):
+        return f"<Risk {self.operation} {self.lock} {self.cost} on {self.table}>"
+
+def _alter_action(table, action):
+    """Risk of one ALTER TABLE action, or None when it takes no blocking lock"""
+    if NON_BLOCKING_ACTIONS.match(action):
+        return None
+
+    match = ADD_CONSTRAINT.match(action)
+    if match:
+        kind = WHITESPACE.sub(' ', match.group(1))
+        not_valid = ' not valid' in action
+        if kind in ('primary key', 'unique'):
+            if ' using index ' in action:
+                return Risk(table, ACCESS_EXCLUSIVE, 'metadata', f"ADD {kind.upper()} USING INDEX")
+            return Risk(table, ACCESS_EXCLUSIVE, 'build', f"ADD {kind.upper()}",
+                        f"CREATE UNIQUE INDEX CONCURRENTLY first, then ADD CONSTRAINT ... {kind.upper()} USING INDEX")
+        if kind == 'foreign key':
+            if not_valid:
+                return Risk(table, SHARE_ROW_EXCLUSIVE, 'metadata', "ADD FOREIGN KEY ... NOT VALID")
+            return Risk(table, SHARE_ROW_EXCLUSIVE, 'scan', "ADD FOREIGN KEY",
+                        "ADD CONSTRAINT ... NOT VALID, then VALIDATE CONSTRAINT in a separate changeset")
+        if kind == 'check':
+            if not_valid:
+                return Risk(table, ACCESS_EXCLUSIVE, 'metadata', "ADD CHECK ... NOT VALID")
+            return Risk(table, ACCESS_EXCLUSIVE, 'scan', "ADD CHECK",
+                        "ADD CONSTRAINT ... NOT VALID, then VALIDATE CONSTRAINT in a separate changeset")
+        return Risk(table, ACCESS_EXCLUSIVE, 'build', "ADD EXCLUDE")
+
+    match = ADD_COLUMN.match(action)
+    if match and match.group(1) not in ('constraint', 'primary', 'unique', 'foreign', 'check', 'exclude'):
+        column, definition = match.group(1), match.group(2)
+        volatile = VOLATILE_DEFAULT.search(definition)
+        if volatile:
+            return Risk(table, ACCESS_EXCLUSIVE, 'rewrite', f"ADD COLUMN {column} with volatile DEFAULT {volatile.group(1)}()",
+                        "ADD COLUMN without the default, SET DEFAULT, then backfill existing rows in batches")
+        if SERIAL_TYPE.match(definition) or STORED_COLUMN.search(definition):
+            return Risk(table, ACCESS_EXCLUSIVE, 'rewrite', f"ADD COLUMN {column} filled for every row",
+                        "ADD a plain nullable column, backfill it in batches, then add the default or identity")
+        if INLINE_INDEX.search(definition):
+            return Risk(table, ACCESS_EXCLUSIVE, 'build', f"ADD COLUMN {column} with an inline index",
+                        "ADD the column, CREATE UNIQUE INDEX CONCURRENTLY, then ADD CONSTRAINT ... USING INDEX")
+        if ' references ' in f" {definition} ":
+            return Risk(table, SHARE_ROW_EXCLUSIVE, 'metadata', f"ADD COLUMN {column} REFERENCES")
+        return Risk(table, ACCESS_EXCLUSIVE, 'metadata', f"ADD COLUMN {column}")
+
+    match = ALTER_COLUMN_TYPE.match(action)
+    if match:
+        return Risk(table, ACCESS_EXCLUSIVE, 'rewrite', f"ALTER COLUMN {match.group(1)} TYPE",
+                    "add a new column, backfill it in batches and swap the names, unless the change is "
+                    "binary-compatible (e.g. widening a VARCHAR)")
+
+    match = SET_NOT_NULL.match(action)
+    if match:
+        return Risk(table, ACCESS_EXCLUSIVE, 'scan', f"ALTER COLUMN {match.group(1)} SET NOT NULL",
+                    f"ADD CONSTRAINT ... CHECK ({match.group(1)} IS NOT NULL) NOT VALID, VALIDATE it, "
+                    "then SET NOT NULL (PostgreSQL 12+ skips the scan)")
+
+    if REWRITING_ACTIONS.match(action):
+        return Risk(table, ACCESS_EXCLUSIVE, 'rewrite', action.split(' (')[0].upper())
+
+    return Risk(table, ACCESS_EXCLUSIVE, 'metadata', ' '.join(action.split()[:3]).upper())
+
+def classify(statement):
+    """[Risk] for one normalized statement"""
+    match = CREATE_INDEX.match(statement)
+    if match:
+        unique = 'UNIQUE ' if match.group(1) else ''
+        if match.group(2):
+            return [Risk(_last(match.group(3)), SHARE_UPDATE_EXCLUSIVE, 'build', f"CREATE {unique}INDEX CONCURRENTLY")]
+        return [Risk(_last(match.group(3)), SHARE, 'build', f"CREATE {unique}INDEX",
+                     f"CREATE {unique}INDEX CONCURRENTLY in a changeset with runInTransaction:false")]
+
+    match = ALTER_TABLE.match(statement)
+    if match:
+        table = _last(match.group(1))
+        risks = (_alter_action(table, action) for action in _split_actions(match.group(2)))
+        return [risk for risk in risks if risk]
+
+    match = REINDEX.match(statement)
+    if match:
+        if match.group(2):
+            return []
+        return [Risk(_last(match.group(3)), ACCESS_EXCLUSIVE if match.group(1) == 'index' else SHARE, 'build',
+                     f"REINDEX {match.group(1).upper()}", f"REINDEX {match.group(1).upper()} CONCURRENTLY (PostgreSQL 12+)")]
+
+    for pattern, operation in ((VACUUM_FULL, "VACUUM FULL"), (CLUSTER, "CLUSTER")):
+        match = pattern.match(statement)
+        if match:
+            return [Risk(_last(match.group(1)), ACCESS_EXCLUSIVE, 'rewrite', operation,
+                         "pg_repack, or run it in a maintenance window outside the deployment")]
+
+    match = REFRESH.match(statement)
+    if match:
+        if match.group(1):
+            return []
+        return [Risk(_last(match.group(2)), ACCESS_EXCLUSIVE, 'rewrite', "REFRESH MATERIALIZED VIEW",
+                     "REFRESH MATERIALIZED VIEW CONCURRENTLY (needs a unique index on the view)")]
+
+    match = LOCK_TABLE.match(statement)
+    if match:
+        return [Risk(_last(match.group(1)), (match.group(2) or 'access exclusive').upper(), 'metadata', "LOCK TABLE")]
+
+    match = CREATE_TRIGGER.match(statement)
+    if match:
+        return [Risk(_last(match.group(1)), SHARE_ROW_EXCLUSIVE, 'metadata', "CREATE TRIGGER")]
+    return []
+
+###
+### Table sizes
+###
+class TableSizes:
+    """Row and byte counts per table from a manifest:
+
+      {"large_rows": 1000000, "large_bytes": 1073741824,
+       "tables": {"public.orders": {"rows": 12000000, "bytes": 3500000000, "key": "order_id"},
+                  "audit_log": 800000}}
+
+    "tables" may also be the whole document; a bare number is a row count.
+    "key" names the column batched data migrations walk (bulk_dml_rules.py).
+    """
+
+    def __init__(self, tables, large_rows=LARGE_ROWS, large_bytes=LARGE_BYTES):
+        self.tables = {}
+        self.keys = {}
+        for name, size in tables.items():
+            if not isinstance(size, dict):
+                size = {'rows': size}
+            entry = (int(size.get('rows') or 0), int(size.get('bytes') or 0))
+            name = _normalize(name)
+            self.tables[name] = entry
+            self.tables.setdefault(_last(name), entry)
+            if size.get('key'):
+                key = _normalize(size['key'])
+                self.keys[name] = key
+                self.keys.setdefault(_last(name), key)
+        self.large_rows = large_rows
+        self.large_bytes = large_bytes
+
+    def get(self, table):
+        """(rows, bytes) of table, or None when the manifest does not list it"""
+        return self.tables.get(table)
+
+    def key(self, table):
+        """Key column the manifest gives for table, or None"""
+        return self.keys.get(table)
+
+    def is_large(self, table):
+        size = self.get(table)
+        if size is None:
+            return None
+        return size[0] >= self.large_rows or size[1] >= self.large_bytes
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        tables = data.get('tables', data)
+        tables = {k: v for k, v in tables.items() if k not in ('large_rows', 'large_bytes')}
+        return cls(tables, int(data.get('large_rows', LARGE_ROWS)), int(data.get('large_bytes', LARGE_BYTES)))
+
+def _describe_size(size):
+    rows, size_bytes = size
+    parts = []
+    if rows:
+        parts.append(f"{rows:,} rows")
+    if size_bytes:
+        parts.append(f"{size_bytes / (1 << 20):,.0f} MB")
+    return ', '.join(parts) or 'empty'
+
+###
+### Engine
+###
+def analyze_lines(lines, start_line, sizes=None, attributes=None):
+    """Lock findings for one changeset: [(file line, message, severity)].
+
+    attributes are the '--changeset' header attributes; they are read from
+    the first line when not given.
+    """
+    if attributes is None:
+        attributes = changeset_index.header_attributes(lines[0]) if lines else {}
+    in_transaction = str(attributes.get('runInTransaction', 'true')).lower() != 'false'
+
+    scanner = sql_tokenizer.Scanner(keep_text=True)
+    for i, line in enumerate(lines, start_line):
+        scanner.feed(i, line)
+    statements = [(s.start_line, _normalize(s.text)) for s in scanner.close().statements if s.text]
+
+    created = {_last(m.group(1)) for m in (CREATE_TABLE.match(text) for _, text in statements) if m}
+    lock_timeout = any(LOCK_TIMEOUT.match(text) for _, text in statements)
+
+    findings = []
+    for line, text in statements:
+        if in_transaction and CONCURRENTLY.match(text):
+            findings.append((line, "CONCURRENTLY cannot run inside a transaction block; "
+                                   "set runInTransaction:false on the changeset", 'ERROR'))
+        for risk in classify(text):
+            if risk.table in created or not risk.blocking:
+                continue
+            large = sizes.is_large(risk.table) if sizes else None
+            where = risk.table
+            if sizes and sizes.get(risk.table):
+                where = f"{risk.table} ({_describe_size(sizes.get(risk.table))})"
+
+            if risk.cost in COSTS:
+                if large is False:
+                    continue
+                message = f"{risk.operation} takes {risk.lock} on {where}, which {BLOCKS[risk.lock]} while it {COSTS[risk.cost]}"
+                if risk.suggestion:
+                    message += f"; instead: {risk.suggestion}"
+                findings.append((line, message, 'ERROR' if large else 'WARNING'))
+            elif large and not lock_timeout:
+                findings.append((line, f"{risk.operation} needs {risk.lock} on {where}; it waits behind every "
+                                       f"open transaction and {BLOCKS[risk.lock]} while it does: "
+                                       f"SET lock_timeout in the changeset and retry", 'WARNING'))
+    findings.sort(key=lambda f: (f[0], f[2] != 'ERROR'))
+    return findings
+
+def format_report(changeset_id, findings):
+    """Compact report in the shape validate_syntax.py prints"""
+    errors = sum(1 for f in findings if f[2] == 'ERROR')
+    warnings = sum(1 for f in findings if f[2] == 'WARNING')
+    report = f"\nLOCK RISK: {changeset_id}\n"
+    report += f"Errors: {errors} | Warnings: {warnings}\n"
+    report += f"{'-'*55}\n"
+    for line, message, severity in findings:
+        report += f"[{severity[:4]}] Line {line}: {message}\n"
+    report += f"{'-'*55}\n"
+    return report
+
+def sizes_path(setting=None):
+    """Manifest path from a script argument or LOCK_CHECK_TABLE_SIZES, or None"""
+    return setting or os.environ.get("LOCK_CHECK_TABLE_SIZES") or None
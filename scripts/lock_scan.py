@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Batch Lock-Contention and Long-DDL Risk Scanner
+
+Runs the lock_check.py rules over every formatted-SQL changeset of a
+changelog tree in one process, so migrations that would take an ACCESS
+EXCLUSIVE or SHARE lock on a hot table while they build an index, validate
+a constraint or rewrite the table are found before the deployment.
+
+A table-size manifest decides which tables are large (see lock_rules.py):
+  {"tables": {"public.orders": {"rows": 12000000, "bytes": 3500000000}}}
+Without one, every blocking build, scan and rewrite is a warning.
+
+Usage:
+  python scripts/lock_scan.py                                 # liquibase.properties changeLogFile
+  python scripts/lock_scan.py --table-sizes sizes.json changelog-sql/main.root.xml
+  python scripts/lock_scan.py --strict ...                    # fail on warnings too
+  python scripts/lock_scan.py --json ...
+
+Exit code: 0 when nothing blocks traffic on a large table, 1 on errors (and
+warnings with --strict), 2 when the changelog tree or the manifest cannot be
+read.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+import changeset_index
+import lock_rules
+import validate_changelog
+
+
+def scan_file(path, sizes=None):
+    """(path, changeset count, [(changeset id, line, severity, message)])"""
+    index = changeset_index.load(path)
+    findings = []
+    seen = set()
+    for entry in index:
+        if entry.id in seen:
+            continue
+        seen.add(entry.id)
+        for line, message, severity in lock_rules.analyze_lines(index.lines(entry), entry.start_line,
+                                                                sizes, entry.attributes):
+            findings.append((entry.id, line, severity, message))
+    return path, len(seen), findings
+
+
+def run(files, jobs, sizes):
+    scanner = partial(scan_file, sizes=sizes)
+    if jobs > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(files))) as pool:
+            return list(pool.map(scanner, files, chunksize=4))
+    return [scanner(path) for path in files]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find migrations that block traffic with long-held locks")
+    parser.add_argument('paths', nargs='*', help="root changelog(s), SQL files or directories")
+    parser.add_argument('--search-path', default='.', help="base for non-relative includes (default: .)")
+    parser.add_argument('--table-sizes', default=lock_rules.sizes_path(),
+                        help="table-size manifest JSON (default: $LOCK_CHECK_TABLE_SIZES)")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--strict', action='store_true', help="also fail on warnings")
+    parser.add_argument('--json', action='store_true', help="print findings as JSON")
+    args = parser.parse_args(argv)
+
+    sizes = None
+    if args.table_sizes:
+        try:
+            sizes = lock_rules.TableSizes.load(args.table_sizes)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            print(f"❌ Cannot read table sizes {args.table_sizes}: {e}")
+            return 2
+
+    started = time.perf_counter()
+    try:
+        files = validate_changelog.collect_sql_files(args.paths or [validate_changelog.default_changelog()],
+                                                     args.search_path)
+        results = run(files, args.jobs, sizes)
+    except (OSError, SyntaxError, UnicodeDecodeError) as e:
+        print(f"❌ Cannot read changelog tree: {e}")
+        return 2
+    elapsed = time.perf_counter() - started
+
+    total = sum(count for _, count, _ in results)
+    findings = [{'file': os.path.relpath(path), 'changeset': changeset_id, 'line': line,
+                 'severity': severity, 'message': message}
+                for path, _, found in results for changeset_id, line, severity, message in found]
+    errors = sum(1 for f in findings if f['severity'] == 'ERROR')
+    warnings = len(findings) - errors
+
+    if args.json:
+        print(json.dumps(findings, indent=2))
+    else:
+        for f in findings:
+            print(f"{f['file']}:{f['line']}: [{f['severity'][:4]}] {f['changeset']}: {f['message']}")
+        print(f"\nScanned {total} changeset(s) in {len(files)} file(s) in {elapsed:.2f}s: "
+              f"{errors} error(s), {warnings} warning(s)"
+              f"{'' if sizes else ' (no table-size manifest)'}")
+    return 1 if errors or (args.strict and warnings) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
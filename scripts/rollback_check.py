@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Offline Rollback Coverage Analyzer
+
+Finds the changesets `liquibase rollback` would fail on, or silently not
+undo, without touching a database. Every formatted-SQL file of the changelog
+tree is read through the shared changeset index (changeset_index.py), so a
+file is tokenized once per content change, and each changeset's forward
+statements are paired with the SQL of its --rollback lines:
+
+  missing         SQL changeset with no --rollback at all (ERROR)
+  non-inverting   a forward statement the rollback does not undo, e.g.
+                  CREATE TABLE x without DROP TABLE x, ADD COLUMN c without
+                  DROP COLUMN c, INSERT INTO t without DELETE FROM t (ERROR);
+                  dropping its table or an indexed column undoes CREATE INDEX
+  empty           --rollback with no SQL, or an explicit
+                  '--rollback empty' / '--rollback not required' (WARNING)
+
+Statements the analyzer has no inverse rule for are not judged.
+
+Usage:
+  python scripts/rollback_check.py                        # liquibase.properties changeLogFile
+  python scripts/rollback_check.py changelog-sql/main.root.xml
+  python scripts/rollback_check.py --strict ...           # fail on empty rollbacks too
+  python scripts/rollback_check.py --json ...
+
+Exit code: 0 when every rollback checks out, 1 on missing or non-inverting
+rollbacks (and empty ones with --strict), 2 when the changelog tree cannot
+be read.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+import changeset_index
+import sql_tokenizer
+import validate_changelog
+
+# Statements that change nothing a rollback would have to undo
+NO_ROLLBACK_NEEDED = {'SELECT', 'SET', 'SHOW', 'EXPLAIN', 'ANALYZE', 'VACUUM', 'COMMENT', 'CALL', 'DO'}
+DECLARED_EMPTY = {'', 'empty', 'not required'}
+
+NAME = r'(?:"[^"]+"|[a-z_][\w$]*)(?:\.(?:"[^"]+"|[a-z_][\w$]*))*'
+IF_NOT_EXISTS = r'(?:if\s+not\s+exists\s+)?'
+IF_EXISTS = r'(?:if\s+exists\s+)?'
+
+CREATE_KINDS = ('table', 'view', 'materialized view', 'sequence', 'schema', 'type', 'domain',
+                'extension', 'function', 'procedure', 'trigger', 'index')
+
+CREATE = re.compile(rf'^create\s+(?:or\s+replace\s+)?(?:(?:global\s+|local\s+)?(?:temp|temporary|unlogged)\s+)?'
+                    rf'(unique\s+)?(materialized\s+view|{"|".join(k for k in CREATE_KINDS if " " not in k)})\s+'
+                    rf'(?:concurrently\s+)?{IF_NOT_EXISTS}({NAME})(?:\s+on\s+(?:only\s+)?({NAME})'
+                    rf'(?:\s+using\s+\w+)?(?:\s*\(([^()]*)\))?)?')
+# An index key that is a plain column, e.g. "email" or "created_at desc nulls last"
+INDEX_COLUMN = re.compile(rf'^({NAME})(?:\s+(?:asc|desc|nulls\s+(?:first|last)|collate\s+\S+|[a-z_]\w*_ops))*$')
+DROP = re.compile(rf'^drop\s+(materialized\s+view|{"|".join(k for k in CREATE_KINDS if " " not in k)})\s+'
+                  rf'(?:concurrently\s+)?{IF_EXISTS}({NAME})')
+ALTER_TABLE = re.compile(rf'^alter\s+table\s+{IF_EXISTS}(?:only\s+)?({NAME})\s+(.*)$', re.S)
+RENAME_TABLE = re.compile(rf'^rename\s+to\s+({NAME})')
+RENAME_COLUMN = re.compile(rf'^rename\s+(?:column\s+)?({NAME})\s+to\s+({NAME})')
+INSERT = re.compile(rf'^insert\s+into\s+({NAME})')
+DELETE = re.compile(rf'^delete\s+from\s+(?:only\s+)?({NAME})')
+UPDATE = re.compile(rf'^update\s+(?:only\s+)?({NAME})')
+GRANT = re.compile(rf'^grant\s+.*?\s+on\s+(?:table\s+)?({NAME})', re.S)
+ALTER_CLAUSE = re.compile(rf'(?:^|,)\s*(add|drop)\s+(constraint\s+|column\s+)?(?:if\s+(?:not\s+)?exists\s+)?'
+                          rf'(?!primary\b|foreign\b|unique\b|check\b|exclude\b)({NAME})')
+TRUNCATE = re.compile(rf'^truncate\s+(?:table\s+)?(?:only\s+)?({NAME})')
+REVOKE = re.compile(rf'^revoke\s+.*?\s+on\s+(?:table\s+)?({NAME})', re.S)
+SIMPLE_ROLLBACK = re.compile(r"^[^'\"$]*$")
+
+
+def normalize(text):
+    return ' '.join(text.replace('"', '').lower().split())
+
+
+def _last(name):
+    """Object name without its schema; rollbacks may qualify it or not"""
+    return name.rsplit('.', 1)[-1]
+
+
+def _kind(kind):
+    return ' '.join(kind.split())
+
+
+def statement_facts(statement):
+    """What one normalized statement does, as hashable facts.
+
+    Forward and rollback statements are described the same way, so pairing
+    them is a set lookup rather than a pattern search per changeset.
+    """
+    match = CREATE.match(statement)
+    if match:
+        kind, name = _kind(match.group(2)), _last(match.group(3))
+        facts = [('create', kind, name)]
+        if statement.startswith('create or replace'):
+            facts.append(('replace', kind, name))
+        return facts
+    match = DROP.match(statement)
+    if match:
+        return [('drop', _kind(match.group(1)), _last(match.group(2)))]
+    match = ALTER_TABLE.match(statement)
+    if match:
+        table, rest = _last(match.group(1)), match.group(2)
+        facts = [(verb, (target or 'column').strip(), table, _last(name))
+                 for verb, target, name in ALTER_CLAUSE.findall(rest)]
+        renamed = RENAME_TABLE.match(rest)
+        if renamed:
+            facts.append(('rename', table, _last(renamed.group(1))))
+        renamed = RENAME_COLUMN.match(rest)
+        if renamed:
+            facts.append(('rename column', table, _last(renamed.group(1)), _last(renamed.group(2))))
+        return facts
+    for verb, pattern in (('insert', INSERT), ('delete', DELETE), ('update', UPDATE),
+                          ('truncate', TRUNCATE), ('grant', GRANT), ('revoke', REVOKE)):
+        match = pattern.match(statement)
+        if match:
+            return [(verb, _last(match.group(1)))]
+    return []
+
+
+def requirements(head):
+    """[(what the rollback must do, {facts, any of which undoes it})] for one forward statement"""
+    if len(head) >= changeset_index.HEAD_LENGTH:
+        head = head.rsplit(' ', 1)[0]  # never judge a name the index cut in half
+    statement = normalize(head)
+
+    match = CREATE.match(statement)
+    if match:
+        kind, name, table = _kind(match.group(2)), match.group(3), match.group(4)
+        if kind == 'index' and name == 'on':
+            return []  # unnamed index
+        accepted = {('drop', kind, _last(name))}
+        if kind in ('view', 'materialized view', 'function', 'procedure'):
+            accepted.add(('replace', kind, _last(name)))
+        if kind in ('index', 'trigger') and table:
+            accepted.add(('drop', 'table', _last(table)))
+        if kind == 'index' and match.group(5):
+            # Dropping any indexed column drops the index with it
+            for key in match.group(5).split(','):
+                column = INDEX_COLUMN.match(key.strip())
+                if column:
+                    accepted.add(('drop', 'column', _last(table), _last(column.group(1))))
+        return [(f"DROP {kind.upper()} {name}", accepted)]
+
+    match = DROP.match(statement)
+    if match:
+        kind, name = _kind(match.group(1)), match.group(2)
+        return [(f"CREATE {kind.upper()} {name}", {('create', kind, _last(name))})]
+
+    match = ALTER_TABLE.match(statement)
+    if match:
+        table, rest = match.group(1), match.group(2)
+        drop_table = ('drop', 'table', _last(table))
+        found = []
+        for verb, target, name in ALTER_CLAUSE.findall(rest):
+            if verb != 'add':
+                continue
+            target = (target or 'column').strip()
+            found.append((f"DROP {target.upper()} {name} on {table}",
+                          {('drop', target, _last(table), _last(name)), drop_table}))
+        renamed = RENAME_TABLE.match(rest)
+        if renamed:
+            found.append((f"RENAME {renamed.group(1)} back to {table}",
+                          {('rename', _last(renamed.group(1)), _last(table))}))
+        renamed = RENAME_COLUMN.match(rest)
+        if renamed:
+            old, new = renamed.groups()
+            found.append((f"RENAME COLUMN {new} back to {old} on {table}",
+                          {('rename column', _last(table), _last(new), _last(old))}))
+        return found
+
+    for pattern, needed, undo in ((INSERT, "DELETE FROM", ('delete', 'truncate')),
+                                  (DELETE, "INSERT INTO", ('insert',)),
+                                  (UPDATE, "UPDATE", ('update',)),
+                                  (GRANT, "REVOKE on", ('revoke',))):
+        match = pattern.match(statement)
+        if match:
+            table = _last(match.group(1))
+            accepted = {(verb, table) for verb in undo}
+            if pattern is INSERT:
+                accepted.add(('drop', 'table', table))
+            return [(f"{needed} {match.group(1)}", accepted)]
+    return []
+
+
+def rollback_statements(rollback):
+    """Normalized statements of a changeset's --rollback lines"""
+    texts = [text for _, text in rollback]
+    if all(SIMPLE_ROLLBACK.match(text) for text in texts):
+        # No literals or dollar quotes: a plain split on ';' is exact
+        return [normalize(part) for part in ' '.join(texts).split(';') if part.strip()]
+    structure = sql_tokenizer.scan([text + '\n' for text in texts], keep_text=True)
+    return [normalize(s.text) for s in structure.statements if s.text]
+
+
+def analyze_changeset(entry):
+    """[(line, severity, category, message)] for one indexed changeset"""
+    forward = [s for s in entry.statements if s[2].upper() not in NO_ROLLBACK_NEEDED]
+    if not forward:
+        return []
+    if not entry.rollback:
+        return [(entry.start_line, 'ERROR', 'missing', f"No --rollback for {len(forward)} statement(s)")]
+
+    texts = [text for _, text in entry.rollback]
+    if all(normalize(text.rstrip(';')) in DECLARED_EMPTY for text in texts):
+        declared = next((t for t in texts if t.strip()), '')
+        how = f"declared '--rollback {declared.strip()}'" if declared.strip() else "has no SQL"
+        return [(entry.rollback[0][0], 'WARNING', 'empty', f"Rollback {how} for {len(forward)} statement(s)")]
+
+    undone = set()
+    for statement in rollback_statements(entry.rollback):
+        undone.update(statement_facts(statement))
+    findings = []
+    for start_line, _, keyword, _, head in forward:
+        for needed, accepted in requirements(head):
+            if not accepted & undone:
+                findings.append((start_line, 'ERROR', 'non-inverting', f"Rollback does not {needed}"))
+    return findings
+
+
+def analyze_file(path):
+    """(path, changeset count, [(changeset id, line, severity, category, message)])"""
+    index = changeset_index.load(path)
+    findings = []
+    seen = set()
+    for entry in index:
+        # Liquibase resolves author:id to the first block that carries it
+        if entry.id in seen:
+            continue
+        seen.add(entry.id)
+        findings.extend((entry.id,) + finding for finding in analyze_changeset(entry))
+    return path, len(seen), findings
+
+
+def run(files, jobs):
+    if jobs > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(files))) as pool:
+            return list(pool.map(analyze_file, files, chunksize=4))
+    return [analyze_file(path) for path in files]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check --rollback coverage of formatted-SQL changesets offline")
+    parser.add_argument('paths', nargs='*', help="root changelog(s), SQL files or directories")
+    parser.add_argument('--search-path', default='.', help="base for non-relative includes (default: .)")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--strict', action='store_true', help="also fail on empty rollbacks")
+    parser.add_argument('--json', action='store_true', help="print findings as JSON")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        files = validate_changelog.collect_sql_files(args.paths or [validate_changelog.default_changelog()],
+                                                     args.search_path)
+        results = run(files, args.jobs)
+    except (OSError, SyntaxError, UnicodeDecodeError) as e:
+        print(f"❌ Cannot read changelog tree: {e}")
+        return 2
+    elapsed = time.perf_counter() - started
+
+    total = sum(count for _, count, _ in results)
+    counts = {'missing': 0, 'non-inverting': 0, 'empty': 0}
+    findings = []
+    for path, _, found in results:
+        for changeset_id, line, severity, category, message in found:
+            counts[category] += 1
+            findings.append({'file': os.path.relpath(path), 'changeset': changeset_id, 'line': line,
+                             'severity': severity, 'category': category, 'message': message})
+
+    if args.json:
+        print(json.dumps(findings, indent=2))
+    else:
+        for f in findings:
+            print(f"{f['file']}:{f['line']}: [{f['severity'][:4]}] {f['changeset']}: {f['message']}")
+        print(f"\nAnalyzed {total} changeset(s) in {len(files)} file(s) in {elapsed:.2f}s: "
+              f"{counts['missing']} missing, {counts['non-inverting']} non-inverting, {counts['empty']} empty rollback(s)")
+    failed = counts['missing'] + counts['non-inverting'] + (counts['empty'] if args.strict else 0)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
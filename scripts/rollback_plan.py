@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Rollback Impact Planner
+
+Shows what `liquibase rollback --tag=<tag>` (or --rollback-to-date /
+--count) would undo before it runs: the changesets in the order Liquibase
+rolls them back, the objects their rollbacks touch, and how many statements
+each will execute. Nothing connects to the database; the planner reads
+
+  - a DATABASECHANGELOG export, either CSV (as exported from any SQL client,
+    header row with the column names) or a SQLite file holding a
+    DATABASECHANGELOG table, and
+  - the changelog tree, through the shared changeset index
+    (changeset_index.py), so only the files the rollback reaches are read.
+
+Applied changesets are ordered the way Liquibase orders them (DATEEXECUTED,
+then ORDEREXECUTED) once; the rollback boundary is then a dictionary lookup
+for a tag and a bisect for a date, so planning against a history of hundreds
+of thousands of rows takes well under a second.
+
+Changesets that cannot be rolled back (no --rollback SQL, or no longer in the
+changelog) are listed as blockers: Liquibase would stop on them.
+
+Usage:
+  python scripts/rollback_plan.py --tag v1.0 databasechangelog.csv
+  python scripts/rollback_plan.py --tag "$ROLLBACK_TAG" history.sqlite changelog-sql/main.root.xml
+  python scripts/rollback_plan.py --to-date "2024-05-01 00:00:00" databasechangelog.csv
+  python scripts/rollback_plan.py --count 3 --json databasechangelog.csv
+
+Exit code: 0 when every changeset in the plan can be rolled back, 1 when the
+plan has blockers, 2 when the export or the changelog cannot be read or the
+tag does not exist.
+"""
+
+import argparse
+import bisect
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+import changeset_index
+import rollback_check
+import validate_changelog
+
+SQLITE_MAGIC = b'SQLite format 3\x00'
+DML = {'insert', 'delete', 'update', 'truncate'}
+
+
+###
+### DATABASECHANGELOG
+###
+class History:
+    """Applied changesets in Liquibase's execution order"""
+
+    def __init__(self, rows):
+        rows = [row for row in rows if row['EXECTYPE'] not in ('FAILED', 'SKIPPED')]
+        rows.sort(key=lambda row: (row['DATEEXECUTED'], row['ORDEREXECUTED']))
+        self.rows = rows
+        self.dates = [row['DATEEXECUTED'] for row in rows]
+        self.tags = {}
+        for position, row in enumerate(rows):
+            if row['TAG']:
+                self.tags.setdefault(row['TAG'].lower(), position)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def after_tag(self, tag):
+        """Position of the first row Liquibase undoes for `rollback --tag`, or None when the tag is unknown"""
+        position = self.tags.get(tag.lower())
+        if position is None:
+            return None
+        # The tagged row stays, and so do later rows that carry the same tag
+        position += 1
+        while position < len(self.rows) and (self.rows[position]['TAG'] or '').lower() == tag.lower():
+            position += 1
+        return position
+
+    def after_date(self, date):
+        """Position of the first row executed after date"""
+        return bisect.bisect_right(self.dates, _date(date))
+
+    def plan(self, start):
+        """Rows from start on, in the order they are rolled back"""
+        return self.rows[start:][::-1]
+
+
+def _date(value):
+    return (value or '').strip().replace('T', ' ')
+
+
+def _row(raw, position):
+    row = {key.strip().upper(): value for key, value in raw.items() if key}
+    missing = [c for c in ('ID', 'AUTHOR', 'FILENAME') if c not in row]
+    if missing:
+        raise ValueError(f"DATABASECHANGELOG export has no {', '.join(missing)} column")
+    try:
+        order = int(row.get('ORDEREXECUTED') or position)
+    except ValueError:
+        order = position
+    return {
+        'ID': str(row['ID']),
+        'AUTHOR': str(row['AUTHOR']),
+        'FILENAME': str(row['FILENAME']),
+        'DATEEXECUTED': _date(str(row.get('DATEEXECUTED') or '')),
+        'ORDEREXECUTED': order,
+        'EXECTYPE': str(row.get('EXECTYPE') or 'EXECUTED').upper(),
+        'TAG': str(row.get('TAG') or '').strip(),
+    }
+
+
+def read_history(path):
+    """History from a CSV export or a SQLite file with a DATABASECHANGELOG table"""
+    with open(path, 'rb') as f:
+        is_sqlite = f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+    if is_sqlite:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        connection.row_factory = sqlite3.Row
+        try:
+            cursor = connection.execute("SELECT * FROM databasechangelog")
+            raw_rows = [dict(row) for row in cursor]
+        finally:
+            connection.close()
+    else:
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            raw_rows = list(csv.DictReader(f))
+    return History([_row(raw, position) for position, raw in enumerate(raw_rows, 1)])
+
+
+###
+### Changelog
+###
+def _key(path):
+    path = path.replace('\\', '/')
+    if path.startswith('classpath:'):
+        path = path[len('classpath:'):]
+    return path.lstrip('/')
+
+
+class Changelog:
+    """Formatted-SQL files of the changelog tree, found by DATABASECHANGELOG.FILENAME"""
+
+    def __init__(self, files, search_path):
+        self.by_key = {}
+        for path in files:
+            for base in (search_path, '.'):
+                self.by_key.setdefault(_key(os.path.relpath(path, base)), path)
+        self._found = {}
+
+    def find(self, filename):
+        """Changelog file recorded as filename, matching on a path suffix when the roots differ"""
+        if filename in self._found:
+            return self._found[filename]
+        key = _key(filename)
+        path = self.by_key.get(key)
+        if path is None:
+            matches = {p for k, p in self.by_key.items() if k.endswith('/' + key) or key.endswith('/' + k)}
+            path = matches.pop() if len(matches) == 1 else None
+        self._found[filename] = path
+        return path
+
+    def changeset(self, row):
+        """Indexed changeset of a DATABASECHANGELOG row, or None"""
+        path = self.find(row['FILENAME'])
+        if path is None:
+            return None, None
+        return path, changeset_index.load(path).get(f"{row['AUTHOR']}:{row['ID']}")
+
+
+def _objects(facts):
+    objects = set()
+    for fact in facts:
+        verb = fact[0]
+        if verb in ('add', 'drop') and len(fact) == 4:
+            objects.add(f"table {fact[2]}")  # ALTER TABLE ... ADD/DROP
+        elif verb in ('create', 'drop', 'replace'):
+            objects.add(f"{fact[1]} {fact[2]}")
+        else:
+            objects.add(f"table {fact[1]}")
+    return objects
+
+
+def plan_step(row, changelog):
+    """What rolling back one DATABASECHANGELOG row involves"""
+    step = {'changeset': f"{row['AUTHOR']}:{row['ID']}", 'file': row['FILENAME'],
+            'executed': row['DATEEXECUTED'], 'exectype': row['EXECTYPE'], 'tag': row['TAG'],
+            'statements': 0, 'dml': 0, 'objects': [], 'blocker': None}
+    path, entry = changelog.changeset(row)
+    if path is None:
+        step['blocker'] = "file not in the changelog"
+        return step
+    if entry is None:
+        step['blocker'] = "changeset not in the changelog"
+        return step
+
+    statements = rollback_check.rollback_statements(entry.rollback) if entry.rollback else []
+    facts = []
+    for statement in statements:
+        found = rollback_check.statement_facts(statement)
+        facts.extend(found)
+        if any(fact[0] in DML for fact in found):
+            step['dml'] += 1
+    for _, _, _, _, head in entry.statements:
+        facts.extend(rollback_check.statement_facts(rollback_check.normalize(head)))
+    step['statements'] = len(statements)
+    step['objects'] = sorted(_objects(facts))
+    step['line'] = entry.start_line
+    if not statements:
+        forward = [s for s in entry.statements if s[2].upper() not in rollback_check.NO_ROLLBACK_NEEDED]
+        if forward:
+            step['blocker'] = "no --rollback SQL"
+    return step
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan a Liquibase rollback from a DATABASECHANGELOG export")
+    parser.add_argument('history', help="DATABASECHANGELOG export: CSV or SQLite file")
+    parser.add_argument('changelog', nargs='?', help="root changelog (default: liquibase.properties changeLogFile)")
+    parser.add_argument('--search-path', default='.', help="base for non-relative includes (default: .)")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--tag', help="plan `rollback --tag`")
+    target.add_argument('--to-date', help="plan `rollback-to-date` (YYYY-MM-DD[ HH:MM:SS])")
+    target.add_argument('--count', type=int, help="plan `rollback-count`")
+    parser.add_argument('--json', action='store_true', help="print the plan as JSON")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        history = read_history(args.history)
+    except (OSError, ValueError, csv.Error, sqlite3.Error) as e:
+        print(f"❌ Cannot read DATABASECHANGELOG export {args.history}: {e}")
+        return 2
+
+    if args.tag is not None:
+        start = history.after_tag(args.tag)
+        if start is None:
+            print(f"❌ Tag '{args.tag}' is not in {args.history}; rollback would fail")
+            return 2
+    elif args.to_date is not None:
+        start = history.after_date(args.to_date)
+    else:
+        start = max(len(history) - max(args.count, 0), 0)
+    rows = history.plan(start)
+
+    try:
+        files = validate_changelog.collect_sql_files([args.changelog or validate_changelog.default_changelog()],
+                                                     args.search_path)
+        changelog = Changelog(files, args.search_path)
+        steps = [plan_step(row, changelog) for row in rows]
+    except (OSError, SyntaxError, UnicodeDecodeError) as e:
+        print(f"❌ Cannot read changelog tree: {e}")
+        return 2
+    elapsed = time.perf_counter() - started
+
+    objects = sorted({o for step in steps for o in step['objects']})
+    statements = sum(step['statements'] for step in steps)
+    dml = sum(step['dml'] for step in steps)
+    blockers = [step for step in steps if step['blocker']]
+
+    if args.json:
+        print(json.dumps({'changesets': steps, 'objects': objects, 'statements': statements,
+                          'dml_statements': dml, 'blockers': len(blockers)}, indent=2))
+    else:
+        for number, step in enumerate(steps, 1):
+            where = f"{step['file']}:{step['line']}" if 'line' in step else step['file']
+            note = f"  ❌ {step['blocker']}" if step['blocker'] else ''
+            dml_note = f", {step['dml']} DML" if step['dml'] else ''
+            print(f"{number:>4}. {step['changeset']} ({where}, {step['exectype'].lower()} {step['executed']}): "
+                  f"{step['statements']} statement(s){dml_note}{note}")
+            if step['objects']:
+                print(f"        {', '.join(step['objects'])}")
+        if objects:
+            print(f"\nAffected objects ({len(objects)}): {', '.join(objects)}")
+        print(f"\nPlanned {len(steps)} of {len(history)} applied changeset(s) in {elapsed:.2f}s: "
+              f"{statements} rollback statement(s), {dml} DML, {len(blockers)} blocker(s)")
+    return 1 if blockers else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
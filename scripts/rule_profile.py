@@ -0,0 +1,222 @@
+###
+### Optional per-rule instrumentation for the syntax rule engine
+###
+### Off by default: validate_syntax.py and validate_changelog.py only import
+### this module when profiling was asked for, and the rule engine itself has
+### no timing hooks. When on, every rule is wrapped in a proxy that times its
+### calls and counts the lines it saw and the findings it emitted, and one
+### JSON line per changeset is appended to the profile file:
+###
+###   {"changeset": "author:id", "file": "...", "lines": 120, "seconds": 0.0031,
+###    "cached": false, "rules": {"typo-catalog": {"seconds": ..., "lines": 120, "hits": 1}, ...}}
+###
+### The shared tokenizer and the engine loop are reported as "(engine)".
+### The profile goes next to the Liquibase log (liquibase.logFile in
+### liquibase.properties) as validate_syntax.profile.jsonl, unless a path is
+### given. Summarize it with:
+###
+###   python scripts/rule_profile.py [profile.jsonl] [--top N]
+###
+import argparse
+import json
+import os
+import sys
+import time
+
+import syntax_rules
+
+PROFILE_FILE = "validate_syntax.profile.jsonl"
+ENGINE = "(engine)"
+
+def requested(value):
+    """Profile path asked for by an env var or script arg value, or None.
+
+    '1', 'true', 'yes' and 'on' select the default path; any other
+    non-empty value is taken as the path itself.
+    """
+    if not value:
+        return None
+    text = str(value).strip()
+    if text.lower() in ('0', 'false', 'no', 'off', ''):
+        return None
+    if text.lower() in ('1', 'true', 'yes', 'on'):
+        return default_profile_path()
+    return text
+
+def default_profile_path(properties='liquibase.properties'):
+    """validate_syntax.profile.jsonl in the directory of the Liquibase log"""
+    log_file = os.environ.get('LIQUIBASE_LOG_FILE')
+    if not log_file:
+        try:
+            with open(properties, 'r', encoding='utf-8') as f:
+                for line in f:
+                    key, sep, value = line.partition('=')
+                    if sep and key.strip() in ('liquibase.logFile', 'logFile'):
+                        log_file = value.strip()
+        except OSError:
+            pass
+    return os.path.join(os.path.dirname(log_file or ''), PROFILE_FILE)
+
+###
+### Timing proxies
+###
+class _Stats:
+    __slots__ = ('seconds', 'lines', 'hits')
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.lines = 0
+        self.hits = 0
+
+class _TimedPattern(syntax_rules.PatternRule):
+    """PatternRule/LiteralRule stand-in whose search() is timed"""
+
+    def __init__(self, rule, stats):
+        self.name = rule.name
+        self.message = rule.message
+        self.severity = rule.severity
+        inner = rule.search
+        clock = time.perf_counter
+
+        def search(line):
+            started = clock()
+            found = inner(line)
+            stats.seconds += clock() - started
+            stats.lines += 1
+            if found:
+                stats.hits += 1
+            return found
+        self.search = search
+
+class _TimedMachine:
+    """Line-fed state machine rule whose start/feed/finish are timed"""
+
+    def __init__(self, rule, stats):
+        self.rule = rule
+        self.name = rule.name
+        self.stats = stats
+
+    def _counting(self, emit):
+        stats = self.stats
+
+        def counted(*args, **kwargs):
+            stats.hits += 1
+            return emit(*args, **kwargs)
+        return counted
+
+    def start(self):
+        started = time.perf_counter()
+        self.rule.start()
+        self.stats.seconds += time.perf_counter() - started
+
+    def feed(self, i, line, stripped, code, emit):
+        started = time.perf_counter()
+        self.rule.feed(i, line, stripped, code, self._counting(emit))
+        self.stats.seconds += time.perf_counter() - started
+        self.stats.lines += 1
+
+    def finish(self, line_count, emit):
+        started = time.perf_counter()
+        self.rule.finish(line_count, self._counting(emit))
+        self.stats.seconds += time.perf_counter() - started
+
+class _TimedStructure(_TimedMachine):
+    """Structure rule whose check() is timed"""
+    uses_structure = True
+
+    def check(self, structure, line_count, emit):
+        started = time.perf_counter()
+        self.rule.check(structure, line_count, self._counting(emit))
+        self.stats.seconds += time.perf_counter() - started
+        self.stats.lines += line_count
+
+def _timed(rule, stats):
+    if isinstance(rule, (syntax_rules.PatternRule, syntax_rules.LiteralRule)):
+        return _TimedPattern(rule, stats)
+    if getattr(rule, 'uses_structure', False):
+        return _TimedStructure(rule, stats)
+    return _TimedMachine(rule, stats)
+
+def profile_lines(lines, start_line_number, rules=None):
+    """syntax_rules.validate_lines() with per-rule timing.
+
+    Returns (errors, {rule: {"seconds", "lines", "hits"}}, total seconds).
+    """
+    rules = syntax_rules.default_rules() if rules is None else rules
+    stats = [_Stats() for _ in rules]
+    timed = [_timed(rule, s) for rule, s in zip(rules, stats)]
+    started = time.perf_counter()
+    errors = syntax_rules.validate_lines(lines, start_line_number, timed)
+    total = time.perf_counter() - started
+
+    per_rule = {}
+    for rule, s in zip(rules, stats):
+        per_rule[rule.name] = {"seconds": round(s.seconds, 6), "lines": s.lines, "hits": s.hits}
+    engine = max(0.0, total - sum(s.seconds for s in stats))
+    per_rule[ENGINE] = {"seconds": round(engine, 6), "lines": len(lines), "hits": 0}
+    return errors, per_rule, total
+
+def record(changeset_id, path, lines, seconds, per_rule, cached=False):
+    return {"changeset": changeset_id, "file": path, "lines": len(lines),
+            "seconds": round(seconds, 6), "cached": cached, "rules": per_rule}
+
+def append_records(path, records):
+    """Append JSON lines; a failure to write never fails the check"""
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            for rec in records:
+                f.write(json.dumps(rec) + "\n")
+        return True
+    except OSError:
+        return False
+
+###
+### Summary
+###
+def summarize(records, top=10):
+    """Text summary: totals, the top-N slowest changesets and rules"""
+    records = list(records)
+    rules = {}
+    for rec in records:
+        for name, s in rec.get("rules", {}).items():
+            total = rules.setdefault(name, {"seconds": 0.0, "lines": 0, "hits": 0})
+            total["seconds"] += s["seconds"]
+            total["lines"] += s["lines"]
+            total["hits"] += s["hits"]
+
+    scanned = [rec for rec in records if not rec.get("cached")]
+    out = [f"Profiled {len(records)} changeset(s), {len(records) - len(scanned)} from cache, "
+           f"{sum(rec['seconds'] for rec in scanned):.3f}s in the rule engine"]
+    out.append(f"\nTop {top} slowest changesets:")
+    for rec in sorted(scanned, key=lambda r: r["seconds"], reverse=True)[:top]:
+        out.append(f"  {rec['seconds'] * 1000:9.2f} ms  {rec['lines']:7d} lines  {rec['changeset']}  ({rec['file']})")
+    out.append(f"\nTop {top} slowest rules:")
+    for name, s in sorted(rules.items(), key=lambda item: item[1]["seconds"], reverse=True)[:top]:
+        out.append(f"  {s['seconds'] * 1000:9.2f} ms  {s['lines']:9d} lines  {s['hits']:6d} hits  {name}")
+    return "\n".join(out)
+
+def read_records(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a validate_syntax rule profile")
+    parser.add_argument('profile', nargs='?', help="profile JSON lines (default: next to the Liquibase log)")
+    parser.add_argument('--top', type=int, default=10, help="rows per table (default: 10)")
+    args = parser.parse_args(argv)
+
+    path = args.profile or default_profile_path()
+    try:
+        print(summarize(read_records(path), args.top))
+    except (OSError, ValueError) as e:
+        print(f"❌ Cannot read profile: {e}")
+        return 2
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Local cache of Liquibase database snapshots
+
+`liquibase snapshot` of a large schema takes minutes, and a flow run used to
+take several of the same database: both sides of `diff`, the audit
+`snapshot` step and the database-scoped GDPR scan. This module keeps one
+JSON snapshot per database URL and user under <cache dir>/snapshots/ (two
+users of one database can see different objects) together with a schema
+fingerprint: a checksum of the catalog (columns, indexes, constraints,
+views, sequences with their bounds, routine sources, table and column
+comments) computed by one query on the server. A cached snapshot is reused
+for as long as the fingerprint is unchanged and refreshed as soon as it
+differs.
+
+Used by flow_runner.py --snapshot-cache (diff and snapshot actions) and by
+gdpr_scan.py --url; diff reads cached snapshots through Liquibase's offline
+URLs (offline:postgresql?snapshot=<file>).
+
+The fingerprint query needs a DB-API driver: psycopg2 or psycopg for
+PostgreSQL, the standard library for SQLite. Without one the snapshot is
+still taken but never reused.
+
+Usage:
+  python scripts/snapshot_cache.py jdbc:postgresql://localhost:5433/postgres
+  python scripts/snapshot_cache.py --offline-url $LB_URL      # print an offline: URL instead of the path
+  python scripts/snapshot_cache.py --refresh $LB_URL          # snapshot again regardless
+
+Credentials default to LB_USER / LB_PASSWORD.
+
+Exit code: 0 with the snapshot path (or offline URL) on stdout, 2 when the
+snapshot cannot be taken.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+import db_connect
+
+CACHE_DIR = os.environ.get("VALIDATE_SYNTAX_CACHE_DIR", ".liquibase-cache")
+
+SYSTEM_SCHEMAS = "('pg_catalog', 'information_schema', 'pg_toast')"
+
+POSTGRES_FINGERPRINT = f"""
+SELECT md5(coalesce(string_agg(item, '|' ORDER BY item), '')) FROM (
+    SELECT concat_ws(':', 'column', table_schema, table_name, column_name, data_type, is_nullable,
+                     column_default, character_maximum_length, numeric_precision, numeric_scale) AS item
+      FROM information_schema.columns WHERE table_schema NOT IN {SYSTEM_SCHEMAS}
+    UNION ALL
+    SELECT concat_ws(':', 'index', schemaname, tablename, indexname, indexdef)
+      FROM pg_indexes WHERE schemaname NOT IN {SYSTEM_SCHEMAS}
+    UNION ALL
+    SELECT concat_ws(':', 'constraint', n.nspname, c.conrelid::regclass::text, c.conname, pg_get_constraintdef(c.oid))
+      FROM pg_constraint c JOIN pg_namespace n ON n.oid = c.connamespace WHERE n.nspname NOT IN {SYSTEM_SCHEMAS}
+    UNION ALL
+    SELECT concat_ws(':', 'view', schemaname, viewname, md5(definition))
+      FROM pg_views WHERE schemaname NOT IN {SYSTEM_SCHEMAS}
+    UNION ALL
+    SELECT concat_ws(':', 'sequence', sequence_schema, sequence_name, data_type, numeric_precision,
+                     numeric_precision_radix, numeric_scale, start_value, minimum_value, maximum_value,
+                     increment, cycle_option)
+      FROM information_schema.sequences WHERE sequence_schema NOT IN {SYSTEM_SCHEMAS}
+    UNION ALL
+    SELECT concat_ws(':', 'comment', n.nspname, c.relname, d.objsubid, md5(d.description))
+      FROM pg_description d JOIN pg_class c ON d.classoid = 'pg_class'::regclass AND c.oid = d.objoid
+      JOIN pg_namespace n ON n.oid = c.relnamespace WHERE n.nspname NOT IN {SYSTEM_SCHEMAS}
+    UNION ALL
+    SELECT concat_ws(':', 'routine', n.nspname, p.proname, pg_get_function_identity_arguments(p.oid), md5(p.prosrc))
+      FROM pg_proc p JOIN pg_namespace n ON n.oid = p.pronamespace WHERE n.nspname NOT IN {SYSTEM_SCHEMAS}
+) catalog
+"""
+
+SQLITE_FINGERPRINT = "SELECT type, name, tbl_name, sql FROM sqlite_master ORDER BY type, name"
+
+# One refresh at a time per URL, so concurrent flow actions share it
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+###
+### URLs
+###
+def dialect(url):
+    """'postgresql' or 'sqlite' for a JDBC URL, None for anything else"""
+    if url.startswith('jdbc:postgresql:'):
+        return 'postgresql'
+    if url.startswith('jdbc:sqlite:'):
+        return 'sqlite'
+    return None
+
+
+def dbapi_url(url, username=None, password=None):
+    """The db_connect.connect() URL for a JDBC URL, or None when unsupported"""
+    kind = dialect(url)
+    if kind == 'postgresql':
+        rest = url[len('jdbc:postgresql://'):]
+        credentials = ''
+        if username:
+            credentials = quote(username, safe='')
+            if password:
+                credentials += ':' + quote(password, safe='')
+            credentials += '@'
+        return f"postgresql://{credentials}{rest}"
+    if kind == 'sqlite':
+        return 'sqlite:///' + url[len('jdbc:sqlite:'):]
+    return None
+
+
+def offline_url(url, snapshot_path):
+    """Liquibase offline URL that reads snapshot_path instead of the database"""
+    return f"offline:{dialect(url) or 'postgresql'}?snapshot={snapshot_path}"
+
+
+###
+### Fingerprint
+###
+def fingerprint(url, username=None, password=None):
+    """Checksum of the schema catalog behind url, or None when it cannot be read"""
+    target = dbapi_url(url, username, password)
+    if target is None:
+        return None
+    try:
+        connection = db_connect.connect(target)
+    except Exception:
+        return None
+    try:
+        cursor = connection.cursor()
+        if dialect(url) == 'sqlite':
+            cursor.execute(SQLITE_FINGERPRINT)
+            digest = hashlib.sha256()
+            for row in cursor.fetchall():
+                digest.update(json.dumps(row).encode('utf-8'))
+            return digest.hexdigest()
+        cursor.execute(POSTGRES_FINGERPRINT)
+        return cursor.fetchone()[0]
+    except Exception:
+        return None
+    finally:
+        connection.close()
+
+
+###
+### Cache
+###
+def _paths(url, cache_dir, username=None):
+    key = hashlib.sha1(f"{username or ''}\n{url}".encode('utf-8')).hexdigest()
+    base = os.path.join(os.path.abspath(cache_dir), 'snapshots', key)
+    return base + '.json', base + '.meta.json'
+
+
+def cached(url, current, cache_dir=CACHE_DIR, max_age=None, username=None):
+    """Path of the cached snapshot of url, as username sees it, if it is still fresh, else None"""
+    if current is None:
+        return None
+    snapshot_path, meta_path = _paths(url, cache_dir, username)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('url') != url or meta.get('username') != username or meta.get('fingerprint') != current:
+        return None
+    if max_age is not None and time.time() - meta.get('taken', 0) > max_age:
+        return None
+    return snapshot_path if os.path.exists(snapshot_path) else None
+
+
+def take_snapshot(url, output_path, username=None, password=None, liquibase='liquibase', log=None):
+    """Run `liquibase snapshot --snapshot-format=json` into output_path"""
+    env = dict(os.environ)
+    if username:
+        env['LIQUIBASE_COMMAND_USERNAME'] = username
+    if password:
+        env['LIQUIBASE_COMMAND_PASSWORD'] = password
+    argv = [liquibase, 'snapshot', f'--url={url}', '--snapshot-format=json', f'--output-file={output_path}']
+    result = subprocess.run(argv, env=env, stdout=log or subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    if result.returncode != 0 or not os.path.exists(output_path):
+        raise RuntimeError(f"liquibase snapshot of {url} failed with exit code {result.returncode}")
+
+
+def snapshot(url, username=None, password=None, liquibase='liquibase', cache_dir=CACHE_DIR,
+             max_age=None, refresh=False, log=None):
+    """Path of a JSON snapshot of url as username sees it, reused while its schema fingerprint holds.
+
+    Returns (path, reused).
+    """
+    snapshot_path, meta_path = _paths(url, cache_dir, username)
+    with _lock(snapshot_path):
+        current = fingerprint(url, username, password)
+        if not refresh:
+            path = cached(url, current, cache_dir, max_age, username)
+            if path:
+                return path, True
+
+        os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+        tmp = f"{snapshot_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            take_snapshot(url, tmp, username, password, liquibase, log)
+            os.replace(tmp, snapshot_path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        if current is not None:
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'url': url, 'username': username, 'fingerprint': current, 'taken': time.time()}, f)
+        elif os.path.exists(meta_path):
+            os.remove(meta_path)
+        return snapshot_path, False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Take or reuse a cached Liquibase JSON snapshot")
+    parser.add_argument('url', help="JDBC URL of the database")
+    parser.add_argument('--username', default=os.environ.get('LB_USER'), help="default: $LB_USER")
+    parser.add_argument('--password', default=os.environ.get('LB_PASSWORD'), help="default: $LB_PASSWORD")
+    parser.add_argument('--liquibase', default=os.environ.get('LIQUIBASE_BIN', 'liquibase'),
+                        help="Liquibase executable (default: $LIQUIBASE_BIN or liquibase)")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help=f"cache root (default: {CACHE_DIR})")
+    parser.add_argument('--max-age', type=float, help="also refresh snapshots older than this many seconds")
+    parser.add_argument('--refresh', action='store_true', help="take a new snapshot even if the cached one is fresh")
+    parser.add_argument('--offline-url', action='store_true', help="print a Liquibase offline: URL for the snapshot")
+    args = parser.parse_args(argv)
+
+    try:
+        path, reused = snapshot(args.url, args.username, args.password, args.liquibase,
+                                args.cache_dir, args.max_age, args.refresh, log=sys.stderr)
+    except (OSError, RuntimeError) as e:
+        print(f"❌ Cannot snapshot {args.url}: {e}", file=sys.stderr)
+        return 2
+    print(f"{'Reused' if reused else 'Took'} snapshot of {args.url}", file=sys.stderr)
+    print(offline_url(args.url, path) if args.offline_url else path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
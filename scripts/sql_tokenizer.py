@@ -0,0 +1,320 @@
+###
+### Streaming SQL tokenizer for formatted-SQL changesets
+###
+### Scanner is fed one line at a time and keeps its state across lines, so a
+### changeset is tokenized in a single linear pass. It understands
+###   - single-quoted strings ('' and E'\'' escapes), "quoted identifiers"
+###   - $tag$ dollar quotes, whose contents are scanned as PL code
+###   - -- line comments and nested /* block comments */
+###   - --rollback lines, which Liquibase strips before running the SQL
+### and produces a Structure: the statement list, BEGIN/END blocks, paren
+### totals and any literal or comment still open at the end.
+###
+import re
+
+###
+### Token patterns
+###
+TOKEN = re.compile(r"""--|/\*|\b[Ee]'|'|"|\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$|[();]|\b(?:BEGIN|END|CASE)\b""", re.IGNORECASE)
+BLOCK_COMMENT_TOKEN = re.compile(r'/\*|\*/')
+ROLLBACK_LINE = re.compile(r'^\s*--\s*rollback\b', re.IGNORECASE)
+FIRST_WORD = re.compile(r'\s*([A-Za-z_][A-Za-z0-9_]*)')
+LAST_WORD = re.compile(r'([A-Za-z_][A-Za-z0-9_]*)\W*$')
+TRANSACTION_BEGIN = re.compile(r'\s*(;|TRANSACTION\b|WORK\b|ISOLATION\b)', re.IGNORECASE)
+END_QUALIFIER = re.compile(r'\s*(IF|LOOP|WHILE|REPEAT|CASE)\b', re.IGNORECASE)
+
+# A line starting with one of these opens a new statement, even when the
+# previous one was never terminated with ';'
+STATEMENT_STARTER = re.compile(
+    r'\s*(?:(CREATE|INSERT|UPDATE|DELETE|GRANT|REVOKE)\b|(ALTER|DROP)\s+(?!COLUMN\b|CONSTRAINT\b)[A-Za-z_])',
+    re.IGNORECASE)
+
+# ...unless the previous line ended in a word that expects it to continue
+CONTINUATION_WORDS = {
+    'OR', 'ON', 'BEFORE', 'AFTER', 'OF', 'FOR', 'DO', 'INSTEAD', 'ALSO',
+    'AND', 'AS', 'THEN', 'ELSE', 'WITH', 'EACH', 'ROW',
+}
+
+###
+### Structure produced by a scan
+###
+class Statement:
+    """One top-level SQL statement"""
+    __slots__ = ('start_line', 'end_line', 'keyword', 'terminated', 'text')
+
+    def __init__(self, start_line, keyword):
+        self.start_line = start_line
+        self.end_line = start_line
+        self.keyword = keyword
+        self.terminated = False
+        self.text = None
+
+    def __repr__(self):
+        state = 'terminated' if self.terminated else 'open'
+        return f"<Statement {self.keyword} lines {self.start_line}-{self.end_line} {state}>"
+
+class Block:
+    """A BEGIN ... END block; end_line stays None when it was never closed"""
+    __slots__ = ('start_line', 'end_line')
+
+    def __init__(self, start_line):
+        self.start_line = start_line
+        self.end_line = None
+
+class Structure:
+    def __init__(self):
+        self.statements = []
+        self.blocks = []
+        self.paren_open = 0
+        self.paren_close = 0
+        self.paren_problem_line = None
+        self.last_code_line = None
+        self.unterminated_quote_line = None
+        self.unterminated_dollar_line = None
+        self.unterminated_comment_line = None
+        self.rollback = []
+
+    @property
+    def swallowed_from_line(self):
+        """First line of a literal or comment that ran to the end, if any"""
+        lines = [line for line in (self.unterminated_quote_line,
+                                   self.unterminated_dollar_line,
+                                   self.unterminated_comment_line) if line]
+        return min(lines) if lines else None
+
+###
+### Scanner
+###
+NORMAL, SQUOTE, ESTRING, DQUOTE, COMMENT = range(5)
+
+class Scanner:
+    """Incremental tokenizer: feed() every line, then close()"""
+
+    def __init__(self, keep_text=False):
+        self.keep_text = keep_text
+        self.structure = Structure()
+        self.state = NORMAL
+        self.state_line = None
+        self.comment_depth = 0
+        self.bodies = []          # open $tag$ bodies: (tag, line)
+        self.blocks = [[]]        # open BEGIN/CASE per body level
+        self.statement = None
+        self.statement_parens = 0
+        self.text_parts = []
+        self.last_code = ''
+
+    ###
+    ### Statement bookkeeping
+    ###
+    def _open_statement(self, line_no, line, pos):
+        match = FIRST_WORD.match(line, pos)
+        keyword = match.group(1).upper() if match else line[pos:pos + 1]
+        self.statement = Statement(line_no, keyword)
+        self.statement_parens = 0
+
+    def _close_statement(self, terminated):
+        statement = self.statement
+        statement.terminated = terminated
+        if self.keep_text:
+            statement.text = ''.join(self.text_parts).strip()
+            self.text_parts = []
+        self.structure.statements.append(statement)
+        self.statement = None
+        # CASE blocks never outlive the statement that opened them
+        self.blocks[0] = [b for b in self.blocks[0] if b[0] == 'BEGIN']
+
+    def _in_top_level_code(self):
+        return not self.bodies and not any(kind == 'BEGIN' for kind, _ in self.blocks[0])
+
+    def _code(self, line_no, line, start, end):
+        """Record code text line[start:end]; opens a statement on first code"""
+        if start >= end:
+            return
+        segment = line[start:end]
+        if self.statement is None:
+            if not segment.strip():
+                return
+            self._open_statement(line_no, line, start + len(segment) - len(segment.lstrip()))
+        self.statement.end_line = line_no
+        self.structure.last_code_line = line_no
+        if self.keep_text:
+            self.text_parts.append(segment)
+        if not segment.isspace():
+            self.last_code = segment
+
+    ###
+    ### Line feed
+    ###
+    def feed(self, line_no, line):
+        if ROLLBACK_LINE.match(line):
+            text = line.strip()
+            self.structure.rollback.append((line_no, text[text.lower().index('rollback') + 8:].strip()))
+            return
+
+        if self.state == NORMAL and self.statement is not None and self._in_top_level_code() \
+                and self.statement_parens <= 0:
+            match = STATEMENT_STARTER.match(line)
+            if match and not self._continues(match):
+                self._close_statement(False)
+
+        pos = 0
+        length = len(line)
+        while pos < length:
+            if self.state == NORMAL:
+                pos = self._scan_normal(line_no, line, pos)
+            elif self.state == COMMENT:
+                pos = self._scan_comment(line, pos)
+            else:
+                pos = self._scan_quoted(line_no, line, pos)
+
+    def _continues(self, starter):
+        previous = LAST_WORD.search(self.last_code)
+        if previous and previous.group(1).upper() in CONTINUATION_WORDS:
+            return True
+        word = (starter.group(1) or '').upper()
+        return self.statement.keyword == 'WITH' and word in ('INSERT', 'UPDATE', 'DELETE')
+
+    def _scan_normal(self, line_no, line, pos):
+        match = TOKEN.search(line, pos)
+        if not match:
+            self._code(line_no, line, pos, len(line))
+            return len(line)
+
+        token = match.group(0)
+        start, end = match.span()
+        if token == '--':
+            self._code(line_no, line, pos, start)
+            self._text('\n', 0, 1)
+            return len(line)
+        if token == '/*':
+            self._code(line_no, line, pos, start)
+            self._text(' ', 0, 1)
+            self.state = COMMENT
+            self.state_line = line_no
+            self.comment_depth = 1
+            return end
+
+        self._code(line_no, line, pos, start)
+        if token == ';':
+            if self.statement is not None:
+                self._code(line_no, line, start, end)
+                if self._in_top_level_code():
+                    self._close_statement(True)
+            return end
+
+        self._code(line_no, line, start, end)
+        first = token[0]
+        structure = self.structure
+
+        if token.endswith("'"):
+            self.state = ESTRING if first in 'Ee' else SQUOTE
+            self.state_line = line_no
+        elif first == '"':
+            self.state = DQUOTE
+            self.state_line = line_no
+        elif first == '$':
+            if self.bodies and self.bodies[-1][0] == token:
+                self._close_body()
+            else:
+                self.bodies.append((token, line_no))
+                self.blocks.append([])
+        elif token == '(':
+            structure.paren_open += 1
+            self.statement_parens += 1
+        elif token == ')':
+            structure.paren_close += 1
+            self.statement_parens -= 1
+            if structure.paren_problem_line is None and structure.paren_close > structure.paren_open:
+                structure.paren_problem_line = line_no
+        else:
+            self._keyword(token.upper(), line_no, line, end)
+        return end
+
+    def _keyword(self, word, line_no, line, end):
+        blocks = self.blocks[-1]
+        if word == 'BEGIN':
+            if not TRANSACTION_BEGIN.match(line, end):
+                block = Block(line_no)
+                self.structure.blocks.append(block)
+                blocks.append(('BEGIN', block))
+        elif word == 'CASE':
+            blocks.append(('CASE', None))
+        elif word == 'END':
+            qualifier = END_QUALIFIER.match(line, end)
+            if qualifier:
+                if qualifier.group(1).upper() == 'CASE' and blocks and blocks[-1][0] == 'CASE':
+                    blocks.pop()
+            elif blocks:
+                kind, block = blocks.pop()
+                if block is not None:
+                    block.end_line = line_no
+
+    def _close_body(self):
+        self.bodies.pop()
+        self.blocks.pop()
+
+    def _scan_comment(self, line, pos):
+        while True:
+            match = BLOCK_COMMENT_TOKEN.search(line, pos)
+            if not match:
+                return len(line)
+            pos = match.end()
+            if match.group(0) == '/*':
+                self.comment_depth += 1
+            else:
+                self.comment_depth -= 1
+                if self.comment_depth == 0:
+                    self.state = NORMAL
+                    return pos
+
+    def _scan_quoted(self, line_no, line, pos):
+        quote = '"' if self.state == DQUOTE else "'"
+        length = len(line)
+        while True:
+            close = line.find(quote, pos)
+            if self.state == ESTRING:
+                backslash = line.find('\\', pos)
+                if backslash != -1 and (close == -1 or backslash < close):
+                    self._text(line, pos, backslash + 2)
+                    pos = backslash + 2
+                    if pos >= length:
+                        return length
+                    continue
+            if close == -1:
+                self._text(line, pos, length)
+                return length
+            if close + 1 < length and line[close + 1] == quote:
+                self._text(line, pos, close + 2)
+                pos = close + 2
+                continue
+            self._text(line, pos, close + 1)
+            self.state = NORMAL
+            if self.statement is not None:
+                self.statement.end_line = line_no
+            return close + 1
+
+    def _text(self, line, start, end):
+        if self.keep_text and self.statement is not None:
+            self.text_parts.append(line[start:end])
+
+    ###
+    ### End of changeset
+    ###
+    def close(self):
+        structure = self.structure
+        if self.state in (SQUOTE, ESTRING):
+            structure.unterminated_quote_line = self.state_line
+        elif self.state == COMMENT:
+            structure.unterminated_comment_line = self.state_line
+        if self.bodies:
+            structure.unterminated_dollar_line = self.bodies[0][1]
+        if self.statement is not None:
+            self._close_statement(False)
+        return structure
+
+def scan(lines, keep_text=False):
+    """Tokenize a list of lines in one pass and return their Structure"""
+    scanner = Scanner(keep_text)
+    for i, line in enumerate(lines, 1):
+        scanner.feed(i, line)
+    return scanner.close()
@@ -0,0 +1,386 @@
+###
+### Rule registry and single-pass engine for validate_syntax.py
+###
+### Every check is either a compiled pattern applied to code lines or a small
+### state machine fed one line at a time. validate_lines() classifies each line
+### once and runs every rule in the same pass over the changeset.
+###
+import hashlib
+import json
+import os
+import re
+
+import sql_tokenizer
+
+SEVERITY_ORDER = {'CRITICAL': 0, 'ERROR': 1, 'WARNING': 2}
+
+###
+### Line classification
+###
+def is_comment_line(line):
+    stripped = line.strip()
+    return stripped.startswith('--') or stripped.startswith('/*') or stripped.startswith('*')
+
+def is_rollback_line(line):
+    stripped = line.strip()
+    return stripped.startswith('--rollback')
+
+###
+### Pattern rules: fire once per code line whose text matches
+###
+class PatternRule:
+    """A compiled pattern searched on every non-comment, non-rollback line"""
+
+    def __init__(self, name, pattern, message, severity):
+        self.name = name
+        self.search = re.compile(pattern, re.IGNORECASE).search
+        self.message = message
+        self.severity = severity
+
+class LiteralRule:
+    """A plain substring test, cheaper than a regex"""
+
+    def __init__(self, name, literal, message, severity):
+        self.name = name
+        self.literal = literal
+        self.message = message
+        self.severity = severity
+
+    def search(self, line):
+        return self.literal in line
+
+###
+### Typo catalog: every literal typo compiled into one automaton
+###
+TYPO_CATALOG = os.environ.get(
+    "VALIDATE_SYNTAX_TYPO_CATALOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "typo_catalog.json"))
+
+def load_typo_catalog(path=TYPO_CATALOG):
+    """Read the typo catalog: a JSON list of {typo, fix, severity[, context]}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+class TypoCatalogRule:
+    """All catalog typos in one trie-shaped regex, searched once per code line.
+
+    Typo keys are upper-cased words; whitespace between words matches any run
+    of whitespace. The regex is a character trie, so its cost per line stays
+    flat as the catalog grows. Each key ends in an empty named group, and
+    match.lastgroup tells which entry fired. Entries with a 'context' pattern
+    are confirmed against the whole line only after their keyword matched.
+    """
+    name = 'typo-catalog'
+
+    def __init__(self, entries):
+        self.entries = []
+        trie = {}
+        for index, entry in enumerate(entries):
+            context = entry.get('context')
+            self.entries.append((
+                f"'{entry['typo']}' should be '{entry['fix']}'",
+                entry['severity'],
+                re.compile(context, re.IGNORECASE).search if context else None,
+            ))
+            node = trie
+            for word_index, word in enumerate(entry['typo'].upper().split()):
+                if word_index:
+                    node = node.setdefault(' ', {})
+                for ch in word:
+                    node = node.setdefault(ch, {})
+            node[''] = index
+        # Zero-width lookahead so a key is still seen when it starts inside
+        # the span of a longer, earlier match
+        self.finditer = re.compile(r'\b(?=' + self._trie_pattern(trie) + ')').finditer
+
+    @classmethod
+    def _trie_pattern(cls, node):
+        branches = []
+        for key in sorted(k for k in node if k):
+            step = r'\s+' if key == ' ' else re.escape(key)
+            branches.append(step + cls._trie_pattern(node[key]))
+        if '' in node:
+            # Terminal goes last so the longest key wins at a given position
+            branches.append(rf'\b(?P<t{node[""]}>)')
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')'
+
+    def start(self):
+        pass
+
+    def feed(self, i, line, stripped, code, emit):
+        if code is None:
+            return
+        fired = {int(m.lastgroup[1:]) for m in self.finditer(line.upper())}
+        for index in sorted(fired):
+            message, severity, context = self.entries[index]
+            if context is None or context(line):
+                emit(i, message, severity, index)
+
+    def finish(self, line_count, emit):
+        pass
+
+SQL_TYPES = r'(TEXT|VARCHAR|VARCHAR2|CHAR|INT|INTEGER|BIGINT|BIGSERIAL|NUMBER|DATE|TIMESTAMP|TIMESTAMPTZ|CLOB|BLOB)'
+
+RESERVED_WORDS = ['USER', 'LEVEL', 'SIZE', 'ORDER', 'GROUP', 'DATE', 'NUMBER']
+
+###
+### Structure rules read sql_tokenizer's single-pass scan; state machine
+### rules see every line and may resolve earlier lines
+###
+class StructureRule:
+    """Base for checks that read the tokenizer's statement/block structure"""
+    uses_structure = True
+
+class ParenBalanceRule(StructureRule):
+    """Check 5: total '(' and ')' outside strings and comments must match"""
+    name = 'unmatched-parens'
+
+    def check(self, structure, line_count, emit):
+        if structure.paren_open == structure.paren_close or structure.swallowed_from_line:
+            return
+        problem_line = structure.paren_problem_line or structure.last_code_line or line_count
+        emit(problem_line, f"Unmatched parentheses: {structure.paren_open} '(' vs {structure.paren_close} ')'", "ERROR")
+
+class QuoteBalanceRule(StructureRule):
+    """Check 6: string literals, dollar quotes and block comments must close"""
+    name = 'unmatched-quotes'
+
+    def check(self, structure, line_count, emit):
+        if structure.unterminated_quote_line:
+            emit(structure.unterminated_quote_line, "Unmatched single quotes", "ERROR")
+        if structure.unterminated_dollar_line:
+            emit(structure.unterminated_dollar_line, "Unterminated dollar-quoted body", "ERROR")
+        if structure.unterminated_comment_line:
+            emit(structure.unterminated_comment_line, "Unterminated block comment", "ERROR")
+
+class SemicolonRule(StructureRule):
+    """Check 8: DDL/DML/DCL statements must end with ';'"""
+    name = 'missing-semicolon'
+    KEYWORDS = {'CREATE', 'ALTER', 'DROP', 'INSERT', 'UPDATE', 'DELETE', 'GRANT', 'REVOKE'}
+
+    def check(self, structure, line_count, emit):
+        # Anything after an unclosed literal was swallowed by it; that is
+        # already reported by check 6
+        swallowed_from = structure.swallowed_from_line
+        for statement in structure.statements:
+            if statement.terminated or statement.keyword not in self.KEYWORDS:
+                continue
+            if swallowed_from is not None and statement.end_line >= swallowed_from:
+                continue
+            emit(statement.start_line, "Statement missing terminating semicolon", "WARNING")
+
+class BeginEndRule(StructureRule):
+    """Check 9a: every BEGIN block must be closed by END"""
+    name = 'begin-without-end'
+
+    def check(self, structure, line_count, emit):
+        for block in structure.blocks:
+            if block.end_line is None:
+                emit(block.start_line, "BEGIN without matching END", "ERROR")
+
+class IfThenRule:
+    """Check 9b: IF needs THEN on the same line or one of the next two"""
+    name = 'if-without-then'
+    IF_NOT_EXISTS = re.compile(r'\bIF\b.*\bNOT\b.*\bEXISTS\b', re.IGNORECASE)
+    IF_EXISTS = re.compile(r'\bIF\s+EXISTS\b', re.IGNORECASE)
+    IF = re.compile(r'\bIF\b', re.IGNORECASE)
+    END_IF = re.compile(r'\bEND\s+IF\b', re.IGNORECASE)
+    THEN = re.compile(r'\bTHEN\b', re.IGNORECASE)
+
+    def start(self):
+        self.pending = []
+
+    def feed(self, i, line, stripped, code, emit):
+        if self.pending:
+            if self.THEN.search(line):
+                self.pending = []
+            else:
+                still_open = []
+                for start in self.pending:
+                    if i >= start + 2:
+                        emit(start, "IF without THEN", "ERROR")
+                    else:
+                        still_open.append(start)
+                self.pending = still_open
+
+        if code is None or not self.IF.search(line):
+            return
+        if self.END_IF.search(line) and not self.IF.search(self.END_IF.sub('', line)):
+            return
+        if self.IF_NOT_EXISTS.search(line) or self.IF_EXISTS.search(line):
+            return
+        if not self.THEN.search(line):
+            self.pending.append(i)
+
+    def finish(self, line_count, emit):
+        for start in self.pending:
+            emit(start, "IF without THEN", "ERROR")
+
+class ReservedWordRule:
+    """Check 11: reserved word followed by a type, reported once per word"""
+    name = 'reserved-word-column'
+
+    def __init__(self, words):
+        self.words = words
+        alternation = '|'.join(words)
+        self.finditer = re.compile(rf'\b({alternation})\s+(TEXT|VARCHAR|INT|NOT\s+NULL)', re.IGNORECASE).finditer
+
+    def start(self):
+        pass
+
+    def feed(self, i, line, stripped, code, emit):
+        if code is None:
+            return
+        found = {m.group(1).upper() for m in self.finditer(line)}
+        for word in self.words:
+            if word in found:
+                emit(i, f"Reserved word '{word}' as column name - use quotes", "WARNING")
+
+    def finish(self, line_count, emit):
+        pass
+
+###
+### Registry, in reporting order (checks 2 - 11). Built on the first
+### validation that needs it: a changeset answered from the verdict cache
+### never compiles the typo catalog, however large it grows.
+###
+def build_rules():
+    """A fresh rule list over the TYPO_CATALOG catalog"""
+    return [
+        # Checks 2 - 4: CREATE, ALTER and other common typos
+        TypoCatalogRule(load_typo_catalog()),
+        # Checks 5 - 6: balance
+        ParenBalanceRule(),
+        QuoteBalanceRule(),
+        # Check 7: missing commas in column definitions
+        PatternRule('missing-comma', rf'\b[A-Z_][A-Z0-9_]*\s+{SQL_TYPES}\s+[A-Z_][A-Z0-9_]*\s+{SQL_TYPES}',
+                    "Missing comma between column definitions", "ERROR"),
+        # Check 8: missing semicolons
+        SemicolonRule(),
+        # Check 9: PL/SQL structure
+        BeginEndRule(),
+        IfThenRule(),
+        # Check 10: double semicolons
+        LiteralRule('double-semicolon', ';;', "Double semicolon (;;)", "WARNING"),
+        # Check 11: reserved words as identifiers
+        ReservedWordRule(RESERVED_WORDS),
+    ]
+
+_rules = None
+
+def default_rules():
+    """The shared registry, built once per interpreter"""
+    global _rules
+    if _rules is None:
+        _rules = build_rules()
+    return _rules
+
+def __getattr__(name):
+    # syntax_rules.RULES still works; it builds the registry when first read
+    if name == 'RULES':
+        return default_rules()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+###
+### Engine
+###
+def check_header(lines, start_line_number):
+    """Check 1: the first changeset of a file must carry the formatted-sql header"""
+    if start_line_number != 1:
+        return []
+    for line in lines[:5]:
+        if "--liquibase formatted sql" in line.lower():
+            return []
+    return [(1, "Missing '--liquibase formatted sql' header", "CRITICAL")]
+
+def validate_lines(lines, start_line_number, rules=None):
+    """Run every rule over a changeset in one pass.
+
+    Returns (line_offset, error_message, severity) tuples sorted by line,
+    severity and rule order, matching the report validate_syntax.py prints.
+    """
+    rules = default_rules() if rules is None else rules
+    hits = []
+
+    pattern_rules = []
+    machines = []
+    structure_rules = []
+    for order, rule in enumerate(rules):
+        if isinstance(rule, (PatternRule, LiteralRule)):
+            pattern_rules.append((rule.search, rule.message, rule.severity, (order, 0)))
+        elif getattr(rule, 'uses_structure', False):
+            structure_rules.append((rule, _emitter(hits, order)))
+        else:
+            rule.start()
+            machines.append((rule, _emitter(hits, order)))
+
+    scanner = sql_tokenizer.Scanner() if structure_rules else None
+
+    for i, line in enumerate(lines, 1):
+        stripped = line.strip()
+        if stripped.startswith('--') or stripped.startswith('/*') or stripped.startswith('*'):
+            code = None
+        else:
+            code = line.split('--', 1)[0]
+            for search, message, severity, order in pattern_rules:
+                if search(line):
+                    hits.append((i, SEVERITY_ORDER[severity], order, message, severity))
+        for rule, emit in machines:
+            rule.feed(i, line, stripped, code, emit)
+        if scanner:
+            scanner.feed(i, line)
+
+    for rule, emit in machines:
+        rule.finish(len(lines), emit)
+    if scanner:
+        structure = scanner.close()
+        for rule, emit in structure_rules:
+            rule.check(structure, len(lines), emit)
+
+    hits.sort(key=lambda h: (h[0], h[1], h[2]))
+    errors = check_header(lines, start_line_number)
+    errors.extend((h[0], h[3], h[4]) for h in hits)
+    errors.sort(key=lambda e: (e[0], SEVERITY_ORDER.get(e[2], 3)))
+    return errors
+
+_fingerprint = None
+
+def rules_fingerprint():
+    """Hash of the rule engine, tokenizer and typo catalog sources.
+
+    Cached verdicts carry it, so editing any rule invalidates them.
+    """
+    global _fingerprint
+    if _fingerprint is None:
+        digest = hashlib.sha256()
+        for path in (__file__, sql_tokenizer.__file__, TYPO_CATALOG):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        _fingerprint = digest.hexdigest()
+    return _fingerprint
+
+def format_report(changeset_id, errors, start_line_number):
+    """Compact failure report with file line numbers"""
+    critical = sum(1 for e in errors if e[2] == 'CRITICAL')
+    error_count = sum(1 for e in errors if e[2] == 'ERROR')
+    warning = sum(1 for e in errors if e[2] == 'WARNING')
+
+    report = f"\nVALIDATION FAILED: {changeset_id}\n"
+    report += f"Critical: {critical} | Errors: {error_count} | Warnings: {warning}\n"
+    report += f"{'-'*55}\n"
+
+    for line_offset, error_msg, severity in errors:
+        # Calculate actual file line number
+        actual_line = start_line_number + line_offset - 1
+        sev = severity[:4]  # CRIT, ERRO, WARN
+        report += f"[{sev}] Line {actual_line}: {error_msg}\n"
+
+    report += f"{'-'*55}\n"
+    return report
+
+def _emitter(hits, order):
+    def emit(i, message, severity, sub_order=0):
+        hits.append((i, SEVERITY_ORDER[severity], (order, sub_order), message, severity))
+    return emit
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Standalone SQL Syntax Validator
+
+Runs the validate_syntax.py rules over a whole changelog tree without
+starting Liquibase: resolves <include>/<includeAll> from the root changelog,
+then validates every changeset of every formatted-SQL file across a process
+pool. Failures are printed in the same report format the Liquibase check uses.
+
+Verdicts are cached per changeset content hash (see verdict_cache.py), so a
+re-run only re-checks changesets that changed; --full forces a rescan.
+
+Usage:
+  python scripts/validate_changelog.py                       # liquibase.properties changeLogFile
+  python scripts/validate_changelog.py changelog-sql/main.root.xml
+  python scripts/validate_changelog.py changelog-sql/v1.0/002_add_indexes.sql
+  python scripts/validate_changelog.py --check-script ...    # run validate_syntax.py itself per changeset
+  python scripts/validate_changelog.py --full ...            # ignore cached verdicts
+  python scripts/validate_changelog.py --profile ...         # per-rule timings, see rule_profile.py
+
+Exit code: 0 when every changeset passes, 1 on validation failures,
+2 when the changelog tree cannot be read.
+"""
+
+import argparse
+import functools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+import changelog_includes
+import changeset_index
+import syntax_rules
+import verdict_cache
+
+
+def split_changesets(path):
+    """Split a formatted-SQL file into (id, start_line, lines) blocks, using the shared changeset index"""
+    return list(changeset_index.load(path).blocks())
+
+
+def validate_file(path, full=False, profile=False):
+    """Validate every changeset in one file.
+
+    Returns (path, changeset count, [(id, report)], verdicts served from cache,
+    profile records, new verdicts), where profile records are only collected
+    with profile. New verdicts are (key, errors) pairs for the caller to
+    store: workers only read the verdict cache, so none of them holds its
+    write lock while it validates.
+    """
+    if profile:
+        import rule_profile
+    fingerprint = syntax_rules.rules_fingerprint()
+    verdicts = verdict_cache.VerdictCache()
+    failures = []
+    records = []
+    fresh = []
+    seen = set()
+    cached = 0
+    for changeset_id, start_line, block in split_changesets(path):
+        # Liquibase resolves author:id to the first block that carries it
+        if changeset_id in seen:
+            continue
+        seen.add(changeset_id)
+        key = verdict_cache.changeset_key(block, start_line, fingerprint)
+        errors = None if full else verdicts.get(key)
+        if errors is None:
+            if profile:
+                errors, per_rule, seconds = rule_profile.profile_lines(block, start_line)
+                records.append(rule_profile.record(changeset_id, path, block, seconds, per_rule))
+            else:
+                errors = syntax_rules.validate_lines(block, start_line)
+            fresh.append((key, errors))
+        else:
+            cached += 1
+            if profile:
+                records.append(rule_profile.record(changeset_id, path, block, 0.0, {}, cached=True))
+        if errors:
+            failures.append((changeset_id, syntax_rules.format_report(changeset_id, errors, start_line)))
+    verdicts.close()
+    return path, len(seen), failures, cached, records, fresh
+
+
+def validate_file_via_check(path, full=False, profile=False):
+    """Same as validate_file, but runs validate_syntax.py through the shim"""
+    import liquibase_shim
+
+    script = os.path.join(SCRIPT_DIR, 'validate_syntax.py')
+    failures = []
+    seen = set()
+    for changeset_id in changeset_index.load(path).ids:
+        if changeset_id in seen:
+            continue
+        seen.add(changeset_id)
+        author, _, cs_id = changeset_id.partition(':')
+        fired, message = liquibase_shim.run_check(
+            script, changeset=liquibase_shim.ChangeSet(path, author, cs_id),
+            args={'FULL_RESCAN': 'true' if full else None, 'PROFILE': profile or None})
+        if fired:
+            failures.append((changeset_id, message))
+    return path, len(seen), failures, 0, [], []
+
+
+def default_changelog():
+    """changeLogFile from liquibase.properties, as Liquibase would pick it"""
+    try:
+        with open('liquibase.properties', 'r', encoding='utf-8') as f:
+            for line in f:
+                key, sep, value = line.partition('=')
+                if sep and key.strip() == 'changeLogFile':
+                    return value.strip()
+    except OSError:
+        pass
+    return os.path.join('changelog-sql', 'main.root.xml')
+
+
+def collect_sql_files(paths, search_path):
+    """Expand changelogs and directories into the formatted-SQL files they cover"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            candidates = changelog_includes.list_changelogs(path)
+        else:
+            graph = changelog_includes.load_graph(path, search_path)
+            if graph.missing:
+                raise FileNotFoundError(graph.problems()[0])
+            if not graph.ok:
+                raise SyntaxError(graph.problems()[0])
+            candidates = graph.files
+        files.extend(p for p in candidates if p.lower().endswith('.sql'))
+    # Keep include order, drop repeats
+    return list(dict.fromkeys(files))
+
+
+def run(files, jobs, validator):
+    if jobs > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(files))) as pool:
+            return list(pool.map(validator, files))
+    return [validator(path) for path in files]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate formatted-SQL changesets without Liquibase")
+    parser.add_argument('paths', nargs='*', help="root changelog(s), SQL files or directories")
+    parser.add_argument('--search-path', default='.', help="base for non-relative includes (default: .)")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--check-script', action='store_true',
+                        help="run scripts/validate_syntax.py per changeset through the liquibase_utilities shim")
+    parser.add_argument('--full', action='store_true', help="re-check every changeset, ignoring cached verdicts")
+    parser.add_argument('--profile', nargs='?', const='true', metavar='PATH',
+                        help="record per-rule timings as JSON lines (default: next to the Liquibase log)")
+    parser.add_argument('--top', type=int, default=10, help="rows in the --profile summary (default: 10)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="also list changesets that pass")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        files = collect_sql_files(args.paths or [default_changelog()], args.search_path)
+    except (OSError, SyntaxError) as e:
+        print(f"❌ Cannot read changelog tree: {e}")
+        return 2
+
+    profile_path = None
+    if args.profile:
+        import rule_profile
+        profile_path = rule_profile.requested(args.profile)
+        if os.path.exists(profile_path):
+            os.remove(profile_path)
+
+    validator = functools.partial(validate_file_via_check if args.check_script else validate_file,
+                                  full=args.full, profile=profile_path if args.check_script else bool(profile_path))
+    results = run(files, args.jobs, validator)
+
+    total = 0
+    failed = 0
+    cached = 0
+    records = []
+    verdicts = verdict_cache.VerdictCache()
+    for path, count, failures, from_cache, profiled, fresh in results:
+        for key, errors in fresh:
+            verdicts.put(key, errors)
+        total += count
+        failed += len(failures)
+        cached += from_cache
+        records.extend(profiled)
+        for changeset_id, report in failures:
+            print(f"{os.path.relpath(path)}:{report}", end='')
+        if args.verbose and count > len(failures):
+            print(f"✓ {os.path.relpath(path)}: {count - len(failures)} changeset(s) validated")
+
+    verdicts.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"\nValidated {total} changeset(s) in {len(files)} file(s) in {elapsed:.2f}s: "
+          f"{failed} failed, {cached} unchanged (cached verdict)")
+    if profile_path:
+        rule_profile.append_records(profile_path, records)
+        print()
+        print(rule_profile.summarize(rule_profile.read_records(profile_path), args.top))
+        print(f"\nProfile written to {profile_path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+###
+### Per-changeset verdict store for incremental validation
+###
+### Keyed by a hash of the changeset's text plus a fingerprint of the rules
+### that judged it, so a changeset is only re-checked when its content or
+### the rule set changed. Verdicts are kept as line offsets, so a changeset
+### that merely moved inside its file still reports correct line numbers.
+###
+### Liquibase runs validate_syntax.py once per changeset and each run
+### commits its verdict, so the store is opened in WAL mode with
+### synchronous=NORMAL: a commit appends to the log without an fsync, and
+### the log is synced when it is checkpointed. A crash can lose the last
+### verdicts, which are then simply judged again.
+###
+import hashlib
+import json
+import os
+
+try:
+    import sqlite3
+except ImportError:  # some embedded interpreters ship without it
+    sqlite3 = None
+
+CACHE_DIR = os.environ.get("VALIDATE_SYNTAX_CACHE_DIR", ".liquibase-cache")
+CACHE_FILE = "verdicts.sqlite"
+
+def changeset_key(lines, start_line_number, fingerprint):
+    """Content hash of one changeset under a given rule fingerprint"""
+    digest = hashlib.sha256()
+    digest.update(fingerprint.encode('utf-8'))
+    # Check 1 only applies to a changeset starting on the file's first line
+    digest.update(b'\x01' if start_line_number == 1 else b'\x00')
+    for line in lines:
+        digest.update(line.encode('utf-8'))
+    return digest.hexdigest()
+
+class VerdictCache:
+    """sqlite-backed map of changeset key -> list of (offset, message, severity)"""
+
+    def __init__(self, cache_dir=CACHE_DIR, enabled=True):
+        self.db = None
+        self.hits = 0
+        self.misses = 0
+        if not enabled or sqlite3 is None:
+            return
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.db = sqlite3.connect(os.path.join(cache_dir, CACHE_FILE), timeout=30)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS verdicts (key TEXT PRIMARY KEY, errors TEXT NOT NULL)")
+        except (OSError, sqlite3.Error):
+            self.db = None
+
+    def get(self, key):
+        """Cached errors for key, or None when it has not been judged yet"""
+        if self.db is None:
+            return None
+        row = self.db.execute("SELECT errors FROM verdicts WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [tuple(e) for e in json.loads(row[0])]
+
+    def put(self, key, errors):
+        if self.db is None:
+            return
+        try:
+            self.db.execute("INSERT OR REPLACE INTO verdicts (key, errors) VALUES (?, ?)",
+                            (key, json.dumps(errors)))
+        except sqlite3.Error:
+            pass
+
+    def commit(self):
+        if self.db is None:
+            return
+        try:
+            self.db.commit()
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        if self.db is None:
+            return
+        self.commit()
+        self.db.close()
+        self.db = None
@@ -0,0 +1,103 @@
+###
+### Warm-Worker Shim for the Python Custom Checks
+###
+### Forwards one Liquibase invocation of validate_syntax.py or gdpr_check.py
+### to scripts/check_worker.py over its Unix socket and replays the status,
+### message and log lines, so the check's modules, patterns and catalogs
+### are loaded once per worker instead of once per changeset or object.
+### Only a fresh interpreter forwards: when the host runs this script again
+### in the same interpreter, the check runs here from then on, since a warm
+### check is faster than the round trip. Without a running worker the real
+### script runs here as well, exactly as before.
+###
+### Point a check at it with SCRIPT_PATH scripts/warm_check.py and name the
+### script in SCRIPT_ARGS, followed by that script's own arguments:
+###   CHECK=validate_syntax,FULL_RESCAN=true
+###   CHECK=gdpr_check,THRESHOLD=1.0
+### SOCKET=<path> (or CHECK_WORKER_SOCKET) selects the worker.
+###
+import importlib
+import os
+import sys
+import types
+import liquibase_utilities
+
+###
+### Worker client lives beside this script
+###
+SCRIPT_DIR = os.path.dirname(os.path.abspath(globals().get('__file__') or os.path.join('scripts', 'warm_check.py')))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+import check_worker
+
+###
+### Retrieve handlers
+###
+liquibase_logger = liquibase_utilities.get_logger()
+liquibase_status = liquibase_utilities.get_status()
+
+# Survives re-execution of this script inside the same interpreter
+_memory_cache = sys.modules.setdefault("_warm_check_cache", types.ModuleType("_warm_check_cache"))
+_memory_cache.invocations = getattr(_memory_cache, 'invocations', 0) + 1
+
+def script_arg(name):
+    try:
+        return liquibase_utilities.get_arg(name)
+    except Exception:
+        return None
+
+check = script_arg("CHECK") or "validate_syntax"
+if check not in check_worker.CHECKS:
+    liquibase_status.fired = True
+    liquibase_status.message = f"Unknown CHECK {check}: expected one of {', '.join(check_worker.CHECKS)}"
+    sys.exit(1)
+
+###
+### Forward the invocation, unless this interpreter has run before
+###
+if _memory_cache.invocations > 1:
+    reply = None
+else:
+    args = {}
+    for name in check_worker.CHECKS[check]:
+        value = script_arg(name)
+        if value is not None:
+            args[name] = value
+    request = {
+        'op': 'check',
+        'check': check,
+        'cwd': os.getcwd(),
+        'args': args,
+        'env': {name: os.environ[name] for name in check_worker.FORWARDED_ENV if name in os.environ},
+    }
+    request.update(check_worker.describe(liquibase_utilities))
+
+    # Nothing is forwarded after this invocation, so the connection is not kept
+    held = types.SimpleNamespace(connection=None)
+    try:
+        reply = check_worker.forward(held, request, script_arg("SOCKET"))
+    except (OSError, ValueError) as e:
+        reply = {'error': f"no worker ({e})"}
+    finally:
+        if held.connection is not None:
+            held.connection.close()
+    if 'error' in reply:
+        liquibase_logger.fine(f"Check worker unavailable, {check} runs in-process: {reply['error']}")
+        reply = None
+
+###
+### Warm interpreter or no worker: run the check in this interpreter
+###
+if reply is None:
+    exit_code = importlib.import_module(check).check(liquibase_utilities)
+    if exit_code is not None:
+        sys.exit(exit_code)
+else:
+    for level, message in reply['log']:
+        getattr(liquibase_logger, level.lower(), liquibase_logger.info)(message)
+    liquibase_status.fired = reply['fired']
+    liquibase_status.message = reply['message']
+    if reply['exit']:
+        sys.exit(reply['exit'])
+
+False
@@ -0,0 +1,105 @@
+"""
+The Python checks run the way Liquibase runs them
+
+Liquibase executes a check script in an interpreter where its
+liquibase_utilities module can be imported, under a module name of its
+choosing. The check must run then, and only an import by name (as
+check_worker.py and warm_check.py do) may skip it.
+
+Usage: python -m unittest discover tests
+"""
+
+import importlib
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(REPO_DIR, "scripts")
+sys.path.insert(0, SCRIPTS)
+
+import liquibase_shim
+
+CHANGELOG = """--liquibase formatted sql
+
+--changeset test:001
+CREATE TABLE app.customers (
+    customer_id BIGSERIAL PRIMARY KEY
+)
+--rollback DROP TABLE app.customers;
+"""
+
+# Run names a host may give the script
+RUN_NAMES = ("__main__", "<liquibase>", "validate_syntax_check")
+
+HOST = """
+import runpy, sys
+sys.path.insert(0, {scripts!r})
+import liquibase_shim
+lb = liquibase_shim.install({context})
+try:
+    runpy.run_path({script!r}, run_name={run_name!r})
+except SystemExit as e:
+    print("exit", e.code)
+print("fired", lb.get_status().fired)
+"""
+
+
+class CheckScriptTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory(prefix="liquibase-checks-")
+        self.addCleanup(self.tmp.cleanup)
+        self.changelog = os.path.join(self.tmp.name, "changelog.sql")
+        with open(self.changelog, "w", encoding="utf-8") as f:
+            f.write(CHANGELOG)
+        environment = mock.patch.dict(os.environ, VALIDATE_SYNTAX_CACHE_DIR=os.path.join(self.tmp.name, "cache"))
+        environment.start()
+        self.addCleanup(environment.stop)
+        self.addCleanup(sys.modules.pop, "liquibase_utilities", None)
+
+    def contexts(self):
+        """(script, install() keywords, the same as source) per check; both must fire"""
+        return [
+            ("validate_syntax", {"changeset": liquibase_shim.ChangeSet(self.changelog, "test", "001")},
+             f"changeset=liquibase_shim.ChangeSet({self.changelog!r}, 'test', '001')"),
+            ("gdpr_check", {"database_object": liquibase_shim.table("app.customers", ["customer_id", "email"])},
+             "database_object=liquibase_shim.table('app.customers', ['customer_id', 'email'])"),
+        ]
+
+    def test_runs_under_any_run_name(self):
+        for check, context, _ in self.contexts():
+            for run_name in RUN_NAMES:
+                with self.subTest(check=check, run_name=run_name):
+                    lb = liquibase_shim.install(**context)
+                    with self.assertRaises(SystemExit) as raised:
+                        runpy.run_path(os.path.join(SCRIPTS, f"{check}.py"), run_name=run_name)
+                    self.assertEqual(raised.exception.code, 1)
+                    self.assertTrue(lb.get_status().fired)
+
+    def test_runs_in_a_fresh_interpreter(self):
+        for check, _, source in self.contexts():
+            with self.subTest(check=check):
+                host = HOST.format(scripts=SCRIPTS, context=source, script=os.path.join(SCRIPTS, f"{check}.py"),
+                                   run_name="<liquibase>")
+                out = subprocess.run([sys.executable, "-c", host], cwd=self.tmp.name,
+                                     capture_output=True, text=True, check=True).stdout
+                self.assertIn("exit 1", out)
+                self.assertIn("fired True", out)
+
+    def test_import_by_name_only_defines_check(self):
+        for check, context, _ in self.contexts():
+            with self.subTest(check=check):
+                lb = liquibase_shim.install(**context)
+                sys.modules.pop(check, None)
+                module = importlib.import_module(check)
+                self.assertFalse(lb.get_status().fired)
+                self.assertEqual(module.check(lb), 1)
+                self.assertTrue(lb.get_status().fired)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+GDPR value sampling: the detectors and the sampling budgets
+
+Usage: python -m unittest discover tests
+"""
+
+import os
+import sqlite3
+import sys
+import unittest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "scripts"))
+
+import gdpr_sampling
+from gdpr_sampling import Budget, detect_batch, sample_table
+
+EMAILS = [f"user{i}@example.com" for i in range(20)]
+
+
+class DetectBatchTest(unittest.TestCase):
+    def test_cards_pass_luhn(self):
+        self.assertEqual(detect_batch(["4111 1111 1111 1111", "5500-0000-0000-0004", "378282246310005"]),
+                         {"card": 3})
+        self.assertEqual(detect_batch(["4111 1111 1111 1112", "5500-0000-0000-0005"]), {})
+
+    def test_ibans_pass_mod_97(self):
+        self.assertEqual(detect_batch(["DE89 3704 0044 0532 0130 00", "GB82WEST12345698765432"]), {"iban": 2})
+        self.assertEqual(detect_batch(["DE89 3704 0044 0532 0130 01", "GB82WEST12345698765433"]), {})
+
+    def test_phone_numbers(self):
+        values = ["555-123-4567", "(555) 123-4567", "+44 20 7946 0958", "+1 555 123 4567", "030 1234 5678",
+                  "call 555.123.4567 after 5", "call +44 20 7946 0958"]
+        self.assertEqual(detect_batch(values), {"phone": len(values)})
+
+    def test_codes_are_not_phone_numbers(self):
+        values = ["ORD-2024-000123", "100-200-300", "REF-555-123-4567", "INV.2024-0001-2345",
+                  "A1-555-123-4567", "2024-01-15", "12 345 678"]
+        for value in values:
+            with self.subTest(value=value):
+                self.assertEqual(detect_batch([value]), {})
+
+    def test_a_row_counts_once(self):
+        # A valid card is not also counted as a phone number
+        self.assertEqual(detect_batch(["4111 1111 1111 1111", "jane@example.com or 555-123-4567"]),
+                         {"card": 1, "email": 1})
+
+
+class SampleTableTest(unittest.TestCase):
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        self.addCleanup(self.connection.close)
+        self.connection.execute("CREATE TABLE notes (id INTEGER, body TEXT, ref TEXT)")
+        self.connection.executemany("INSERT INTO notes VALUES (?, ?, ?)",
+                                    [(i, email, f"ORD-2024-{i:06d}") for i, email in enumerate(EMAILS)])
+
+    def sample(self, budget=gdpr_sampling.DEFAULT_BUDGET, **kwargs):
+        return sample_table(self.connection, "notes", ["id", "body", "ref"], budget, **kwargs)
+
+    def test_reports_personal_columns_only(self):
+        self.assertEqual(self.sample(), {"body": "contact, sampled email"})
+
+    def test_row_budget(self):
+        self.assertEqual(self.sample(Budget(rows=2, bytes=1 << 20, seconds=10)), {})
+        self.assertEqual(self.sample(Budget(rows=3, bytes=1 << 20, seconds=10)), {"body": "contact, sampled email"})
+
+    def test_byte_budget(self):
+        # Both text columns count: a byte short of three rows reads two
+        row = len(EMAILS[0]) + len("ORD-2024-000000")
+        self.assertEqual(self.sample(Budget(rows=1000, bytes=3 * row - 1, seconds=10)), {})
+        self.assertEqual(self.sample(Budget(rows=1000, bytes=3 * row, seconds=10)), {"body": "contact, sampled email"})
+
+    def test_time_budget(self):
+        self.assertEqual(self.sample(Budget(rows=1000, bytes=1 << 20, seconds=0)), {})
+
+    def test_small_batches(self):
+        self.assertEqual(self.sample(batch_size=1), {"body": "contact, sampled email"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Offline rollback coverage: which rollbacks rollback_check.py accepts
+
+Usage: python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "scripts"))
+
+import changeset_index
+import rollback_check
+
+
+class AnalyzeChangesetTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory(prefix="liquibase-rollback-")
+        self.addCleanup(self.tmp.cleanup)
+
+    def analyze(self, body):
+        """{changeset id: [(category, message)]} for one formatted-SQL file"""
+        path = os.path.join(self.tmp.name, "changelog.sql")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("--liquibase formatted sql\n\n" + body)
+        index = changeset_index.load(path, os.path.join(self.tmp.name, "cache"))
+        return {entry.id: [(category, message) for _, _, category, message in rollback_check.analyze_changeset(entry)]
+                for entry in index}
+
+    def test_dropping_the_indexed_column_drops_the_index(self):
+        # releases/v2.0/001-schema-refactor.sql of the demo changelog
+        found = self.analyze("""--changeset architect:v2.0-002
+ALTER TABLE app.orders
+    ADD COLUMN shipping_address_id INTEGER REFERENCES app.customer_addresses(address_id);
+
+CREATE INDEX idx_orders_shipping_address ON app.orders(shipping_address_id);
+--rollback ALTER TABLE app.orders DROP COLUMN shipping_address_id;
+""")
+        self.assertEqual(found, {"architect:v2.0-002": []})
+
+    def test_any_column_of_a_multi_column_index(self):
+        found = self.analyze("""--changeset test:001
+CREATE INDEX idx_orders_status ON app.orders USING btree (customer_id, status DESC NULLS LAST);
+--rollback ALTER TABLE app.orders DROP COLUMN status;
+""")
+        self.assertEqual(found, {"test:001": []})
+
+    def test_other_columns_do_not_drop_the_index(self):
+        found = self.analyze("""--changeset test:001
+CREATE INDEX idx_orders_status ON app.orders(status);
+--rollback ALTER TABLE app.orders DROP COLUMN notes;
+
+--changeset test:002
+CREATE INDEX idx_customers_email ON app.customers(lower(email));
+--rollback ALTER TABLE app.customers DROP COLUMN email;
+""")
+        self.assertEqual(found, {
+            "test:001": [("non-inverting", "Rollback does not DROP INDEX idx_orders_status")],
+            "test:002": [("non-inverting", "Rollback does not DROP INDEX idx_customers_email")],
+        })
+
+    def test_drop_index_or_table(self):
+        found = self.analyze("""--changeset test:001
+CREATE INDEX idx_orders_status ON app.orders(status);
+--rollback DROP INDEX IF EXISTS app.idx_orders_status;
+
+--changeset test:002
+CREATE TABLE app.notes (note_id SERIAL PRIMARY KEY);
+CREATE INDEX idx_notes_id ON app.notes(note_id);
+--rollback DROP TABLE app.notes;
+""")
+        self.assertEqual(found, {"test:001": [], "test:002": []})
+
+    def test_missing_non_inverting_and_empty(self):
+        found = self.analyze("""--changeset test:001
+CREATE TABLE app.notes (note_id SERIAL PRIMARY KEY);
+
+--changeset test:002
+ALTER TABLE app.notes ADD COLUMN body TEXT;
+--rollback DROP TABLE app.other;
+
+--changeset test:003
+INSERT INTO app.notes (body) VALUES ('x');
+--rollback empty
+""")
+        self.assertEqual(found, {
+            "test:001": [("missing", "No --rollback for 1 statement(s)")],
+            "test:002": [("non-inverting", "Rollback does not DROP COLUMN body on app.notes")],
+            "test:003": [("empty", "Rollback declared '--rollback empty' for 1 statement(s)")],
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()